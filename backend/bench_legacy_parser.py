@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark line classification in the legacy parser: keyword-by-keyword checks vs the segmenter and single-scan matcher
+
+Usage: python bench_legacy_parser.py [scheme.pdf ...]  (defaults to the sample schemes in the repo)
+"""
+import glob
+import os
+import re
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_parser import EnhancedSchemeParser
+from legacy_parser import KEYWORD_MAP, LEGACY_SEGMENTER, SECTION_HEADER_MATCHER, SECTION_SEPARATORS, WEEK_PATTERNS
+from line_segmenter import HEADER_CODES, WEEK_HEADER
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+KEYWORD_PATTERNS = {
+    section: [(keyword, [f'{keyword}{separator}' for separator in SECTION_SEPARATORS]) for keyword in keywords]
+    for section, keywords in KEYWORD_MAP.items()
+}
+
+
+def classify_before(line, line_lower):
+    """Per-line work of the previous parse_scheme_of_work: every keyword's patterns, then every week regex"""
+    header = None
+    for section, keywords in KEYWORD_PATTERNS.items():
+        for keyword, patterns in keywords:
+            if any(pattern in line_lower for pattern in patterns) or line_lower.startswith(keyword + ' '):
+                header = section
+                break
+        if header:
+            break
+    is_week = any(re.search(pattern, line, re.IGNORECASE) for pattern in WEEK_PATTERNS)
+    return header, is_week
+
+
+def classify_after(line, line_lower):
+    code, _ = LEGACY_SEGMENTER.classify(line)
+    header = SECTION_HEADER_MATCHER.classify(line_lower) if code in HEADER_CODES else None
+    return header and header[0], code == WEEK_HEADER
+
+
+def load_lines(paths):
+    parser = EnhancedSchemeParser(extract_workers=1)
+    parser.text_cache = None
+    lines = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            text = parser.extract_text_from_pdf(f.read())
+        lines.extend(line.strip() for line in text.split('\n') if line.strip())
+    return [(line, line.lower()) for line in lines]
+
+
+def bench(classify, lines, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line, line_lower in lines:
+            classify(line, line_lower)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(REPO_ROOT, '*.pdf')) + glob.glob(os.path.join(REPO_ROOT, 'SOWS', '*.pdf')))
+    lines = load_lines(paths)
+    mismatches = sum(1 for line, line_lower in lines if classify_before(line, line_lower) != classify_after(line, line_lower))
+    print(f"{len(lines)} lines from {len(paths)} schemes, {mismatches} classification mismatches")
+
+    before = bench(classify_before, lines)
+    after = bench(classify_after, lines)
+    print(f"keyword-by-keyword: {before:12,.0f} lines/s")
+    print(f"segmenter + scan:   {after:12,.0f} lines/s  ({after / before:.1f}x)")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark saving a parsed term: one POST /lesson-plans/ per lesson vs a single POST /lesson-plans/bulk
+
+Usage: python bench_lesson_plan_inserts.py [lessons] [repeat]  (defaults to 60 lessons, best of 5)
+Runs against the database configured in .env (DB_PASSWORD, DB_HOST) and deletes the rows it inserts.
+"""
+import os
+import sys
+import time
+from datetime import date
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from main import DBLessonPlan, LessonPlanCreate, SessionLocal, create_lesson_plan, create_lesson_plans_bulk
+
+
+def term_lesson_plans(lessons):
+    """A term of lesson plans as the frontend sends them after parsing a scheme, five lessons a week"""
+    return [LessonPlanCreate(
+        school="Benchmark School",
+        level="Grade 9",
+        learningArea="Mathematics",
+        date=date(2025, 5, 5),
+        roll="40",
+        term=2,
+        week=index // 5 + 1,
+        lessonNumber=index % 5 + 1,
+        title=f"Fractions {index + 1}",
+        strand="Numbers",
+        subStrand="Fractions",
+        specificLearningOutcomes=["Add fractions with different denominators", "Apply fractions in real life"],
+        coreCompetencies=["Critical thinking", "Communication"],
+        keyInquiryQuestion="How do we use fractions in daily life?",
+        learningResources=["Textbook", "Fraction charts"],
+        introduction={"duration": "5 minutes", "activities": ["Review the previous lesson"]},
+        lessonDevelopment={"duration": "30 minutes", "steps": [
+            {"stepNumber": 1, "activity": "Discuss examples in groups", "duration": "15 minutes"},
+            {"stepNumber": 2, "activity": "Work out exercises", "duration": "15 minutes"},
+        ]},
+        conclusion={"duration": "5 minutes", "activities": ["Summarise the lesson"]},
+        extendedActivities=["Homework exercise"],
+        assessment="Oral questions",
+    ) for index in range(lessons)]
+
+
+def save_one_by_one(lesson_plans):
+    """The per-row path: a session, commit and refresh per lesson, as one request each"""
+    ids = []
+    for lesson_plan in lesson_plans:
+        db = SessionLocal()
+        try:
+            ids.append(create_lesson_plan(lesson_plan, db).id)
+        finally:
+            db.close()
+    return ids
+
+
+def save_in_bulk(lesson_plans):
+    db = SessionLocal()
+    try:
+        return create_lesson_plans_bulk(lesson_plans, db).ids
+    finally:
+        db.close()
+
+
+def delete_rows(ids):
+    db = SessionLocal()
+    try:
+        db.query(DBLessonPlan).filter(DBLessonPlan.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def bench(save, lesson_plans, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ids = save(lesson_plans)
+        best = min(best, time.perf_counter() - started)
+        assert len(ids) == len(lesson_plans)
+        delete_rows(ids)
+    return best
+
+
+if __name__ == "__main__":
+    lessons = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    lesson_plans = term_lesson_plans(lessons)
+
+    one_by_one = bench(save_one_by_one, lesson_plans, repeat)
+    bulk = bench(save_in_bulk, lesson_plans, repeat)
+    print(f"{lessons} lesson plans, best of {repeat}")
+    print(f"one request per lesson: {one_by_one * 1000:8.1f} ms")
+    print(f"bulk insert:            {bulk * 1000:8.1f} ms  ({one_by_one / bulk:.1f}x)")
@@ -0,0 +1,209 @@
+"""
+CBC taxonomy loaded from cbc_taxonomy.yaml, with a compiled snapshot and hot reload
+"""
+import hashlib
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+import yaml
+
+# Taxonomy settings; snapshots are shared by every worker on the host
+TAXONOMY_PATH = os.getenv("CBC_TAXONOMY_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "cbc_taxonomy.yaml")
+TAXONOMY_SNAPSHOT_DIR = os.getenv("CBC_TAXONOMY_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "teach-easy-convert", "taxonomy")
+TAXONOMY_CHECK_INTERVAL = float(os.getenv("CBC_TAXONOMY_CHECK_INTERVAL", "5"))
+
+# Bump when CompiledTaxonomy's attributes change so older snapshots are not reused
+SNAPSHOT_FORMAT = "compiled-taxonomy-1"
+
+logger = logging.getLogger(__name__)
+
+
+def _check_phrases(where: str, phrases) -> list:
+    if not isinstance(phrases, list) or not all(isinstance(phrase, str) for phrase in phrases):
+        raise ValueError(f"{where} must be a list of phrases")
+    for phrase in phrases:
+        if not phrase or phrase != phrase.strip().lower():
+            raise ValueError(f"{where}: {phrase!r} must be lowercase without surrounding spaces")
+    return phrases
+
+
+def validate_taxonomy(data) -> Dict:
+    """Check a parsed taxonomy file, raising ValueError with the offending entry"""
+    if not isinstance(data, dict):
+        raise ValueError("taxonomy must be a mapping")
+    if not isinstance(data.get('version'), (str, int, float)):
+        raise ValueError("taxonomy needs a version")
+    strands = data.get('strands')
+    if not isinstance(strands, dict) or not strands:
+        raise ValueError("taxonomy needs at least one learning area under strands")
+
+    for name, strand in strands.items():
+        _check_phrases("strands", [name])
+        if not isinstance(strand, dict) or not isinstance(strand.get('sub_strands'), dict):
+            raise ValueError(f"strands.{name} needs aliases and sub_strands")
+        _check_phrases(f"strands.{name}.aliases", strand.get('aliases'))
+        for sub_strand, keywords in strand['sub_strands'].items():
+            _check_phrases(f"strands.{name}.sub_strands", [sub_strand])
+            _check_phrases(f"strands.{name}.sub_strands.{sub_strand}", keywords)
+
+    for key in ('strand_patterns', 'normalizations'):
+        values = data.get(key) or {}
+        if not isinstance(values, dict) or not all(isinstance(value, str) for value in values.values()):
+            raise ValueError(f"{key} must map names to strings")
+    for name, pattern in (data.get('strand_patterns') or {}).items():
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"strand_patterns.{name} is not a valid pattern: {e}")
+    return data
+
+
+def compile_taxonomy(source: bytes, digest: Optional[str] = None):
+    """Parse and validate taxonomy YAML and compile it for the strand identifier"""
+    # Import here to avoid circular imports
+    from improved_strand_identifier import CompiledTaxonomy
+
+    data = validate_taxonomy(yaml.safe_load(source))
+    return CompiledTaxonomy(
+        data['strands'],
+        strand_patterns=data.get('strand_patterns') or {},
+        normalizations=data.get('normalizations') or {},
+        version=str(data['version']),
+        digest=digest or hashlib.sha256(source).hexdigest(),
+    )
+
+
+class TaxonomyLoader:
+    """Keeps the compiled taxonomy for one file current.
+
+    Each version of the file is compiled once and pickled to a snapshot
+    named after its SHA-256, which later processes load instead of parsing
+    the YAML. current() stats the file at most every check_interval seconds
+    and reloads it when its mtime or size changes. The new taxonomy replaces
+    the old one only once it has loaded completely; a file that fails to
+    parse or validate is logged and the previous taxonomy stays in use.
+    """
+
+    def __init__(self, path: str = TAXONOMY_PATH, snapshot_dir: Optional[str] = TAXONOMY_SNAPSHOT_DIR,
+                 check_interval: float = TAXONOMY_CHECK_INTERVAL):
+        self.path = path
+        self.snapshot_dir = snapshot_dir
+        self.check_interval = check_interval
+        self.taxonomy = None
+        self.loaded_at = None
+        self.loaded_from = None
+        self.last_error = None
+        self._file_key = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the loaded taxonomy, reloading it first if the file has changed"""
+        if self.taxonomy is None or time.monotonic() >= self._next_check:
+            with self._lock:
+                if self.taxonomy is None or time.monotonic() >= self._next_check:
+                    self._reload_if_changed()
+        return self.taxonomy
+
+    def _reload_if_changed(self) -> None:
+        self._next_check = time.monotonic() + self.check_interval
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            if self.taxonomy is None:
+                raise
+            self._record_error(e)
+            return
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        if file_key == self._file_key:
+            return
+
+        # Remember the attempt even if it fails, so a broken file is not re-read until it changes again
+        self._file_key = file_key
+        try:
+            with open(self.path, 'rb') as f:
+                source = f.read()
+            taxonomy, loaded_from = self._load(source)
+        except Exception as e:
+            if self.taxonomy is None:
+                raise
+            self._record_error(e)
+            return
+
+        self.taxonomy = taxonomy
+        self.loaded_at = time.time()
+        self.loaded_from = loaded_from
+        self.last_error = None
+        logger.info("Loaded CBC taxonomy version %s from %s", taxonomy.version, loaded_from)
+
+    def _record_error(self, error: Exception) -> None:
+        self.last_error = f"{type(error).__name__}: {error}"
+        logger.warning("Keeping CBC taxonomy version %s; could not reload %s: %s",
+                       self.taxonomy.version, self.path, self.last_error)
+
+    def _snapshot_path(self, digest: str) -> str:
+        return os.path.join(self.snapshot_dir, f"{digest}-{SNAPSHOT_FORMAT}.pickle")
+
+    def _load(self, source: bytes):
+        """Return (taxonomy, 'snapshot' or 'yaml') for the file contents"""
+        from improved_strand_identifier import CompiledTaxonomy
+
+        digest = hashlib.sha256(source).hexdigest()
+        if not self.snapshot_dir:
+            return compile_taxonomy(source, digest), 'yaml'
+
+        path = self._snapshot_path(digest)
+        try:
+            # Only unpickle snapshots this user wrote (the directory may be shared)
+            if not hasattr(os, 'getuid') or os.stat(path).st_uid == os.getuid():
+                with open(path, 'rb') as f:
+                    taxonomy = pickle.load(f)
+                if isinstance(taxonomy, CompiledTaxonomy) and taxonomy.digest == digest:
+                    return taxonomy, 'snapshot'
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # no usable snapshot yet
+
+        taxonomy = compile_taxonomy(source, digest)
+        try:
+            os.makedirs(self.snapshot_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(taxonomy, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write CBC taxonomy snapshot: %s", e)
+        return taxonomy, 'yaml'
+
+    def status(self) -> Dict:
+        taxonomy = self.current()
+        return {
+            'version': taxonomy.version,
+            'digest': taxonomy.digest,
+            'path': self.path,
+            'loaded_from': self.loaded_from,
+            'loaded_at': self.loaded_at,
+            'learning_areas': len(taxonomy.cbc_strands),
+            'last_error': self.last_error,
+        }
+
+
+_default_loader = None
+
+
+def get_taxonomy_loader() -> TaxonomyLoader:
+    """Return the loader for TAXONOMY_PATH, shared within the process"""
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = TaxonomyLoader()
+    return _default_loader
+
+
+def get_taxonomy():
+    """Return the current compiled CBC taxonomy"""
+    return get_taxonomy_loader().current()
@@ -0,0 +1,136 @@
+"""
+One-pass extraction of learning outcomes, inquiry questions, resources and assessments from a week block
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from line_segmenter import word_alternation
+from linear_patterns import INQUIRY_QUESTION_KEYWORD, LazyRunPattern, inquiry_question
+
+_PHRASE_END = re.compile(r'[\s.]')
+
+
+class LessonComponents:
+    """What ComponentLexicon.scan found in a block, each as the per-indicator regex search would give it"""
+
+    __slots__ = ('outcomes', 'inquiry_question', 'resource_phrases', 'assessments')
+
+    def __init__(self, outcomes: Optional[str], inquiry_question: Optional[str], resource_phrases: List[str],
+                 assessments: List[str]):
+        # group(1) of the first outcome pattern that matches
+        self.outcomes = outcomes
+        # The whole match of the first inquiry pattern that matches
+        self.inquiry_question = inquiry_question
+        # The phrase around each resource word the block contains, in lexicon order
+        self.resource_phrases = resource_phrases
+        # Assessment words the block contains, in lexicon order
+        self.assessments = assessments
+
+
+class ComponentLexicon:
+    """Resource and assessment words and the outcome and inquiry keywords, found in one sweep over a block.
+
+    The sweep is one regex search stepping through the block: at each
+    position it tries the keywords and the words (as a prefix tree) starting
+    with the character there, and resumes one past each hit. It records the
+    first position of each word (and of the lexicon words it starts with),
+    every keyword match and the last period before each hit, so resource
+    phrases come without searching the block again. The outcome and inquiry patterns are
+    then settled from their keyword matches alone, in their order.
+    """
+
+    def __init__(self, resource_words: Sequence[str], assessment_words: Sequence[str],
+                 outcome_patterns: Sequence[str], inquiry_patterns: Sequence[str]):
+        self.resource_words = list(resource_words)
+        self.assessment_words = list(assessment_words)
+        self.outcome_patterns = [LazyRunPattern(pattern) for pattern in outcome_patterns]
+        self.inquiry_patterns = [LazyRunPattern(pattern) for pattern in inquiry_patterns]
+
+        words = list(dict.fromkeys(self.resource_words + self.assessment_words))
+        # Lexicon words that also start wherever a word starts (itself and its prefixes)
+        self._word_prefixes = {word: [prefix for prefix in words if word.startswith(prefix)] for word in words}
+        keywords = [pattern.keyword for pattern in self.outcome_patterns + self.inquiry_patterns]
+        keywords.append(INQUIRY_QUESTION_KEYWORD)
+        self._keywords = list(dict.fromkeys(keywords))
+
+        # Alternatives grouped by their first character, so the sweep tries one branch per position; a hit is then
+        # matched against every entry starting with that character, since the sweep reports only that one matches
+        rests: Dict[str, List[str]] = {}
+        self._starting: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+        self._anywhere: List[Tuple[str, re.Pattern]] = []
+        anywhere = []
+        for index, keyword in enumerate(self._keywords):
+            entry = (f'k{index}', re.compile(keyword))
+            if keyword[0].isalnum() and keyword[1:2] not in ('?', '*', '+', '{'):
+                rests.setdefault(keyword[0], []).append(keyword[1:])
+                self._starting.setdefault(keyword[0], []).append(entry)
+            else:
+                anywhere.append(keyword)
+                self._anywhere.append(entry)
+        for first in dict.fromkeys(word[0] for word in words):
+            alternation = word_alternation(word for word in words if word[0] == first)
+            rests.setdefault(first, []).append(alternation[len(re.escape(first)):])
+            self._starting.setdefault(first, []).append(('w', re.compile(alternation)))
+        self._starting = {first: candidates + self._anywhere for first, candidates in self._starting.items()}
+        alternatives = [re.escape(first) + '(?:' + '|'.join(rest) + ')' for first, rest in rests.items()]
+        self._sweep = re.compile('|'.join(alternatives + anywhere))
+
+    def scan(self, text: str) -> LessonComponents:
+        """Components of a lowercased block"""
+        first_word: Dict[str, Tuple[int, int]] = {}  # word -> (position, last period before it)
+        spans: Dict[str, List[Tuple[int, int]]] = {keyword: [] for keyword in self._keywords}
+        last_period, searched = -1, 0
+        found = self._sweep.search(text)
+        while found:
+            position = found.start()
+            # Periods between the last hit and this one
+            period = text.rfind('.', searched, position)
+            last_period, searched = max(last_period, period), position
+            for name, pattern in self._starting.get(text[position], self._anywhere):
+                match = pattern.match(text, position)
+                if match:
+                    self._record(name, match.group(), position, last_period, first_word, spans)
+            # Entries may overlap, so the next hit may start inside this one
+            found = self._sweep.search(text, position + 1)
+
+        return LessonComponents(self._outcomes(text, spans), self._inquiry_question(text, spans),
+                                self._resource_phrases(text, first_word), [
+                                    word for word in self.assessment_words if word in first_word])
+
+    def _record(self, name: str, matched: str, position: int, last_period: int,
+                first_word: Dict[str, Tuple[int, int]], spans: Dict[str, List[Tuple[int, int]]]) -> None:
+        if name == 'w':
+            for word in self._word_prefixes[matched]:
+                first_word.setdefault(word, (position, last_period))
+        else:
+            spans[self._keywords[int(name[1:])]].append((position, position + len(matched)))
+
+    def _outcomes(self, text: str, spans: Dict[str, List[Tuple[int, int]]]) -> Optional[str]:
+        for pattern in self.outcome_patterns:
+            keywords = spans[pattern.keyword]
+            match = pattern.search(text, keywords) if keywords else None
+            if match:
+                return match.group(1)
+        return None
+
+    def _inquiry_question(self, text: str, spans: Dict[str, List[Tuple[int, int]]]) -> Optional[str]:
+        for pattern in self.inquiry_patterns:
+            keywords = spans[pattern.keyword]
+            match = pattern.search(text, keywords) if keywords else None
+            if match:
+                return match.group(0)
+        keywords = spans[INQUIRY_QUESTION_KEYWORD]
+        return inquiry_question(text, keywords) if keywords else None
+
+    def _resource_phrases(self, text: str, first_word: Dict[str, Tuple[int, int]]) -> List[str]:
+        """From the period before each word's first position to the first whitespace or period after it"""
+        ends = {}
+        end = None
+        # In order of where the word ends, so no stretch of text is searched twice
+        for word_end, word in sorted((first_word[word][0] + len(word), word)
+                                     for word in self.resource_words if word in first_word):
+            if end is None or end < word_end:
+                found = _PHRASE_END.search(text, word_end)
+                end = found.start() if found else len(text)
+            ends[word] = end
+        return [text[first_word[word][1] + 1:ends[word]] for word in self.resource_words if word in first_word]
@@ -2,14 +2,158 @@
 Enhanced Scheme of Work Parser with robust handling for various formats
 """
 import re
+import os
+import json
 import fitz  # PyMuPDF
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Union
 import logging
+from cbc_taxonomy import get_taxonomy
+from extraction_cache import ExtractionCache, content_digest, get_default_cache
+from line_segmenter import BLANK, BULLET_CHARS, WEEK_HEADER, LineSegmenter
+from component_lexicon import ComponentLexicon
+from linear_patterns import linear_pattern
+from scheme_document import SchemeDocument
+from table_extractor import GeometricTableExtractor
+
+# Bump when extraction output changes so stale cache entries are not reused
+TEXT_EXTRACTOR_VERSION = "enhanced-dict-1"
+TABLE_EXTRACTOR_VERSION = "geometric-table-1"
+
+# Bump when the parser's output for the same text changes
+PARSER_VERSION = "enhanced-parser-1"
+
+# A lesson table must start within this many pages to be parsed geometrically
+TABLE_HEADER_PAGES = 3
+
+# Week blocks given to the strand classifier at a time when a parse may stop early
+RESUMABLE_STRAND_BATCH = 32
+
+# Week header patterns for free-format text, tried in order; the first match gives the week
+FREE_FORMAT_WEEK_PATTERNS = [
+    r'(?:week|wk|w)\s*[:\-]?\s*(\d+)',
+    r'^(\d+)\s*$',  # Just a number on its own line
+    r'(\d+)\s+(?:week|wk)',
+    r'^(\d+)\s+\d+',  # Pattern like "1 1" (week lesson)
+]
+FREE_FORMAT_SEGMENTER = LineSegmenter(FREE_FORMAT_WEEK_PATTERNS)
+
+# Lesson components found in one sweep over each block: resource and assessment words, then the
+# learning outcome and key inquiry question patterns, each list tried in order
+RESOURCE_INDICATORS = [
+    'textbook', 'chart', 'cards', 'materials', 'flashcards', 'marbles', 'stones',
+    'pictures', 'models', 'specimens', 'calculator', 'ruler', 'compass', 'protractor',
+    'computer', 'internet', 'video', 'audio', 'map', 'globe', 'microscope'
+]
+ASSESSMENT_INDICATORS = [
+    'observation', 'written', 'oral', 'questions', 'exercise', 'test', 'quiz',
+    'presentation', 'project', 'assignment', 'homework', 'practical', 'demonstration'
+]
+OUTCOME_PATTERNS = [
+    r'by\s+the\s+end[^:]*?:\s*([^?]+?)(?:\s+how\s+|$)',
+    r'learner[s]?\s+should\s+be\s+able\s+to[:\s]*([^?]+?)(?:\s+how\s+|$)',
+    r'objective[s]?[:\s]*([^?]+?)(?:\s+how\s+|$)',
+    r'learning\s+outcome[s]?[:\s]*([^?]+?)(?:\s+how\s+|$)',
+]
+# Then r'inquiry\s+question[s]?[:\s]*([^.]+[?.])' (linear_patterns.inquiry_question)
+INQUIRY_PATTERNS = [
+    r'how\s+can\s+[^?]*?\?',
+    r'what\s+[^?]*?\?',
+    r'why\s+[^?]*?\?',
+    r'when\s+[^?]*?\?',
+    r'where\s+[^?]*?\?',
+]
+LESSON_COMPONENT_LEXICON = ComponentLexicon(RESOURCE_INDICATORS, ASSESSMENT_INDICATORS, OUTCOME_PATTERNS,
+                                            INQUIRY_PATTERNS)
+
+# Page-parallel extraction settings (can be overridden per parser instance)
+DEFAULT_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "12"))
+
+# An upload is either its bytes or the path of a spooled copy on disk
+PdfSource = Union[bytes, str]
+
+# progress(stage, done, total, **details) is called as the PDF's pages are
+# extracted ('pages'), as week segments are found ('weeks', with week=n), as
+# lessons are extracted from rows or blocks ('lessons') and as lesson plans
+# are enhanced ('enhance'); total is None while it is not yet known
+ProgressCallback = Callable[..., None]
+
+_extraction_pool = None
+_extraction_pool_workers = 0
+
+
+def _get_extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared extraction pool, recreating it if the size changed"""
+    global _extraction_pool, _extraction_pool_workers
+    if _extraction_pool is None or _extraction_pool_workers != workers:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=False)
+        _extraction_pool = ProcessPoolExecutor(max_workers=workers)
+        _extraction_pool_workers = workers
+    return _extraction_pool
+
+
+def _extract_page_text(page) -> str:
+    """Extract one page's text line by line, preserving table rows"""
+    # Try to preserve table structure
+    text_dict = page.get_text("dict")
+    blocks = text_dict.get("blocks", [])
+
+    page_lines = []
+    for block in blocks:
+        if "lines" in block:
+            for line in block["lines"]:
+                line_text = "".join(span.get("text", "") for span in line["spans"])
+                if line_text.strip():
+                    page_lines.append(line_text + "\n")
+    page_text = "".join(page_lines)
+
+    # Fallback to simple text extraction if dict method fails
+    if not page_text.strip():
+        page_text = page.get_text("text")
+
+    return page_text
+
+
+def _extract_page(page) -> Tuple[str, List[tuple], float]:
+    """Extract one page's text plus the word boxes used for table extraction"""
+    return _extract_page_text(page), page.get_text("words"), page.rect.width
+
+
+def _open_pdf(source: PdfSource):
+    """Open a PDF from its bytes, or from a file path so PyMuPDF can read it lazily"""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source, filetype="pdf")
+
+
+def _extract_page_range(source: PdfSource, start: int, stop: int) -> List[Tuple[str, List[tuple], float]]:
+    """Worker entry point: open the document once and extract pages [start, stop)"""
+    doc = _open_pdf(source)
+    try:
+        return [_extract_page(doc[page_num]) for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
 
 class EnhancedSchemeParser:
-    def __init__(self):
+    def __init__(self, extract_workers: Optional[int] = None, parallel_min_pages: Optional[int] = None,
+                 text_cache: Optional[ExtractionCache] = None):
         self.logger = logging.getLogger(__name__)
         
+        # Extracted text is cached by upload digest (None when caching is disabled)
+        self.text_cache = text_cache if text_cache is not None else get_default_cache()
+        
+        # Worker processes used for page-parallel PDF extraction (1 disables it)
+        self.extract_workers = extract_workers if extract_workers is not None else DEFAULT_EXTRACT_WORKERS
+        # Documents with fewer pages than this are always extracted serially
+        self.parallel_min_pages = parallel_min_pages if parallel_min_pages is not None else PARALLEL_MIN_PAGES
+        
+        # Built on first use and reused for every lesson (see get_strand_identifier)
+        self._strand_identifier = None
+        
         # Enhanced column patterns - more flexible matching
         self.column_patterns = {
             'week': [
@@ -69,99 +213,240 @@ class EnhancedSchemeParser:
             ]
         }
         
-        # Enhanced CBC-specific strand patterns
-        self.cbc_strand_patterns = {
-            # Mathematics strands
-            'numbers': r'(?:numbers?|number\s+concepts?|numeration|counting|place\s+value)',
-            'geometry': r'(?:geometry|shapes?|spatial|3d|2d|geometric|space)',
-            'measurement': r'(?:measurement|measuring|length|mass|time|capacity|volume)',
-            'data': r'(?:data|statistics|graphs?|charts?|probability)',
-            'algebra': r'(?:algebra|patterns?|equations?|expressions?)',
-            'money': r'(?:money|currency|coins?|notes?|buying|selling)',
-            
-            # Science strands
-            'living_things': r'(?:living\s+things?|life|biology|plants?|animals?|human\s+body|organisms?)',
-            'non_living': r'(?:non[\-\s]*living|matter|materials?|substances?|physics)',
-            'energy': r'(?:energy|force|motion|electricity|magnetism|heat|light|sound)',
-            'environment': r'(?:environment|ecology|conservation|pollution|weather|climate)',
-            'health': r'(?:health|hygiene|nutrition|disease|safety|first\s+aid)',
-            
-            # Language strands
-            'listening': r'(?:listening|listening\s+skills?|comprehension)',
-            'speaking': r'(?:speaking|oral|conversation|presentation)',
-            'reading': r'(?:reading|literacy|comprehension|phonics)',
-            'writing': r'(?:writing|composition|spelling|grammar|handwriting)',
-            
-            # Social Studies strands
-            'history': r'(?:history|historical|past|heritage|culture)',
-            'geography': r'(?:geography|maps?|location|physical\s+features?)',
-            'citizenship': r'(?:citizenship|civic|government|rights|responsibilities)',
-            'economics': r'(?:economics?|trade|resources?|production)',
-            
-            # Creative Arts strands
-            'visual_arts': r'(?:visual\s+arts?|drawing|painting|crafts?|art)',
-            'performing_arts': r'(?:performing\s+arts?|music|dance|drama|theatre)',
-            'digital_arts': r'(?:digital\s+arts?|computer\s+arts?|multimedia)',
-            
-            # ICT strands
-            'computing': r'(?:computing|computer|ict|technology|digital)',
-            'programming': r'(?:programming|coding|algorithms?|software)',
-            'internet': r'(?:internet|web|online|networking)',
-            
-            # Physical Education strands
-            'motor_skills': r'(?:motor\s+skills?|movement|coordination|balance)',
-            'games': r'(?:games?|sports?|athletics|competition)',
-            'fitness': r'(?:fitness|exercise|physical\s+activity)',
-            
-            # Religious Education strands
-            'beliefs': r'(?:beliefs?|faith|doctrine|teachings?)',
-            'practices': r'(?:practices?|worship|prayer|rituals?)',
-            'values': r'(?:values?|morals?|ethics?|character)',
-        }
-        
         # Common separators and indicators
         self.separators = ['|', '\t', '  ', '   ', '    ']
-        self.bullet_points = ['•', '○', '▪', '-', '*', '→', '◦']
+        self.bullet_points = list(BULLET_CHARS)
+
+    @property
+    def cbc_strand_patterns(self) -> Dict[str, str]:
+        """CBC strand patterns from the current taxonomy (cbc_taxonomy.yaml)"""
+        return get_taxonomy().strand_patterns
         
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
+    def extract_text_from_pdf(self, source: PdfSource, workers: Optional[int] = None,
+                              digest: Optional[str] = None) -> str:
         """Enhanced PDF text extraction with layout preservation"""
         try:
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            full_text = ""
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Try to preserve table structure
-                text_dict = page.get_text("dict")
-                blocks = text_dict.get("blocks", [])
-                
-                page_text = ""
-                for block in blocks:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            line_text = ""
-                            for span in line["spans"]:
-                                line_text += span.get("text", "")
-                            if line_text.strip():
-                                page_text += line_text + "\n"
-                
-                # Fallback to simple text extraction if dict method fails
-                if not page_text.strip():
-                    page_text = page.get_text("text")
-                
-                full_text += f"--- PAGE {page_num + 1} ---\n" + page_text + "\n"
-                
-            doc.close()
-            return full_text
+            return self.extract_pdf_content(source, workers, digest)[0]
             
         except Exception as e:
             self.logger.error(f"PDF extraction error: {e}")
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
     
-    def detect_table_structure(self, text: str) -> Dict[str, List[str]]:
+    def extract_pdf_content(self, source: PdfSource, workers: Optional[int] = None, digest: Optional[str] = None,
+                            progress: Optional[ProgressCallback] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """Return (text, table rows) for a PDF, reusing cached results when available.
+
+        Pass the digest when it is already known (spooled uploads hash while
+        streaming) so the file is not read again just to compute it.
+        """
+        if self.text_cache is None:
+            digest = None
+        elif digest is None:
+            digest = content_digest(source)
+        if digest:
+            content = self.cached_content(digest)
+            if content is not None:
+                if progress:
+                    page_count = SchemeDocument(content[0]).page_count
+                    progress('pages', page_count, page_count)
+                return content
+        
+        text, table_rows = self._extract_content_uncached(source, workers, progress)
+        self.cache_content(digest, text, table_rows)
+        return text, table_rows
+    
+    def cached_content(self, digest: Optional[str]) -> Optional[Tuple[str, List[Dict[str, str]]]]:
+        """(text, table rows) cached for an upload digest, or None"""
+        if self.text_cache is None or not digest:
+            return None
+        text = self.text_cache.get(digest, TEXT_EXTRACTOR_VERSION)
+        rows_json = self.text_cache.get(digest, TABLE_EXTRACTOR_VERSION)
+        if text is None or rows_json is None:
+            return None
+        return text, json.loads(rows_json)
+    
+    def cache_content(self, digest: Optional[str], text: str, table_rows: List[Dict[str, str]]) -> None:
+        if self.text_cache is not None and digest:
+            self.text_cache.put(digest, TEXT_EXTRACTOR_VERSION, text)
+            self.text_cache.put(digest, TABLE_EXTRACTOR_VERSION, json.dumps(table_rows))
+    
+    def _extract_content_uncached(self, source: PdfSource, workers: Optional[int] = None,
+                                  progress: Optional[ProgressCallback] = None) -> Tuple[str, List[Dict[str, str]]]:
+        """Run PyMuPDF extraction once for both the page text and the table rows"""
+        return self.content_from_pages(self.extract_pages_from_pdf(source, workers, progress))
+    
+    def content_from_pages(self, pages: List[Tuple[str, List[tuple], float]]) -> Tuple[str, List[Dict[str, str]]]:
+        """(text, table rows) of a PDF from all of its extracted pages"""
+        text = "".join(
+            f"--- PAGE {page_num} ---\n" + page_text + "\n"
+            for page_num, (page_text, _, _) in enumerate(pages, 1)
+        )
+        return text, self.extract_table_rows(pages)
+    
+    def extract_table_rows(self, pages: Iterable[Tuple[str, List[tuple], float]]) -> List[Dict[str, str]]:
+        """Rebuild lesson table rows from page word boxes; empty if no table header is found"""
+        extractor = GeometricTableExtractor()
+        rows = []
+        for page_num, (_, words, page_width) in enumerate(pages):
+            if extractor.column_model is None and page_num >= TABLE_HEADER_PAGES:
+                return []
+            rows.extend(extractor.add_page(words, page_width))
+        rows.extend(extractor.finish())
+        return rows
+    
+    def extract_pages_from_pdf(self, source: PdfSource, workers: Optional[int] = None,
+                               progress: Optional[ProgressCallback] = None) -> List[Tuple[str, List[tuple], float]]:
+        """Extract the text, word boxes and width of every page, in page order.
+
+        Large documents are split into contiguous page ranges that are
+        extracted by a process pool; each worker opens the document itself,
+        so the bytes are shipped once per range rather than once per page
+        (and not at all when the source is a spooled file path).
+        """
+        workers = self.extract_workers if workers is None else workers
+        
+        doc = _open_pdf(source)
+        try:
+            page_count = len(doc)
+            if workers <= 1 or page_count < max(self.parallel_min_pages, 2):
+                pages = []
+                for page_num in range(page_count):
+                    pages.append(_extract_page(doc[page_num]))
+                    if progress:
+                        progress('pages', page_num + 1, page_count)
+                return pages
+        finally:
+            doc.close()
+        
+        try:
+            return self._extract_pages_parallel(source, page_count, min(workers, page_count), progress)
+        except Exception as e:
+            # A broken pool must not fail the upload; serial extraction still works
+            self.logger.warning(f"Parallel PDF extraction failed, extracting serially: {e}")
+            pages = _extract_page_range(source, 0, page_count)
+            if progress:
+                progress('pages', page_count, page_count)
+            return pages
+    
+    def extract_pages_within(self, source: PdfSource, pages: List[Tuple[str, List[tuple], float]], budget) -> int:
+        """Extract pages after those already in pages, one at a time, until all are done or budget expires.
+
+        At least one page is extracted per call, so a resumed parse always
+        makes progress. Returns the document's page count.
+        """
+        doc = _open_pdf(source)
+        try:
+            page_count = len(doc)
+            first_page = len(pages)
+            for page_num in range(first_page, page_count):
+                if page_num > first_page and budget.expired():
+                    break
+                pages.append(_extract_page(doc[page_num]))
+            return page_count
+        finally:
+            doc.close()
+    
+    def _extract_pages_parallel(self, source: PdfSource, page_count: int, workers: int,
+                                progress: Optional[ProgressCallback] = None) -> List[Tuple[str, List[tuple], float]]:
+        """Fan contiguous page ranges out to the extraction pool"""
+        chunk_size = -(-page_count // workers)  # ceiling division
+        ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        
+        pool = _get_extraction_pool(workers)
+        futures = [pool.submit(_extract_page_range, source, start, stop) for start, stop in ranges]
+        
+        pages = []
+        for future in futures:
+            pages.extend(future.result())
+            if progress:
+                progress('pages', len(pages), page_count)
+        return pages
+    
+    def iter_pdf_lines(self, source: PdfSource, digest: Optional[str] = None) -> Iterator[str]:
+        """Yield the lines of extract_text_from_pdf one page at a time.
+
+        The sequence is identical to extract_text_from_pdf(...).split('\\n'),
+        but only the current page is held in memory.
+        """
+        if self.text_cache is not None:
+            cached_text = self.text_cache.get(digest or content_digest(source), TEXT_EXTRACTOR_VERSION)
+            if cached_text is not None:
+                yield from SchemeDocument(cached_text).iter_lines()
+                return
+        
+        doc = _open_pdf(source)
+        try:
+            for page_num in range(len(doc)):
+                yield from self._page_lines(page_num, _extract_page_text(doc[page_num]))
+        finally:
+            doc.close()
+        yield ''
+    
+    def _page_lines(self, page_num: int, page_text: str) -> List[str]:
+        """Lines contributed by one page to the extracted text, marker first"""
+        return [f"--- PAGE {page_num + 1} ---"] + (page_text + "\n").split('\n')[:-1]
+    
+    def iter_pdf_lessons(self, source: PdfSource, digest: Optional[str] = None) -> Iterator[Dict]:
+        """Streaming counterpart of parse_scheme for PDFs.
+
+        When a lesson table header is found in the first pages, each table
+        row is yielded as soon as the next one starts; otherwise the page
+        text goes through iter_lessons as before.
+        """
+        if self.text_cache is not None:
+            digest = digest or content_digest(source)
+            text = self.text_cache.get(digest, TEXT_EXTRACTOR_VERSION)
+            rows_json = self.text_cache.get(digest, TABLE_EXTRACTOR_VERSION)
+            if text is not None and rows_json is not None:
+                lessons = list(self.iter_row_lessons(json.loads(rows_json)))
+                if lessons:
+                    yield from map(self.enhance_lesson_data, lessons)
+                else:
+                    yield from self.iter_lessons(SchemeDocument(text).iter_lines())
+                return
+        
+        lesson_count = 0
+        doc = _open_pdf(source)
+        try:
+            extractor = GeometricTableExtractor()
+            head_pages = []
+            for page_num in range(min(TABLE_HEADER_PAGES, len(doc))):
+                page_text, words, page_width = _extract_page(doc[page_num])
+                head_pages.append((page_text, extractor.add_page(words, page_width)))
+                if extractor.column_model is not None:
+                    break
+            
+            if extractor.column_model is None:
+                lines = chain(
+                    chain.from_iterable(self._page_lines(n, page_text) for n, (page_text, _) in enumerate(head_pages)),
+                    chain.from_iterable(self._page_lines(n, _extract_page_text(doc[n]))
+                                        for n in range(len(head_pages), len(doc))),
+                    [''],
+                )
+                yield from self.iter_lessons(lines)
+                return
+            
+            def rows():
+                for _, page_rows in head_pages:
+                    yield from page_rows
+                for n in range(len(head_pages), len(doc)):
+                    page = doc[n]
+                    yield from extractor.add_page(page.get_text("words"), page.rect.width)
+                yield from extractor.finish()
+            
+            for lesson in self.iter_row_lessons(rows()):
+                lesson_count += 1
+                yield self.enhance_lesson_data(lesson)
+        finally:
+            doc.close()
+        
+        if lesson_count == 0:
+            # A table header without usable rows; parse the text like parse_scheme does
+            yield from self.iter_lessons(self.iter_pdf_lines(source, digest))
+    
+    def detect_table_structure(self, text: Union[str, SchemeDocument]) -> Dict[str, List[str]]:
         """Detect if content is in table format and extract column headers"""
-        lines = text.split('\n')
+        document = SchemeDocument.coerce(text)
         
         # Look for header patterns - more flexible approach
         potential_headers = []
@@ -172,8 +457,8 @@ class EnhancedSchemeParser:
             'experience', 'inquiry', 'question', 'resource', 'assessment', 'method'
         ]
         
-        for i, line in enumerate(lines[:30]):  # Check first 30 lines for headers
-            line = line.strip().lower()
+        for i, (original_line, line) in enumerate(document.iter_line_pairs(0, 30)):  # Check first 30 lines for headers
+            line = line.strip()
             if not line:
                 continue
             
@@ -182,7 +467,7 @@ class EnhancedSchemeParser:
             
             if indicator_count >= 4:  # If line contains multiple indicators, likely a header
                 # Try different splitting strategies
-                original_line = lines[i].strip()
+                original_line = original_line.strip()
                 
                 # Strategy 1: Split by multiple spaces
                 if '  ' in original_line:
@@ -203,38 +488,96 @@ class EnhancedSchemeParser:
         
         return potential_headers
     
-    def parse_table_format(self, text: str) -> List[Dict]:
+    def parse_table_format(self, text: Union[str, SchemeDocument],
+                           progress: Optional[ProgressCallback] = None) -> List[Dict]:
         """Parse table-formatted scheme of work"""
-        table_info = self.detect_table_structure(text)
-        lessons = []
+        document = SchemeDocument.coerce(text)
+        table_info = self.detect_table_structure(document)
         
         if not table_info:
-            return self.parse_free_format(text)
+            return self.parse_free_format(document, progress)
         
+        lessons = self.iter_table_lessons(document.iter_lines(), table_info[0])
+        if progress:
+            lessons = self._report_lessons(lessons, progress)
+        return list(lessons)
+    
+    def iter_table_lessons(self, lines: Iterable[str], table_header: Tuple) -> Iterator[Dict]:
+        """Yield lessons from the data rows that follow a detected table header"""
+        for _, lesson in self.iter_table_line_lessons(lines, table_header):
+            if lesson:
+                yield lesson
+    
+    def iter_table_line_lessons(self, lines: Iterable[str], table_header: Tuple,
+                                start: int = 0) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """(line index, lesson or None) for each line after a detected table header, from line start on"""
         # Use the first detected table structure
-        header_line_idx, headers, separator = table_info[0]
+        header_line_idx, headers, separator = table_header
         
         # Map headers to our standard fields
         header_mapping = self.map_headers_to_fields(headers)
         
-        lines = text.split('\n')
-        
         # Process data rows after header
-        for i in range(header_line_idx + 1, len(lines)):
-            line = lines[i].strip()
-            if not line:
-                continue
+        first_line = max(header_line_idx + 1, start)
+        for line_index, line in enumerate(islice(lines, first_line, None), first_line):
+            line = line.strip()
+            lesson = None
                 
             # Check if this is a data row
-            if line.count(separator) >= len(headers) - 2:  # Allow some flexibility
+            if line and line.count(separator) >= len(headers) - 2:  # Allow some flexibility
                 columns = [col.strip() for col in line.split(separator)]
                 
                 if len(columns) >= len(headers) // 2:  # At least half the expected columns
                     lesson = self.extract_lesson_from_row(columns, header_mapping)
-                    if lesson:
-                        lessons.append(lesson)
-        
-        return lessons
+            yield line_index, lesson
+    
+    def iter_row_lessons(self, rows: Iterable[Dict[str, str]]) -> Iterator[Dict]:
+        """Yield lessons from geometric table rows ({field: cell text} in column order)"""
+        for row in rows:
+            lesson = self.extract_lesson_from_row(list(row.values()), dict(enumerate(row)))
+            if lesson:
+                yield lesson
+    
+    def _report_lessons(self, lessons: Iterable[Dict], progress: ProgressCallback) -> Iterator[Dict]:
+        """Pass table lessons through, reporting each lesson and each new week segment"""
+        week = None
+        weeks_found = 0
+        for count, lesson in enumerate(lessons, 1):
+            if lesson['week'] != week:
+                week = lesson['week']
+                weeks_found += 1
+                progress('weeks', weeks_found, None, week=week)
+            progress('lessons', count, None, week=week)
+            yield lesson
+    
+    def iter_resumable_lessons(self, document: SchemeDocument, stage: str,
+                               start: int = 0) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """(position, lesson or None) for each unit of one parse_document stage, from position start on.
+
+        The 'rows' stage reads the geometric table rows and the 'text' stage
+        the text's table rows, or its week blocks when no table header is
+        found. Positions are row, line or block indices, so a parse stopped
+        before a unit resumes from that unit's position with the same result.
+        """
+        if stage == 'rows':
+            rows = document.table_rows or []
+            for row_index in range(start, len(rows)):
+                row = rows[row_index]
+                yield row_index, self.extract_lesson_from_row(list(row.values()), dict(enumerate(row)))
+            return
+        
+        table_info = self.detect_table_structure(document)
+        if table_info:
+            yield from self.iter_table_line_lessons(document.iter_lines(), table_info[0], start)
+            return
+        
+        # Strands are classified a batch of blocks at a time, so stopping early skips the rest
+        blocks = list(self.iter_lesson_blocks(document))
+        for batch_start in range(start, len(blocks), RESUMABLE_STRAND_BATCH):
+            batch = blocks[batch_start:batch_start + RESUMABLE_STRAND_BATCH]
+            strands = self.identify_strands_many([self.block_content(block) for block in batch])
+            for block_index, (block, block_strands) in enumerate(zip(batch, strands), batch_start):
+                yield block_index, self.extract_lesson_from_block(block, block_strands)
     
     def map_headers_to_fields(self, headers: List[str]) -> Dict[int, str]:
         """Map table headers to our standard field names"""
@@ -322,65 +665,71 @@ class EnhancedSchemeParser:
         
         return items
     
-    def parse_free_format(self, text: str) -> List[Dict]:
+    def parse_free_format(self, text: Union[str, SchemeDocument],
+                          progress: Optional[ProgressCallback] = None) -> List[Dict]:
         """Parse free-format text when table structure is not clear"""
         lessons = []
-        lines = text.split('\n')
-        
-        # Look for week/lesson patterns in the text
-        current_lesson = None
-        current_field = None
-        
-        # Enhanced week detection patterns
-        week_patterns = [
-            r'(?:week|wk|w)\s*[:\-]?\s*(\d+)',
-            r'^(\d+)\s*$',  # Just a number on its own line
-            r'(\d+)\s+(?:week|wk)',
-            r'^(\d+)\s+\d+',  # Pattern like "1 1" (week lesson)
-        ]
         
-        # Track content blocks for each lesson
-        lesson_blocks = []
+        blocks = []
+        for weeks_found, block in enumerate(self.iter_lesson_blocks(SchemeDocument.coerce(text)), 1):
+            if progress:
+                progress('weeks', weeks_found, None, week=block[0][1])
+            blocks.append(block)
+        
+        # Classify the strands of every block in one batch
+        strands = self.identify_strands_many([self.block_content(block) for block in blocks])
+        
+        # Process each lesson block
+        for block, block_strands in zip(blocks, strands):
+            lesson = self.extract_lesson_from_block(block, block_strands)
+            if lesson:
+                lessons.append(lesson)
+                if progress:
+                    progress('lessons', len(lessons), None, week=lesson['week'])
+        
+        return lessons
+    
+    def iter_lesson_blocks(self, lines: Union[Iterable[str], SchemeDocument]) -> Iterator[List]:
+        """Group lines into per-week content blocks, yielding each block as soon as it is complete"""
+        if isinstance(lines, SchemeDocument):
+            # A whole document is segmented in one pass and read block by block
+            segmentation = FREE_FORMAT_SEGMENTER.segment(lines)
+            codes = segmentation.codes
+            for week_num, header, end in segmentation.week_blocks():
+                block = [('week', week_num), ('raw_content', [lines.line(header).strip()])]
+                block.extend(('content', lines.line(index).strip()) for index in range(header + 1, end) if codes[index] != BLANK)
+                yield block
+            return
+        
+        # Track content block for the current lesson
         current_block = []
         
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
+        for line in lines:
+            code, week_num = FREE_FORMAT_SEGMENTER.classify(line)
+            if code == BLANK:
                 continue
+            line = line.strip()
             
             # Check if this line indicates a new week/lesson
-            found_week = False
-            for pattern in week_patterns:
-                match = re.search(pattern, line.lower())
-                if match:
-                    # Save previous block if exists
-                    if current_block:
-                        lesson_blocks.append(current_block.copy())
-                        current_block = []
-                    
-                    week_num = int(match.group(1))
-                    current_block = [('week', week_num), ('raw_content', [line])]
-                    found_week = True
-                    break
-            
-            if not found_week and current_block:
+            if code == WEEK_HEADER:
+                # Emit previous block if exists
+                if current_block:
+                    yield current_block
+                current_block = [('week', week_num), ('raw_content', [line])]
+            elif current_block:
                 # Add to current block
                 current_block.append(('content', line))
         
-        # Save the last block
+        # Emit the last block
         if current_block:
-            lesson_blocks.append(current_block)
-        
-        # Process each lesson block
-        for block in lesson_blocks:
-            lesson = self.extract_lesson_from_block(block)
-            if lesson:
-                lessons.append(lesson)
-        
-        return lessons
+            yield current_block
     
-    def extract_lesson_from_block(self, block: List) -> Optional[Dict]:
-        """Extract lesson data from a content block"""
+    def block_content(self, block: List) -> str:
+        """A block's content lines joined into one string"""
+        return ' '.join(content for item_type, content in block if item_type == 'content')
+    
+    def extract_lesson_from_block(self, block: List, strands: Optional[Tuple[str, str]] = None) -> Optional[Dict]:
+        """Extract lesson data from a content block (strands: its strand and sub-strand, if already known)"""
         lesson = {
             'week': None, 'lessonNumber': 1, 'title': '', 'strand': '', 'sub_strand': '',
             'specific_learning_outcomes': [], 'core_competencies': [],
@@ -394,17 +743,11 @@ class EnhancedSchemeParser:
                 lesson['week'] = content
                 break
         
-        # Process content lines
-        content_lines = []
-        for item_type, content in block:
-            if item_type == 'content':
-                content_lines.append(content)
-        
         # Join all content and try to extract information
-        full_content = ' '.join(content_lines)
+        full_content = self.block_content(block)
         
         # Use patterns to extract different sections
-        self.extract_lesson_components(full_content, lesson)
+        self.extract_lesson_components(full_content, lesson, strands)
         
         # Only return if we have minimum viable data
         if lesson['week'] and (lesson['strand'] or lesson['title'] or lesson['specific_learning_outcomes']):
@@ -412,16 +755,39 @@ class EnhancedSchemeParser:
         
         return None
     
+    def get_strand_identifier(self):
+        """Return this parser's ImprovedStrandIdentifier, or None if it cannot be imported"""
+        if self._strand_identifier is None:
+            # Import here to avoid circular imports
+            try:
+                from improved_strand_identifier import ImprovedStrandIdentifier
+            except ImportError:
+                return None
+            self._strand_identifier = ImprovedStrandIdentifier()
+        return self._strand_identifier
+    
+    def identify_strand_and_substrand(self, content: str) -> Tuple[str, str]:
+        """Identify a block's strand and sub-strand together, sharing one taxonomy scan"""
+        identifier = self.get_strand_identifier()
+        if identifier is None:
+            strand = self._fallback_strand_identification(content)
+            return strand, self._fallback_substrand_identification(content, strand)
+        return identifier.identify(content)
+    
+    def identify_strands_many(self, contents: List[str]) -> List[Tuple[str, str]]:
+        """identify_strand_and_substrand() for many blocks, scored against the taxonomy as one batch"""
+        identifier = self.get_strand_identifier()
+        if identifier is None:
+            return [self.identify_strand_and_substrand(content) for content in contents]
+        return identifier.identify_many(contents)
+    
     def identify_strand_from_content(self, content: str) -> str:
         """Enhanced strand identification using improved CBC-specific logic"""
-        # Import here to avoid circular imports
-        try:
-            from improved_strand_identifier import ImprovedStrandIdentifier
-            identifier = ImprovedStrandIdentifier()
-            return identifier.identify_strand(content)
-        except ImportError:
+        identifier = self.get_strand_identifier()
+        if identifier is None:
             # Fallback to original logic if import fails
             return self._fallback_strand_identification(content)
+        return identifier.identify_strand(content)
     
     def _fallback_strand_identification(self, content: str) -> str:
         """Fallback strand identification method"""
@@ -435,7 +801,7 @@ class EnhancedSchemeParser:
         ]
         
         for pattern in explicit_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+            match = linear_pattern(pattern, re.IGNORECASE).search(content)
             if match:
                 strand = match.group(1).strip()
                 if len(strand) > 2 and len(strand) < 50:  # Reasonable length
@@ -473,14 +839,11 @@ class EnhancedSchemeParser:
     
     def identify_substrand_from_content(self, content: str, strand: str) -> str:
         """Enhanced sub-strand identification using improved logic"""
-        # Import here to avoid circular imports
-        try:
-            from improved_strand_identifier import ImprovedStrandIdentifier
-            identifier = ImprovedStrandIdentifier()
-            return identifier.identify_substrand(content, strand)
-        except ImportError:
+        identifier = self.get_strand_identifier()
+        if identifier is None:
             # Fallback to original logic if import fails
             return self._fallback_substrand_identification(content, strand)
+        return identifier.identify_substrand(content, strand)
     
     def _fallback_substrand_identification(self, content: str, strand: str) -> str:
         """Fallback sub-strand identification method"""
@@ -494,7 +857,7 @@ class EnhancedSchemeParser:
         ]
         
         for pattern in substrand_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+            match = linear_pattern(pattern, re.IGNORECASE).search(content)
             if match:
                 substrand = match.group(1).strip()
                 if len(substrand) > 2 and len(substrand) < 100:
@@ -504,12 +867,12 @@ class EnhancedSchemeParser:
         if strand != "General":
             # Extract content that comes after the strand mention
             strand_pattern = re.escape(strand.lower())
-            match = re.search(f'{strand_pattern}[:\-]?\s*([A-Za-z\s,]+?)(?:\s+by\s+the\s+end|$)', content_lower)
+            match = linear_pattern(f'{strand_pattern}[:\-]?\s*([A-Za-z\s,]+?)(?:\s+by\s+the\s+end|$)').search(content_lower)
             if match:
                 potential_substrand = match.group(1).strip()
                 # Clean up common prefixes/suffixes
                 potential_substrand = re.sub(r'^(and|or|the|a|an)\s+', '', potential_substrand)
-                potential_substrand = re.sub(r'\s+(and|or|the|a|an)$', '', potential_substrand)
+                potential_substrand = re.sub(r'(?<!\s)\s+(and|or|the|a|an)$', '', potential_substrand)
                 if len(potential_substrand) > 2:
                     return self.normalize_strand_name(potential_substrand.title())
         
@@ -523,7 +886,7 @@ class EnhancedSchemeParser:
         ]
         
         for pattern in descriptive_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+            match = linear_pattern(pattern, re.IGNORECASE).search(content)
             if match:
                 substrand = match.group(1).strip()
                 if 3 <= len(substrand) <= 50:
@@ -536,40 +899,7 @@ class EnhancedSchemeParser:
         strand = strand.strip()
         
         # Common normalizations
-        normalizations = {
-            'maths': 'Mathematics',
-            'math': 'Mathematics',
-            'numbers': 'Numbers',
-            'geometry': 'Geometry',
-            'measurement': 'Measurement',
-            'data': 'Data Handling',
-            'science': 'Science',
-            'living things': 'Living Things',
-            'non living': 'Non-Living Things',
-            'energy': 'Energy',
-            'environment': 'Environment',
-            'health': 'Health Education',
-            'english': 'English',
-            'kiswahili': 'Kiswahili',
-            'listening': 'Listening and Speaking',
-            'speaking': 'Listening and Speaking',
-            'reading': 'Reading',
-            'writing': 'Writing',
-            'social studies': 'Social Studies',
-            'history': 'History',
-            'geography': 'Geography',
-            'citizenship': 'Citizenship',
-            'creative arts': 'Creative Arts',
-            'visual arts': 'Visual Arts',
-            'performing arts': 'Performing Arts',
-            'pe': 'Physical Education',
-            'physical education': 'Physical Education',
-            'ict': 'ICT',
-            'computing': 'ICT',
-            'computer': 'ICT',
-            're': 'Religious Education',
-            'religious education': 'Religious Education',
-        }
+        normalizations = get_taxonomy().normalizations
         
         strand_lower = strand.lower()
         if strand_lower in normalizations:
@@ -578,7 +908,7 @@ class EnhancedSchemeParser:
         # Capitalize properly
         return ' '.join(word.capitalize() for word in strand.split())
     
-    def extract_lesson_components(self, content: str, lesson: Dict):
+    def extract_lesson_components(self, content: str, lesson: Dict, strands: Optional[Tuple[str, str]] = None):
         """Enhanced lesson component extraction with better strand identification"""
         content_lower = content.lower()
         
@@ -595,8 +925,7 @@ class EnhancedSchemeParser:
             lesson['title'] = ''
         
         # Use enhanced strand identification
-        lesson['strand'] = self.identify_strand_from_content(content)
-        lesson['sub_strand'] = self.identify_substrand_from_content(content, lesson['strand'])
+        lesson['strand'], lesson['sub_strand'] = strands or self.identify_strand_and_substrand(content)
         
         # Set title if not present
         if not lesson['title']:
@@ -605,80 +934,38 @@ class EnhancedSchemeParser:
             elif lesson['strand']:
                 lesson['title'] = lesson['strand']
         
-        # Extract learning outcomes (look for "by the end" pattern)
-        outcome_patterns = [
-            r'by\s+the\s+end[^:]*?:\s*([^?]+?)(?:\s+how\s+|$)',
-            r'learner[s]?\s+should\s+be\s+able\s+to[:\s]*([^?]+?)(?:\s+how\s+|$)',
-            r'objective[s]?[:\s]*([^?]+?)(?:\s+how\s+|$)',
-            r'learning\s+outcome[s]?[:\s]*([^?]+?)(?:\s+how\s+|$)',
-        ]
-        
-        for pattern in outcome_patterns:
-            match = re.search(pattern, content_lower)
-            if match:
-                outcomes_text = match.group(1)
-                # Split by common separators
-                outcomes = []
-                for sep in ['a)', 'b)', 'c)', 'd)', 'e)', '•', '-', '\n']:
-                    if sep in outcomes_text:
-                        parts = outcomes_text.split(sep)
-                        outcomes.extend([part.strip() for part in parts if part.strip()])
-                        break
-                if not outcomes:
-                    outcomes = [outcomes_text.strip()]
-                lesson['specific_learning_outcomes'] = [o for o in outcomes if len(o) > 5]
-                break
-        
-        # Extract key inquiry question
-        inquiry_patterns = [
-            r'how\s+can\s+[^?]*?\?',
-            r'what\s+[^?]*?\?',
-            r'why\s+[^?]*?\?',
-            r'when\s+[^?]*?\?',
-            r'where\s+[^?]*?\?',
-            r'inquiry\s+question[s]?[:\s]*([^.]+[?.])',
-        ]
-        
-        for pattern in inquiry_patterns:
-            match = re.search(pattern, content_lower)
-            if match:
-                if pattern.endswith('[?.]'):
-                    lesson['key_inquiry_question'] = match.group(1).strip().capitalize()
-                else:
-                    lesson['key_inquiry_question'] = match.group(0).strip().capitalize()
-                break
+        found = LESSON_COMPONENT_LEXICON.scan(content_lower)
+
+        # Learning outcomes (the "by the end" pattern first)
+        if found.outcomes is not None:
+            outcomes_text = found.outcomes
+            # Split by common separators
+            outcomes = []
+            for sep in ['a)', 'b)', 'c)', 'd)', 'e)', '•', '-', '\n']:
+                if sep in outcomes_text:
+                    parts = outcomes_text.split(sep)
+                    outcomes.extend([part.strip() for part in parts if part.strip()])
+                    break
+            if not outcomes:
+                outcomes = [outcomes_text.strip()]
+            lesson['specific_learning_outcomes'] = [o for o in outcomes if len(o) > 5]
         
-        # Extract resources with better pattern matching
-        resource_indicators = [
-            'textbook', 'chart', 'cards', 'materials', 'flashcards', 'marbles', 'stones', 
-            'pictures', 'models', 'specimens', 'calculator', 'ruler', 'compass', 'protractor',
-            'computer', 'internet', 'video', 'audio', 'map', 'globe', 'microscope'
-        ]
+        # Key inquiry question
+        if found.inquiry_question:
+            lesson['key_inquiry_question'] = found.inquiry_question.strip().capitalize()
         
+        # Resources: the phrase containing each indicator
         found_resources = []
-        for indicator in resource_indicators:
-            if indicator in content_lower:
-                # Try to extract the phrase containing the indicator
-                pattern = r'([^.]*?' + re.escape(indicator) + r'[^.]*?)(?:\s|$|\.)'
-                match = re.search(pattern, content_lower)
-                if match:
-                    resource_phrase = match.group(1).strip()
-                    if len(resource_phrase) < 100:  # Reasonable length
-                        found_resources.append(resource_phrase.title())
+        for resource_phrase in found.resource_phrases:
+            resource_phrase = resource_phrase.strip()
+            if len(resource_phrase) < 100:  # Reasonable length
+                found_resources.append(resource_phrase.title())
         
         if found_resources:
             lesson['learning_resources'] = list(set(found_resources))  # Remove duplicates
         
         # Enhanced assessment detection
-        assessment_indicators = [
-            'observation', 'written', 'oral', 'questions', 'exercise', 'test', 'quiz',
-            'presentation', 'project', 'assignment', 'homework', 'practical', 'demonstration'
-        ]
-        
-        found_assessments = []
-        for indicator in assessment_indicators:
-            if indicator in content_lower:
-                found_assessments.append(indicator.title())
+        found_assessments = [indicator.title() for indicator in found.assessments]
         
         if found_assessments:
             lesson['assessment'] = ', '.join(set(found_assessments))
@@ -712,41 +999,98 @@ class EnhancedSchemeParser:
         
         return lesson
     
-    def parse_scheme_of_work(self, file_content: bytes, filename: str = "scheme.pdf") -> Dict:
+    def parse_scheme_of_work(self, file_content: PdfSource, filename: str = "scheme.pdf") -> Dict:
         """Alias for parse_scheme method for compatibility"""
         return self.parse_scheme(file_content, filename)
     
-    def parse_scheme(self, file_content: bytes, filename: str) -> Dict:
+    def extract_document(self, file_content: PdfSource, filename: str, digest: Optional[str] = None,
+                         progress: Optional[ProgressCallback] = None) -> SchemeDocument:
+        """Extract an upload's text once, for every parsing strategy to share"""
+        if filename.lower().endswith('.pdf'):
+            try:
+                text, table_rows = self.extract_pdf_content(file_content, digest=digest, progress=progress)
+            except Exception as e:
+                self.logger.error(f"PDF extraction error: {e}")
+                raise Exception(f"Failed to extract text from PDF: {str(e)}")
+            return SchemeDocument(text, filename, 'pdf', table_rows=table_rows)
+        
+        # Handle other formats (implementation needed)
+        if not isinstance(file_content, (bytes, bytearray)):
+            with open(file_content, 'rb') as f:
+                file_content = f.read()
+        return SchemeDocument(file_content.decode('utf-8', errors='ignore'), filename, 'txt')
+    
+    def parse_scheme(self, file_content: PdfSource, filename: str, digest: Optional[str] = None,
+                     progress: Optional[ProgressCallback] = None) -> Dict:
         """Main parsing method"""
         try:
-            # Extract text
-            if filename.lower().endswith('.pdf'):
-                text = self.extract_text_from_pdf(file_content)
-            else:
-                # Handle other formats (implementation needed)
-                text = file_content.decode('utf-8', errors='ignore')
-            
-            # Parse lessons
-            lessons = self.parse_table_format(text)
+            document = self.extract_document(file_content, filename, digest, progress)
+        except Exception as e:
+            self.logger.error(f"Parsing error: {e}")
+            return self._failed_result(e)
+        
+        return self.parse_document(document, progress)
+    
+    def parse_document(self, document: SchemeDocument, progress: Optional[ProgressCallback] = None) -> Dict:
+        """Parse an already extracted document"""
+        try:
+            # Parse lessons, preferring rows rebuilt from the PDF's table geometry
+            row_lessons = self.iter_row_lessons(document.table_rows or [])
+            if progress:
+                row_lessons = self._report_lessons(row_lessons, progress)
+            lessons = list(row_lessons)
+            if not lessons:
+                lessons = self.parse_table_format(document, progress)
             
             # Enhance lesson data
-            enhanced_lessons = [self.enhance_lesson_data(lesson) for lesson in lessons]
-            
-            # Sort by week
-            enhanced_lessons.sort(key=lambda x: x.get('week', 0))
+            enhanced_lessons = []
+            for lesson in lessons:
+                enhanced_lessons.append(self.enhance_lesson_data(lesson))
+                if progress:
+                    progress('enhance', len(enhanced_lessons), len(lessons))
             
-            return {
-                'success': True,
-                'message': f'Successfully parsed {len(enhanced_lessons)} lessons from scheme of work',
-                'lesson_plans': enhanced_lessons,
-                'weeks_found': list(set(lesson.get('week', 1) for lesson in enhanced_lessons))
-            }
+            return self.parsed_result(enhanced_lessons)
             
         except Exception as e:
             self.logger.error(f"Parsing error: {e}")
-            return {
-                'success': False,
-                'message': f'Error parsing scheme: {str(e)}',
-                'lesson_plans': [],
-                'weeks_found': []
-            }
+            return self._failed_result(e)
+    
+    def parsed_result(self, enhanced_lessons: List[Dict]) -> Dict:
+        """parse_document's result for its enhanced lessons (sorted by week in place)"""
+        enhanced_lessons.sort(key=lambda x: x.get('week', 0))
+        return {
+            'success': True,
+            'message': f'Successfully parsed {len(enhanced_lessons)} lessons from scheme of work',
+            'lesson_plans': enhanced_lessons,
+            'weeks_found': list(set(lesson.get('week', 1) for lesson in enhanced_lessons))
+        }
+    
+    def _failed_result(self, error: Exception) -> Dict:
+        return {
+            'success': False,
+            'message': f'Error parsing scheme: {str(error)}',
+            'lesson_plans': [],
+            'weeks_found': []
+        }
+    
+    def iter_lessons(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """Streaming counterpart of parse_table_format + enhance_lesson_data.
+
+        Lessons are yielded in document order as soon as their week block
+        (or table row) is complete, so only a few pages of text are held
+        at any time.
+        """
+        lines = iter(lines)
+        
+        # Table headers are only looked for in the first 30 lines
+        head = list(islice(lines, 30))
+        table_info = self.detect_table_structure('\n'.join(head))
+        all_lines = chain(head, lines)
+        
+        if table_info:
+            lessons = self.iter_table_lessons(all_lines, table_info[0])
+        else:
+            lessons = filter(None, map(self.extract_lesson_from_block, self.iter_lesson_blocks(all_lines)))
+        
+        for lesson in lessons:
+            yield self.enhance_lesson_data(lesson)
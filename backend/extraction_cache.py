@@ -0,0 +1,173 @@
+"""
+Content-addressed on-disk cache for text extracted from uploaded schemes
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional, Union
+
+# Cache settings; the default directory is shared by every worker on the host
+CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "teach-easy-convert", "extracted-text")
+CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "256"))
+CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+_CACHE_SUFFIX = ".txt"
+_TMP_SUFFIX = ".tmp"
+# A temporary file older than this was left by a writer that died before its os.replace
+_STALE_TMP_SECONDS = 15 * 60
+_DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def _owned(stat: os.stat_result) -> bool:
+    return not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+
+
+def content_digest(source: Union[bytes, str]) -> str:
+    """SHA-256 hex digest of an upload's bytes, or of the file at a path"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(_DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """LRU-capped text cache keyed by upload digest and extractor version.
+
+    Entries are plain UTF-8 files. Writers go through a temporary file and
+    os.replace, so concurrent uvicorn workers only ever see complete entries.
+    A hit refreshes the file's mtime, which is what eviction orders by.
+    The directory may sit in the shared temp dir, so it is created private
+    and entries are only read from, or written to, a directory this user owns.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_MB * 1024 * 1024):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _trusted(self) -> bool:
+        """Whether the cache directory is this user's, so no one else can plant or read entries"""
+        try:
+            trusted = _owned(os.stat(self.cache_dir))
+        except OSError:
+            return False
+        if not trusted:
+            self.logger.warning(f"Ignoring extraction cache {self.cache_dir}: it belongs to another user")
+        return trusted
+
+    def _path(self, digest: str, extractor_version: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}-{extractor_version}{_CACHE_SUFFIX}")
+
+    def get(self, digest: str, extractor_version: str) -> Optional[str]:
+        """Return cached text, or None on a miss"""
+        if not self._trusted():
+            return None
+        path = self._path(digest, extractor_version)
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                if not _owned(os.fstat(f.fileno())):
+                    return None
+                text = f.read()
+        except OSError:
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # evicted by another worker in the meantime; the text is still valid
+        return text
+
+    def put(self, digest: str, extractor_version: str, text: str) -> None:
+        """Store text atomically, then trim the cache back under its size cap"""
+        if not self._trusted():
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=_TMP_SUFFIX)
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(digest, extractor_version))
+        except OSError as e:
+            # Caching is best-effort; a full or read-only disk must not fail the upload
+            self.logger.warning(f"Could not write extraction cache entry: {e}")
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes; returns files removed.
+
+        Temporary files abandoned by a crashed writer are deleted too. Ones
+        still being written count towards max_bytes but are left alone.
+        """
+        entries = []
+        stale = []
+        total = 0
+        stale_before = time.time() - _STALE_TMP_SECONDS
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                is_tmp = entry.name.endswith(_TMP_SUFFIX)
+                if not (is_tmp or entry.name.endswith(_CACHE_SUFFIX)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if is_tmp and stat.st_mtime < stale_before:
+                    stale.append(entry.path)
+                    continue
+                if not is_tmp:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        removed = 0
+        for path in stale:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # another worker evicted it first
+            total -= size
+        return removed
+
+    def get_or_extract(self, source: Union[bytes, str], extractor_version: str, extract,
+                       digest: Optional[str] = None) -> str:
+        """Return cached text for an upload (bytes or path), running extract(source) on a miss"""
+        digest = digest or content_digest(source)
+        text = self.get(digest, extractor_version)
+        if text is None:
+            text = extract(source)
+            self.put(digest, extractor_version, text)
+        return text
+
+
+_default_cache = None
+
+
+def get_default_cache() -> Optional[ExtractionCache]:
+    """Process-wide cache instance, or None when caching is disabled"""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+    return _default_cache
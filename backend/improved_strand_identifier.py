@@ -2,156 +2,331 @@
 Improved Strand Identification System for CBC Lesson Plans
 """
 import re
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 
-class ImprovedStrandIdentifier:
-    def __init__(self):
-        # Enhanced CBC-specific strand mapping with aliases
-        self.cbc_strands = {
-            'mathematics': {
-                'aliases': ['math', 'maths', 'mathematics', 'arithmetic'],
-                'sub_strands': {
-                    'numbers': ['number', 'numeration', 'counting', 'place value', 'whole numbers', 'integers', 'fractions', 'decimals', 'percentages'],
-                    'geometry': ['shapes', 'geometric', '2d', '3d', 'lines', 'angles', 'polygons', 'circles', 'spatial'],
-                    'measurement': ['measuring', 'length', 'mass', 'weight', 'time', 'capacity', 'volume', 'area', 'perimeter'],
-                    'data handling': ['data', 'statistics', 'graphs', 'charts', 'probability', 'statistics'],
-                    'algebra': ['patterns', 'equations', 'expressions', 'variables', 'functions'],
-                    'money': ['currency', 'coins', 'notes', 'buying', 'selling', 'profit', 'loss']
-                }
-            },
-            'science': {
-                'aliases': ['science', 'sciences', 'natural science'],
-                'sub_strands': {
-                    'living things': ['life', 'biology', 'plants', 'animals', 'human body', 'organisms', 'cells', 'habitats', 'ecosystems'],
-                    'non-living things': ['matter', 'materials', 'substances', 'physics', 'properties', 'states of matter'],
-                    'energy': ['force', 'motion', 'electricity', 'magnetism', 'heat', 'light', 'sound', 'renewable'],
-                    'environment': ['ecology', 'conservation', 'pollution', 'weather', 'climate', 'natural resources'],
-                    'health education': ['health', 'hygiene', 'nutrition', 'disease', 'safety', 'first aid', 'mental health']
-                }
-            },
-            'english': {
-                'aliases': ['english', 'language arts', 'literacy'],
-                'sub_strands': {
-                    'listening and speaking': ['listening', 'speaking', 'oral', 'conversation', 'presentation', 'communication'],
-                    'reading': ['reading', 'comprehension', 'phonics', 'fluency', 'vocabulary'],
-                    'writing': ['writing', 'composition', 'spelling', 'grammar', 'handwriting', 'creative writing']
-                }
-            },
-            'kiswahili': {
-                'aliases': ['kiswahili', 'swahili', 'kusoma', 'kuandika'],
-                'sub_strands': {
-                    'kusikiliza na kuzungumza': ['kusikiliza', 'kuzungumza', 'mazungumzo', 'maongezi'],
-                    'kusoma': ['kusoma', 'ufahamu', 'msamiati'],
-                    'kuandika': ['kuandika', 'utunzi', 'sarufi', 'imla']
-                }
-            },
-            'social studies': {
-                'aliases': ['social studies', 'social science', 'history and government'],
-                'sub_strands': {
-                    'history': ['history', 'historical', 'past', 'heritage', 'culture', 'civilization'],
-                    'geography': ['geography', 'maps', 'location', 'physical features', 'climate', 'regions'],
-                    'citizenship': ['citizenship', 'civic', 'government', 'rights', 'responsibilities', 'democracy'],
-                    'economics': ['economics', 'trade', 'resources', 'production', 'consumption', 'business']
-                }
-            },
-            'creative arts': {
-                'aliases': ['creative arts', 'arts', 'fine arts'],
-                'sub_strands': {
-                    'visual arts': ['visual arts', 'drawing', 'painting', 'crafts', 'art', 'sculpture'],
-                    'performing arts': ['performing arts', 'music', 'dance', 'drama', 'theatre', 'instruments'],
-                    'digital arts': ['digital arts', 'computer arts', 'multimedia', 'digital design']
-                }
-            },
-            'ict': {
-                'aliases': ['ict', 'information technology', 'computer studies', 'computing', 'technology'],
-                'sub_strands': {
-                    'computing': ['computing', 'computer', 'hardware', 'software', 'systems'],
-                    'programming': ['programming', 'coding', 'algorithms', 'software development'],
-                    'digital literacy': ['digital literacy', 'internet', 'web', 'online safety', 'digital citizenship']
-                }
-            },
-            'physical education': {
-                'aliases': ['physical education', 'pe', 'sports', 'games'],
-                'sub_strands': {
-                    'motor skills': ['motor skills', 'movement', 'coordination', 'balance', 'agility'],
-                    'games and sports': ['games', 'sports', 'athletics', 'competition', 'team sports'],
-                    'health and fitness': ['fitness', 'exercise', 'physical activity', 'wellness']
-                }
-            },
-            'religious education': {
-                'aliases': ['religious education', 're', 'religion', 'christian education'],
-                'sub_strands': {
-                    'beliefs and practices': ['beliefs', 'faith', 'doctrine', 'teachings', 'practices', 'worship'],
-                    'values and morals': ['values', 'morals', 'ethics', 'character', 'virtues']
-                }
-            }
+from linear_patterns import LazyRunPattern, linear_pattern
+
+try:
+    import numpy as np
+except ImportError:  # identify_many then scores blocks one at a time
+    np = None
+
+# Distinct words whose phrase hits are remembered by each compiled taxonomy
+TOKEN_CACHE_SIZE = 65536
+
+# Kinds of taxonomy phrase
+STRAND_NAME, STRAND_ALIAS, SUB_STRAND_KEYWORD = range(3)
+
+_WORD = re.compile(r'\w+')
+
+
+class CompiledTaxonomy:
+    """CBC strands flattened into phrase entries with an inverted index over words.
+
+    Entries keep the order of the strand mapping, which decides ties. scan()
+    tokenizes a text once and finds every phrase it contains, noting whether
+    each one also appears as whole words (as r'\\b' + phrase + r'\\b' would).
+    Single-word phrases are looked up per distinct word, with each word's hits
+    cached; the few multi-word phrases are searched for directly.
+    """
+
+    def __init__(self, cbc_strands: Dict, strand_patterns: Optional[Dict[str, str]] = None,
+                 normalizations: Optional[Dict[str, str]] = None, version: str = 'unversioned',
+                 digest: Optional[str] = None):
+        self.cbc_strands = cbc_strands
+        self.strand_patterns = strand_patterns or {}
+        self.normalizations = normalizations or {}
+        self.version = version
+        self.digest = digest
+        # One (kind, strand, sub_strand or None, phrase) per entry
+        self.entries: List[Tuple[int, str, Optional[str], str]] = []
+        for strand_name, strand_data in cbc_strands.items():
+            self.entries.append((STRAND_NAME, strand_name, None, strand_name))
+            for alias in strand_data['aliases']:
+                self.entries.append((STRAND_ALIAS, strand_name, None, alias))
+            for sub_strand, keywords in strand_data['sub_strands'].items():
+                for keyword in keywords:
+                    self.entries.append((SUB_STRAND_KEYWORD, strand_name, sub_strand, keyword))
+
+        # Single-word phrases, grouped by phrase; everything else is matched against the whole text
+        self._word_phrases: Dict[str, List[int]] = {}
+        self._other_phrases: List[Tuple[str, re.Pattern, List[int]]] = []
+        other_entries: Dict[str, List[int]] = {}
+        for entry_id, (_, _, _, phrase) in enumerate(self.entries):
+            if _WORD.fullmatch(phrase):
+                self._word_phrases.setdefault(phrase, []).append(entry_id)
+            else:
+                other_entries.setdefault(phrase, []).append(entry_id)
+        for phrase, entry_ids in other_entries.items():
+            self._other_phrases.append((phrase, re.compile(r'\b' + re.escape(phrase) + r'\b'), entry_ids))
+        self._sub_strand_entries = {
+            strand_name: [entry_id for entry_id, entry in enumerate(self.entries)
+                          if entry[0] == SUB_STRAND_KEYWORD and entry[1] == strand_name]
+            for strand_name in cbc_strands
         }
+        self._word_hits = lru_cache(maxsize=TOKEN_CACHE_SIZE)(self._find_word_hits)
+        self._weights = None  # built by weight_matrix() on first batch
+
+    def __getstate__(self) -> Dict:
+        # The word cache and weight matrix are rebuilt on demand rather than pickled into snapshots
+        state = self.__dict__.copy()
+        del state['_word_hits']
+        state['_weights'] = None
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._word_hits = lru_cache(maxsize=TOKEN_CACHE_SIZE)(self._find_word_hits)
+
+    def _find_word_hits(self, word: str) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        """Entries whose phrase is inside word, and those whose phrase is the whole word"""
+        inside = []
+        for phrase, entry_ids in self._word_phrases.items():
+            if phrase in word:
+                inside.extend(entry_ids)
+        return tuple(inside), tuple(self._word_phrases.get(word, ()))
+
+    def scan(self, content_lower: str) -> Dict[int, bool]:
+        """Map each entry whose phrase occurs in content_lower to whether it occurs as whole words"""
+        hits = {}
+        # A phrase of word characters can only occur inside a single word of the text
+        for word in set(_WORD.findall(content_lower)):
+            inside, whole = self._word_hits(word)
+            for entry_id in inside:
+                hits.setdefault(entry_id, False)
+            for entry_id in whole:
+                hits[entry_id] = True
+        for phrase, whole_words, entry_ids in self._other_phrases:
+            if phrase in content_lower:
+                whole = whole_words.search(content_lower) is not None
+                for entry_id in entry_ids:
+                    hits[entry_id] = whole
+        return hits
+
+    def best_strand(self, hits: Dict[int, bool]) -> Tuple[Optional[str], float]:
+        """The highest-scoring strand: a strand name or alias scores its length, a sub-strand
+        keyword 1.2x its length as whole words or 0.8x inside other words. Earlier entries win ties."""
+        best_match, max_score = None, 0
+        for entry_id in sorted(hits):
+            kind, strand_name, _, phrase = self.entries[entry_id]
+            if kind != SUB_STRAND_KEYWORD:
+                score = len(phrase)
+            elif hits[entry_id]:
+                score = len(phrase) * 1.2
+            else:
+                score = len(phrase) * 0.8
+            if score > max_score:
+                max_score = score
+                best_match = strand_name
+        return best_match, max_score
+
+    def best_sub_strand(self, hits: Dict[int, bool], strand_name: str) -> Tuple[Optional[str], float]:
+        """The strand's highest-scoring sub-strand: 1.5x the keyword length as whole words, else its length"""
+        best_substrand, max_score = None, 0
+        for entry_id in self._sub_strand_entries.get(strand_name, ()):
+            if entry_id not in hits:
+                continue
+            _, _, sub_strand, keyword = self.entries[entry_id]
+            score = len(keyword) * 1.5 if hits[entry_id] else len(keyword)
+            if score > max_score:
+                max_score = score
+                best_substrand = sub_strand
+        return best_substrand, max_score
+
+    def score(self, content: str) -> Tuple[Optional[str], Optional[str], float]:
+        """Score a block of text in one pass: (strand, sub_strand, strand score), None where nothing matched"""
+        hits = self.scan(content.lower())
+        strand_name, strand_score = self.best_strand(hits)
+        sub_strand = self.best_sub_strand(hits, strand_name)[0] if strand_name else None
+        return strand_name, sub_strand, strand_score
+
+    def scores(self, content_lower: str) -> 'TaxonomyScores':
+        return TaxonomyScores(self, content_lower)
+
+    def score_many(self, contents: List[str]) -> 'TaxonomyBatch':
+        """Score many blocks at once with NumPy (which must be installed)"""
+        return TaxonomyBatch(self, [self.scan(content.lower()) for content in contents])
+
+    def weight_matrix(self):
+        """Per-entry weights, rows: strand score as whole words / inside other words,
+        then sub-strand score as whole words / inside other words (0 for names and aliases)"""
+        if self._weights is None:
+            weights = np.zeros((4, len(self.entries)))
+            for entry_id, (kind, _, _, phrase) in enumerate(self.entries):
+                if kind == SUB_STRAND_KEYWORD:
+                    weights[:, entry_id] = (len(phrase) * 1.2, len(phrase) * 0.8, len(phrase) * 1.5, len(phrase))
+                else:
+                    weights[:2, entry_id] = len(phrase)
+            self._weights = weights
+        return self._weights
+
+
+class TaxonomyScores:
+    """Strand and sub-strand winners for one block, scanning it only when first asked"""
+
+    def __init__(self, taxonomy: CompiledTaxonomy, content_lower: str):
+        self.taxonomy = taxonomy
+        self.content_lower = content_lower
+        self._hits = None
+
+    @property
+    def hits(self) -> Dict[int, bool]:
+        if self._hits is None:
+            self._hits = self.taxonomy.scan(self.content_lower)
+        return self._hits
+
+    def best_strand(self) -> Tuple[Optional[str], float]:
+        return self.taxonomy.best_strand(self.hits)
+
+    def best_sub_strand(self, strand_name: str) -> Tuple[Optional[str], float]:
+        return self.taxonomy.best_sub_strand(self.hits, strand_name)
+
+
+class TaxonomyBatch:
+    """Strand and sub-strand winners for a batch of blocks, scored with NumPy.
+
+    The block x entry hit matrices (as whole words, inside other words) are
+    weighted by the taxonomy's weight matrix, and the best entry of each row
+    is taken with argmax. argmax keeps the first of equal scores, which is
+    the same tie-break as CompiledTaxonomy.best_strand().
+    """
+
+    def __init__(self, taxonomy: CompiledTaxonomy, hits: List[Dict[int, bool]]):
+        self.taxonomy = taxonomy
+        rows, columns, whole = [], [], []
+        for row, block_hits in enumerate(hits):
+            rows.extend([row] * len(block_hits))
+            columns.extend(block_hits)
+            whole.extend(block_hits.values())
+        whole_words = np.zeros((len(hits), len(taxonomy.entries)))
+        inside_words = np.zeros_like(whole_words)
+        whole = np.array(whole, dtype=bool)
+        rows, columns = np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)
+        whole_words[rows[whole], columns[whole]] = 1
+        inside_words[rows[~whole], columns[~whole]] = 1
+
+        weights = taxonomy.weight_matrix()
+        strand_scores = whole_words * weights[0] + inside_words * weights[1]
+        self._best_entry = strand_scores.argmax(axis=1)
+        self._best_score = strand_scores.max(axis=1, initial=0)
+
+        sub_strand_scores = whole_words * weights[2] + inside_words * weights[3]
+        self._best_sub_strand = {}
+        for strand_name, entry_ids in taxonomy._sub_strand_entries.items():
+            if entry_ids:
+                scores = sub_strand_scores[:, entry_ids]
+                self._best_sub_strand[strand_name] = (
+                    np.asarray(entry_ids)[scores.argmax(axis=1)], scores.max(axis=1)
+                )
+
+    def __len__(self) -> int:
+        return len(self._best_entry)
+
+    def best_strand(self, index: int) -> Tuple[Optional[str], float]:
+        score = float(self._best_score[index])
+        if not score:
+            return None, 0
+        return self.taxonomy.entries[self._best_entry[index]][1], score
+
+    def best_sub_strand(self, index: int, strand_name: str) -> Tuple[Optional[str], float]:
+        if strand_name not in self._best_sub_strand:
+            return None, 0
+        entry_ids, scores = self._best_sub_strand[strand_name]
+        score = float(scores[index])
+        if not score:
+            return None, 0
+        return self.taxonomy.entries[entry_ids[index]][2], score
+
+    def scores(self, index: int) -> '_BatchScores':
+        return _BatchScores(self, index)
+
+
+class _BatchScores:
+    """One block of a TaxonomyBatch, answering like TaxonomyScores"""
+
+    def __init__(self, batch: TaxonomyBatch, index: int):
+        self.batch = batch
+        self.index = index
+        self.taxonomy = batch.taxonomy
+
+    def best_strand(self) -> Tuple[Optional[str], float]:
+        return self.batch.best_strand(self.index)
+
+    def best_sub_strand(self, strand_name: str) -> Tuple[Optional[str], float]:
+        return self.batch.best_sub_strand(self.index, strand_name)
+
+
+def get_compiled_taxonomy() -> CompiledTaxonomy:
+    """Return the current taxonomy from cbc_taxonomy.yaml, shared within the process"""
+    # Import here to avoid circular imports
+    from cbc_taxonomy import get_taxonomy
+    return get_taxonomy()
+
+
+class ImprovedStrandIdentifier:
+    def __init__(self, taxonomy: Optional[CompiledTaxonomy] = None):
+        # Without an explicit taxonomy, follow edits to cbc_taxonomy.yaml (loaded now so workers start warm)
+        self._taxonomy = taxonomy
+        if taxonomy is None:
+            get_compiled_taxonomy()
         
-        # Explicit strand patterns for better detection
+        # Explicit strand patterns for better detection (lazy phrase patterns are searched in linear time)
         self.strand_patterns = [
-            r'strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+sub[\-\s]*strand|$|\.|\n)',
-            r'subject[:\-]?\s*([A-Za-z\s]+?)(?:\s+topic|$|\.|\n)',
-            r'theme[:\-]?\s*([A-Za-z\s]+?)(?:\s+sub|$|\.|\n)',
-            r'^([A-Z][A-Z\s]+?)[:\-]\s*',  # ALL CAPS followed by colon
-            r'learning\s+area[:\-]?\s*([A-Za-z\s]+?)(?:\s+topic|$|\.|\n)',
+            LazyRunPattern(r'strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+sub[\-\s]*strand|$|\.|\n)', re.IGNORECASE),
+            LazyRunPattern(r'subject[:\-]?\s*([A-Za-z\s]+?)(?:\s+topic|$|\.|\n)', re.IGNORECASE),
+            LazyRunPattern(r'theme[:\-]?\s*([A-Za-z\s]+?)(?:\s+sub|$|\.|\n)', re.IGNORECASE),
+            re.compile(r'^([A-Z][A-Z\s]+?)[:\-]\s*', re.IGNORECASE),  # ALL CAPS followed by colon
+            LazyRunPattern(r'learning\s+area[:\-]?\s*([A-Za-z\s]+?)(?:\s+topic|$|\.|\n)', re.IGNORECASE),
         ]
         
         self.substrand_patterns = [
-            r'sub[\-\s]*strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)',
-            r'topic[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)',
-            r'sub[\-\s]*topic[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)',
-            r'focus[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)',
+            LazyRunPattern(r'sub[\-\s]*strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)', re.IGNORECASE),
+            LazyRunPattern(r'topic[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)', re.IGNORECASE),
+            LazyRunPattern(r'sub[\-\s]*topic[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)', re.IGNORECASE),
+            LazyRunPattern(r'focus[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)', re.IGNORECASE),
         ]
+
+    @property
+    def taxonomy(self) -> CompiledTaxonomy:
+        return self._taxonomy if self._taxonomy is not None else get_compiled_taxonomy()
+
+    @property
+    def cbc_strands(self) -> Dict:
+        return self.taxonomy.cbc_strands
     
-    def identify_strand(self, content: str) -> str:
+    def identify(self, content: str, scores: Optional[TaxonomyScores] = None) -> Tuple[str, str]:
+        """Identify the strand and sub-strand of a block, scanning it for taxonomy phrases at most once"""
+        if scores is None:
+            scores = self.taxonomy.scores(content.lower())
+        strand = self.identify_strand(content, scores)
+        return strand, self.identify_substrand(content, strand, scores)
+
+    def identify_many(self, blocks: List[str]) -> List[Tuple[str, str]]:
+        """identify() for every block of a document, scoring all blocks against the taxonomy in one batch"""
+        if np is None or not blocks:
+            return [self.identify(block) for block in blocks]
+        batch = self.taxonomy.score_many(blocks)
+        return [self.identify(block, batch.scores(index)) for index, block in enumerate(blocks)]
+
+    def identify_strand(self, content: str, scores: Optional[TaxonomyScores] = None) -> str:
         """Enhanced strand identification using multiple strategies"""
         content = content.strip()
         content_lower = content.lower()
         
         # Strategy 1: Look for explicit strand declarations
         for pattern in self.strand_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+            match = pattern.search(content)
             if match:
                 potential_strand = match.group(1).strip()
                 normalized = self._normalize_and_map_strand(potential_strand)
                 if normalized != "General":
                     return normalized
         
-        # Strategy 2: Match against known CBC strands and aliases
-        best_match = ""
-        max_score = 0
-        
-        for strand_name, strand_data in self.cbc_strands.items():
-            # Check main strand name
-            if strand_name in content_lower:
-                score = len(strand_name)
-                if score > max_score:
-                    max_score = score
-                    best_match = strand_name
-            
-            # Check aliases
-            for alias in strand_data['aliases']:
-                if alias in content_lower:
-                    score = len(alias)
-                    if score > max_score:
-                        max_score = score
-                        best_match = strand_name
-            
-            # Check sub-strand keywords (higher priority for exact matches)
-            for sub_strand, keywords in strand_data['sub_strands'].items():
-                for keyword in keywords:
-                    # Exact word match gets higher score
-                    if re.search(r'\b' + re.escape(keyword) + r'\b', content_lower):
-                        score = len(keyword) * 1.2
-                        if score > max_score:
-                            max_score = score
-                            best_match = strand_name
-                    # Partial match gets lower score
-                    elif keyword in content_lower:
-                        score = len(keyword) * 0.8
-                        if score > max_score:
-                            max_score = score
-                            best_match = strand_name
+        # Strategy 2: Match against known CBC strands, aliases and sub-strand keywords
+        if scores is None:
+            scores = self.taxonomy.scores(content_lower)
+        best_match, _ = scores.best_strand()
         
         if best_match:
             return self._format_strand_name(best_match)
@@ -225,39 +400,25 @@ class ImprovedStrandIdentifier:
         
         return "General"
     
-    def identify_substrand(self, content: str, strand: str) -> str:
+    def identify_substrand(self, content: str, strand: str, scores: Optional[TaxonomyScores] = None) -> str:
         """Enhanced sub-strand identification"""
         content_lower = content.lower()
         strand_lower = strand.lower()
         
         # Strategy 1: Look for explicit sub-strand patterns
         for pattern in self.substrand_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+            match = pattern.search(content)
             if match:
                 substrand = match.group(1).strip()
                 if 2 < len(substrand) < 100:
                     return self._format_strand_name(substrand)
         
         # Strategy 2: Use strand-specific sub-strand mapping
-        if strand_lower in self.cbc_strands:
-            strand_data = self.cbc_strands[strand_lower]
-            best_substrand = ""
-            max_score = 0
-            
-            for sub_strand_name, keywords in strand_data['sub_strands'].items():
-                for keyword in keywords:
-                    # Exact word boundary match gets highest score
-                    if re.search(r'\b' + re.escape(keyword) + r'\b', content_lower):
-                        score = len(keyword) * 1.5
-                        if score > max_score:
-                            max_score = score
-                            best_substrand = sub_strand_name
-                    # Partial match gets lower score
-                    elif keyword in content_lower:
-                        score = len(keyword)
-                        if score > max_score:
-                            max_score = score
-                            best_substrand = sub_strand_name
+        taxonomy = scores.taxonomy if scores is not None else self.taxonomy
+        if strand_lower in taxonomy.cbc_strands:
+            if scores is None:
+                scores = taxonomy.scores(content_lower)
+            best_substrand, _ = scores.best_sub_strand(strand_lower)
             
             if best_substrand:
                 return self._format_strand_name(best_substrand)
@@ -270,12 +431,12 @@ class ImprovedStrandIdentifier:
         ]
         
         for pattern in colon_patterns:
-            match = re.search(pattern, content_lower)
+            match = linear_pattern(pattern).search(content_lower)
             if match:
                 potential = match.group(1).strip()
                 # Clean up
                 potential = re.sub(r'^(and|or|the|a|an|in|of|for|with)\s+', '', potential)
-                potential = re.sub(r'\s+(and|or|the|a|an|in|of|for|with)$', '', potential)
+                potential = re.sub(r'(?<!\s)\s+(and|or|the|a|an|in|of|for|with)$', '', potential)
                 if 2 < len(potential) < 50:
                     return self._format_strand_name(potential)
         
@@ -288,12 +449,12 @@ class ImprovedStrandIdentifier:
             ]
             
             for pattern in patterns:
-                match = re.search(pattern, content_lower)
+                match = linear_pattern(pattern).search(content_lower)
                 if match:
                     potential = match.group(1).strip()
                     # Clean up
                     potential = re.sub(r'^(and|or|the|a|an|in|of|for|with)\s+', '', potential)
-                    potential = re.sub(r'\s+(and|or|the|a|an|in|of|for|with)$', '', potential)
+                    potential = re.sub(r'(?<!\s)\s+(and|or|the|a|an|in|of|for|with)$', '', potential)
                     if 2 < len(potential) < 50:
                         return self._format_strand_name(potential)
         
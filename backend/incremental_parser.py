@@ -0,0 +1,225 @@
+"""
+Incremental re-parsing of edited scheme text for the lesson editor
+"""
+import hashlib
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from legacy_parser import LEGACY_SEGMENTER, SECTION_HEADER_MATCHER, parse_week_lines
+from line_segmenter import BLANK, HEADER_CODES
+from scheme_document import SchemeDocument
+
+# Parsed week blocks remembered per session, so undoing an edit is free
+BLOCK_CACHE_SIZE = 1024
+
+
+class Block:
+    """A run of lines from one week header to the next (week None for text before the first header)"""
+
+    __slots__ = ('start', 'week', 'digest')
+
+    def __init__(self, start: int, week: Optional[int], digest: Optional[str]):
+        self.start = start
+        self.week = week
+        self.digest = digest
+
+
+def block_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def parse_block(text: str) -> Optional[Dict]:
+    """The lesson for one week block's text (starting at its week header line), or None"""
+    document = SchemeDocument(text)
+    segmentation = LEGACY_SEGMENTER.segment(document)
+    codes = segmentation.codes
+    indices = [line_index for line_index, code in enumerate(codes) if code != BLANK]
+    headers = [SECTION_HEADER_MATCHER.classify(document.line_lower(line_index).strip())
+               if codes[line_index] in HEADER_CODES else None for line_index in indices]
+    return parse_week_lines(segmentation.weeks[0], [document.line(line_index).strip() for line_index in indices],
+                            [codes[line_index] for line_index in indices], headers)
+
+
+class IncrementalParseSession:
+    """Parses text the way parse_scheme_of_work does, re-parsing only the weeks an edit touches.
+
+    The text is kept as week blocks, each with the digest of its text. An
+    edit re-segments only the blocks around it (the block it starts in, the
+    one before, which may gain lines, and any it spans) and parses a block
+    only when no block with the same digest has been parsed before. Each
+    update returns a delta: the lessons whose block changed and the weeks
+    that no longer have a lesson.
+    """
+
+    def __init__(self, cache_size: int = BLOCK_CACHE_SIZE, max_length: Optional[int] = None):
+        self.text = ""
+        self.max_length = max_length
+        self.version = 0
+        self.blocks = [Block(0, None, None)]
+        self.cache_size = cache_size
+        # digest -> (lesson or None, error message or None)
+        self._parsed: 'OrderedDict[str, Tuple[Optional[Dict], Optional[str]]]' = OrderedDict()
+        self._lesson_digests: Dict[int, str] = {}
+        self.blocks_parsed = 0
+
+    def replace(self, text: str) -> Dict:
+        """Load new text in full (blocks already parsed in this session are still reused)"""
+        return self.edit([(0, len(self.text), text)])
+
+    def edit(self, changes: List[Tuple[int, int, str]]) -> Dict:
+        """Apply (start, end, replacement) changes in order, offsets in code points of the text so far"""
+        # Check every change before applying any, so a bad batch leaves the session as it was
+        length = len(self.text)
+        for start, end, replacement in changes:
+            if not 0 <= start <= end <= length:
+                raise ValueError(f"Change {start}-{end} is outside the text (length {length})")
+            length += len(replacement) - (end - start)
+        if self.max_length is not None and length > self.max_length:
+            raise ValueError(f"Text would be {length} characters long; the limit is {self.max_length}")
+
+        started = time.perf_counter()
+        parsed_before = self.blocks_parsed
+        for start, end, replacement in changes:
+            self._apply(start, end, replacement)
+        self.version += 1
+        delta = self._delta()
+        delta['blocks_parsed'] = self.blocks_parsed - parsed_before
+        delta['parse_seconds'] = round(time.perf_counter() - started, 4)
+        return delta
+
+    def _block_end(self, index: int) -> int:
+        return self.blocks[index + 1].start if index + 1 < len(self.blocks) else len(self.text)
+
+    def _apply(self, start: int, end: int, replacement: str) -> None:
+        blocks = self.blocks
+        starts = [block.start for block in blocks]
+        # From the block before the one holding the change's first line, which gains any lines that lose their header
+        line_start = self.text.rfind('\n', 0, start) + 1
+        first = max(bisect_right(starts, line_start) - 2, 0)
+        # Up to the first header starting after the change; that line and everything after it are untouched
+        last = bisect_right(starts, end)
+        region_start = blocks[first].start
+        shift = len(replacement) - (end - start)
+
+        self.text = self.text[:start] + replacement + self.text[end:]
+        for block in blocks[last:]:
+            block.start += shift
+        region_end = blocks[last].start if last < len(blocks) else len(self.text)
+        blocks[first:last] = self._segment(region_start, region_end)
+
+    def _segment(self, region_start: int, region_end: int) -> List[Block]:
+        """Blocks of text[region_start:region_end], which starts at a week header or at the start of the text"""
+        region = SchemeDocument(self.text[region_start:region_end])
+        weeks = LEGACY_SEGMENTER.segment(region).weeks
+        line_starts = region.line_starts
+        blocks = []
+        if region_start == 0 and 0 not in weeks:
+            blocks.append(Block(0, None, None))
+        headers = sorted(weeks)
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            start = line_starts[header]
+            end = line_starts[next_header] if next_header is not None else len(region.text)
+            text = region.text[start:end]
+            digest = block_digest(text)
+            if digest in self._parsed:
+                self._parsed.move_to_end(digest)
+            else:
+                self._parse(digest, text)
+            blocks.append(Block(region_start + start, weeks[header], digest))
+        return blocks
+
+    def _parse(self, digest: str, text: str) -> None:
+        self.blocks_parsed += 1
+        try:
+            result = parse_block(text), None
+        except Exception as e:
+            result = None, f'An unexpected error occurred during parsing: {str(e)}'
+        self._parsed[digest] = result
+        while len(self._parsed) > self.cache_size:
+            self._parsed.popitem(last=False)
+
+    def _week_blocks(self) -> Tuple[List[int], Dict[int, Block]]:
+        """Weeks in order of first appearance, and the block parse_scheme_of_work reads for each week"""
+        weeks_found = []
+        week_content = {}
+        for block in self.blocks:
+            if block.week is None:
+                continue
+            if block.week not in weeks_found:
+                weeks_found.append(block.week)
+            # A later block for the same week replaces the earlier one; week 0 is never read
+            if block.week:
+                week_content[block.week] = block
+        return weeks_found, week_content
+
+    def _lesson(self, block: Block) -> Tuple[Optional[Dict], Optional[str]]:
+        if block.digest in self._parsed:
+            self._parsed.move_to_end(block.digest)
+        else:
+            # Only when the session holds more blocks than its cache
+            self._parse(block.digest, self.text[block.start:self._block_end(self.blocks.index(block))])
+        return self._parsed[block.digest]
+
+    def _lessons(self, week_content: Dict[int, Block]) -> Tuple[Dict[int, Tuple[Dict, str]], Optional[str]]:
+        """{week: (lesson, block digest)} in week order, and the error parse_scheme_of_work would stop at"""
+        lessons = {}
+        for week_num in sorted(week_content):
+            block = week_content[week_num]
+            lesson, error = self._lesson(block)
+            if error:
+                return lessons, error
+            if lesson:
+                lessons[week_num] = lesson, block.digest
+        return lessons, None
+
+    def _error(self, weeks_found: List[int], week_content: Dict[int, Block], lessons: Dict) -> Optional[str]:
+        if not weeks_found:
+            return "No week numbers found. Please ensure your document contains week indicators like 'Week 1', 'Week 2', etc."
+        if not lessons:
+            debug_info = f"Weeks found: {weeks_found}. "
+            if week_content:
+                block = next(iter(week_content.values()))
+                lines = self.text[block.start:self._block_end(self.blocks.index(block))].split('\n')
+                sample_content = [line.strip() for line in lines if line.strip()][:3]
+                debug_info += f"Sample content: {sample_content}"
+            return f"Found week numbers but could not parse lesson content. {debug_info}"
+        return None
+
+    def result(self) -> Dict:
+        """What parse_scheme_of_work returns for the current text"""
+        weeks_found, week_content = self._week_blocks()
+        lessons, error = self._lessons(week_content)
+        error = error or self._error(weeks_found, week_content, lessons)
+        if error:
+            return {'error': error}
+        lesson_plans = [lesson for lesson, _ in lessons.values()]
+        return {
+            'weeks_found': sorted(weeks_found),
+            'lesson_plans': lesson_plans,
+            'total_weeks': len(weeks_found),
+            'confidence': 1.0 if len(lesson_plans) > 0 else 0.5
+        }
+
+    def _delta(self) -> Dict:
+        """Lessons whose week block changed since the last update, and weeks that lost their lesson"""
+        weeks_found, week_content = self._week_blocks()
+        lessons, error = self._lessons(week_content)
+        lesson_digests = {week_num: digest for week_num, (_, digest) in lessons.items()}
+        changed = [lesson for week_num, (lesson, digest) in lessons.items()
+                   if self._lesson_digests.get(week_num) != digest]
+        removed = sorted(set(self._lesson_digests) - set(lesson_digests))
+        self._lesson_digests = lesson_digests
+
+        delta = {
+            'version': self.version,
+            'lessons': changed,
+            'removed_weeks': removed,
+            'weeks_found': sorted(weeks_found),
+            'total_weeks': len(weeks_found),
+        }
+        error = error or self._error(weeks_found, week_content, lessons)
+        if error:
+            delta['error'] = error
+        return delta
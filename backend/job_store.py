@@ -0,0 +1,221 @@
+"""
+SQLite store for background scheme parsing jobs
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Dict, Optional
+
+# One database per API deployment; worker processes write progress to it directly
+JOB_DB_PATH = os.getenv("JOB_DB_PATH") or os.path.join(tempfile.gettempdir(), "teach-easy-convert", "jobs.sqlite3")
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "0.5"))
+# Finished jobs and their results are kept this long after they finish
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+UNFINISHED_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parse_jobs (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER,
+    lessons_found INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT,
+    owner_pid INTEGER,
+    owner_instance TEXT
+)
+"""
+_OWNER_COLUMNS = {'owner_pid': 'INTEGER', 'owner_instance': 'TEXT'}
+
+# Identifies this server process, even when it is given the pid of a process from before a restart
+_INSTANCE_ID = uuid.uuid4().hex
+
+
+def _owner_alive(pid: Optional[int], instance: Optional[str]) -> bool:
+    """Whether the server process that created a job may still be running it"""
+    if pid is None:
+        return False  # created before jobs recorded their owner
+    if pid == os.getpid():
+        return instance == _INSTANCE_ID
+    if os.name == 'nt':
+        return False  # os.kill would terminate the process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, but owned by another user
+    return True
+
+
+class JobStore:
+    """Parse jobs and their results, kept in SQLite so they outlive the process.
+
+    Every call opens its own connection, so the store can be used from the
+    API process and from pool workers at the same time. Results hold the
+    parsed schemes, so the database is only readable by this user, and
+    finished jobs are deleted ttl_seconds after they finish.
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # SQLite creates its -wal and -shm files with the database's permissions
+        os.close(os.open(db_path, os.O_RDWR | os.O_CREAT, 0o600))
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(parse_jobs)")}
+            for name, column_type in _OWNER_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE parse_jobs ADD COLUMN {name} {column_type}")
+            conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn:
+            conn.execute(f"UPDATE parse_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    def create(self, filename: str) -> str:
+        self.evict_expired()
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO parse_jobs (id, filename, status, created_at, owner_pid, owner_instance) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, filename, JOB_QUEUED, time.time(), os.getpid(), _INSTANCE_ID),
+            )
+            conn.commit()
+        return job_id
+
+    def start(self, job_id: str) -> None:
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+
+    def report_progress(self, job_id: str, pages_done: Optional[int] = None, pages_total: Optional[int] = None,
+                        lessons_found: Optional[int] = None) -> None:
+        fields = {'pages_done': pages_done, 'pages_total': pages_total, 'lessons_found': lessons_found}
+        self._update(job_id, **{name: value for name, value in fields.items() if value is not None})
+
+    def progress_callback(self, job_id: str, min_interval: float = JOB_PROGRESS_INTERVAL) -> Callable[..., None]:
+        """Return a parser progress callback that writes to this job at most every min_interval seconds"""
+        last_write = [0.0]
+
+        def progress(stage: str, done: int, total: Optional[int] = None, **details) -> None:
+            if stage not in ('pages', 'lessons'):
+                return
+            now = time.monotonic()
+            if (total is None or done < total) and now - last_write[0] < min_interval:
+                return
+            last_write[0] = now
+            if stage == 'pages':
+                self.report_progress(job_id, pages_done=done, pages_total=total)
+            elif stage == 'lessons':
+                self.report_progress(job_id, lessons_found=done)
+
+        return progress
+
+    def complete(self, job_id: str, result: Dict) -> None:
+        self._update(job_id, status=JOB_COMPLETED, finished_at=time.time(),
+                     lessons_found=len(result.get('lesson_plans', [])), result=json.dumps(result, default=str))
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status=JOB_FAILED, finished_at=time.time(), error=error)
+
+    def mark_interrupted(self) -> int:
+        """Flag jobs left queued or running by a server process that has exited; returns how many.
+
+        Jobs run in the pool of the process that created them, so several
+        server processes can share JOB_DB_PATH: each job records its owner,
+        and only jobs whose owner is gone are interrupted. On Windows every
+        other process's unfinished jobs are treated as interrupted, so run a
+        single server process there.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT id, owner_pid, owner_instance FROM parse_jobs "
+                f"WHERE status IN ({', '.join('?' for _ in UNFINISHED_STATUSES)})",
+                UNFINISHED_STATUSES,
+            ).fetchall()
+            orphaned = [row['id'] for row in rows if not _owner_alive(row['owner_pid'], row['owner_instance'])]
+            if not orphaned:
+                return 0
+            cursor = conn.execute(
+                f"UPDATE parse_jobs SET status = ?, finished_at = ?, error = ? "
+                f"WHERE id IN ({', '.join('?' for _ in orphaned)}) "
+                f"AND status IN ({', '.join('?' for _ in UNFINISHED_STATUSES)})",
+                (JOB_INTERRUPTED, time.time(), "Interrupted by a server restart; please upload the scheme again",
+                 *orphaned, *UNFINISHED_STATUSES),
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def evict_expired(self) -> int:
+        """Delete jobs that finished more than ttl_seconds ago; returns how many"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                f"DELETE FROM parse_jobs WHERE finished_at < ? "
+                f"AND status NOT IN ({', '.join('?' for _ in UNFINISHED_STATUSES)})",
+                (time.time() - self.ttl_seconds, *UNFINISHED_STATUSES),
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return the job's status fields (without the result), or None if unknown"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, filename, status, pages_done, pages_total, lessons_found, "
+                "created_at, started_at, finished_at, error FROM parse_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        if job['started_at'] is None:
+            job['elapsed_seconds'] = 0.0
+        else:
+            job['elapsed_seconds'] = round((job['finished_at'] or time.time()) - job['started_at'], 3)
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT result FROM parse_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row['result'] is None:
+            return None
+        return json.loads(row['result'])
+
+
+_default_store = None
+
+
+def get_job_store() -> JobStore:
+    """Return the store for JOB_DB_PATH, shared within the process"""
+    global _default_store
+    if _default_store is None:
+        _default_store = JobStore()
+    return _default_store
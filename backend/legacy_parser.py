@@ -0,0 +1,437 @@
+"""
+Legacy scheme of work extraction and line-based parser
+
+Kept free of import-time side effects (no database or app setup) so that
+worker processes can import it.
+"""
+import io
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import fitz  # PyMuPDF for better PDF parsing
+import PyPDF2
+from docx import Document
+from fastapi import HTTPException
+
+from enhanced_parser import EnhancedSchemeParser
+from extraction_cache import get_default_cache
+from line_segmenter import BLANK, HEADER_CODES, WEEK_HEADER, LineSegmenter
+from scheme_document import SchemeDocument
+from upload_spool import read_source
+
+# Bump when extract_text_from_pdf output changes so stale cache entries are not reused
+PDF_TEXT_EXTRACTOR_VERSION = "pymupdf-text-1"
+
+# Enhanced patterns for week detection, tried in order; the first match gives the week
+WEEK_PATTERNS = [
+    r'WEEK\s*(\d+)', r'WK\s*(\d+)', r'W(\d+)', r'(\d+)\s*WEEK',
+    r'^\s*(\d+)\s*[.\-:]', r'Week\s+(\d+)', r'week\s+(\d+)',
+    r'TERM\s+\d+\s+WEEK\s+(\d+)', r'T\d+W(\d+)'
+]
+# More comprehensive keyword mapping with variations, tried in order
+KEYWORD_MAP = {
+    'lesson': ['lesson', 'lessons', 'lesson title', 'topic', 'lesson topic'],
+    'strand': ['strand', 'theme', 'topic area', 'main topic', 'subject area', 'content area'],
+    'sub_strand': ['sub-strand', 'sub strand', 'substrand', 'subtopic', 'sub-theme',
+                   'sub-topic', 'sub topic', 'specific topic', 'focus area'],
+    'title': ['title', 'lesson title', 'topic title', 'subject', 'lesson name'],
+    'specific_learning_outcomes': ['learning outcomes', 'specific learning', 'slo', 'objectives',
+                                   'learning objectives', 'expected outcomes', 'outcomes', 'goals'],
+    'core_competencies': ['core competencies', 'competencies', 'core skills', 'skills',
+                          'key competencies', 'competency areas'],
+    'key_inquiry_question': ['key inquiry', 'inquiry question', 'kiq', 'guiding question',
+                             'essential question', 'inquiry questions'],
+    'learning_resources': ['resources', 'materials', 'learning materials', 'references',
+                           'teaching materials', 'learning resources', 'teaching aids'],
+    'assessment': ['assessment', 'evaluation', 'assessment methods', 'assessment techniques',
+                   'evaluation methods', 'assessment strategies'],
+    'reflection': ['reflection', 'self-reflection', 'teacher reflection', 'reflections'],
+    'activities': ['activity', 'activities', 'introduction', 'development', 'conclusion',
+                   'learning experiences', 'procedure', 'teaching activities', 'learning activities']
+}
+
+# A keyword followed by one of these starts a section wherever it appears in the line
+SECTION_SEPARATORS = (':', ' :', '-', ' -')
+
+# Aho-Corasick outputs: (_SEPARATOR_HIT, rank) or (_PREFIX_HIT, rank, length)
+_SEPARATOR_HIT, _PREFIX_HIT = range(2)
+
+# classify() result: (section, keyword, separator_hits) or None
+SectionHeader = Optional[Tuple[str, str, int]]
+
+
+class SectionHeaderMatcher:
+    """Aho-Corasick automaton over the section keywords.
+
+    classify() scans a lowercased line once and finds every keyword followed
+    by a separator and every keyword starting the line. The header is picked the way the original keyword-by-keyword
+    loop picked it: the first keyword in KEYWORD_MAP order wins, and a
+    separator hit reports how many of that section's keywords (from the
+    winner on) were followed by a separator, since each of them added the
+    content again.
+    """
+
+    def __init__(self, keyword_map: Dict[str, List[str]] = KEYWORD_MAP,
+                 separators: Tuple[str, ...] = SECTION_SEPARATORS):
+        self.sections = []
+        self.keywords = []
+        patterns = []
+        for section, keywords in keyword_map.items():
+            for keyword in keywords:
+                rank = len(self.keywords)
+                self.sections.append(section)
+                self.keywords.append(keyword)
+                keyword_lower = keyword.lower()
+                patterns.extend((f'{keyword_lower}{separator}', (_SEPARATOR_HIT, rank)) for separator in separators)
+                patterns.append((keyword_lower + ' ', (_PREFIX_HIT, rank, len(keyword_lower) + 1)))
+        self._build(patterns)
+
+    def _build(self, patterns) -> None:
+        goto = [{}]
+        outputs = [[]]
+        for pattern, output in patterns:
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = goto[state][ch]
+            outputs[state].append(output)
+
+        # Breadth-first, so each state's failure state is complete before its children need it.
+        # Transitions back to the root are left out; a missing character means state 0.
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for state in queue:
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+        self._delta = delta
+        self._outputs = [tuple(output) for output in outputs]
+
+    def classify(self, line_lower: str) -> SectionHeader:
+        """Return (section, keyword, separator_hits) or None for a stripped, lowercased line.
+
+        separator_hits is 0 when the keyword only starts the line.
+        """
+        separator_ranks = set()
+        prefix_rank = None
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for end, ch in enumerate(line_lower):
+            state = delta[state].get(ch, 0)
+            for output in outputs[state]:
+                if output[0] == _SEPARATOR_HIT:
+                    separator_ranks.add(output[1])
+                elif end + 1 == output[2] and (prefix_rank is None or output[1] < prefix_rank):
+                    prefix_rank = output[1]
+
+        first_separator = min(separator_ranks) if separator_ranks else None
+        if first_separator is not None and (prefix_rank is None or first_separator <= prefix_rank):
+            section = self.sections[first_separator]
+            separator_hits = sum(1 for rank in separator_ranks
+                                 if rank >= first_separator and self.sections[rank] == section)
+            return section, self.keywords[first_separator], separator_hits
+        if prefix_rank is not None:
+            return self.sections[prefix_rank], self.keywords[prefix_rank], 0
+        return None
+
+
+SECTION_HEADER_MATCHER = SectionHeaderMatcher()
+
+# Week headers and the lines that may be section headers, found in one pass over the document
+LEGACY_SEGMENTER = LineSegmenter(WEEK_PATTERNS, [keyword for keywords in KEYWORD_MAP.values() for keyword in keywords],
+                                 SECTION_SEPARATORS)
+
+
+def extract_text_from_pdf(file_content: Union[bytes, str], digest: Optional[str] = None) -> str:
+    """Extract text from PDF bytes or a spooled upload path, reusing cached text for previously seen uploads"""
+    cache = get_default_cache()
+    if cache is None:
+        return _extract_text_from_pdf_uncached(file_content)
+    return cache.get_or_extract(file_content, PDF_TEXT_EXTRACTOR_VERSION, _extract_text_from_pdf_uncached, digest)
+
+
+def _extract_text_from_pdf_uncached(file_content: Union[bytes, str]) -> str:
+    """Extract text from PDF using PyMuPDF (better for complex layouts)"""
+    is_path = isinstance(file_content, str)
+    try:
+        doc = fitz.open(file_content, filetype="pdf") if is_path else fitz.open(stream=file_content, filetype="pdf")
+        text = ""
+        for page in doc:
+            text += page.get_text("text")
+        doc.close()
+        return text
+    except Exception as e:
+        # Fallback to PyPDF2
+        try:
+            pdf_reader = PyPDF2.PdfReader(file_content if is_path else io.BytesIO(file_content))
+            text = ""
+            for page in pdf_reader.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+            return text
+        except Exception as e2:
+            raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e2)}")
+
+
+def extract_text_from_docx(file_content: Union[bytes, str]) -> str:
+    """Extract text from DOCX bytes or a spooled upload path"""
+    try:
+        doc = Document(file_content if isinstance(file_content, str) else io.BytesIO(file_content))
+        text = ""
+        for paragraph in doc.paragraphs:
+            text += paragraph.text + "\n"
+        return text
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to extract text from DOCX: {str(e)}")
+
+
+def extract_scheme_document(file_content: Union[bytes, str], file_extension: str, filename: str,
+                            digest: Optional[str] = None) -> SchemeDocument:
+    """Extract an upload's text once; every parsing strategy reuses the result"""
+    if file_extension == 'pdf':
+        try:
+            return EnhancedSchemeParser().extract_document(file_content, filename, digest)
+        except Exception as e:
+            # PyMuPDF could not open it; extract_text_from_pdf falls back to PyPDF2
+            print(f"Enhanced extraction failed, falling back to original: {e}")
+            return SchemeDocument(extract_text_from_pdf(file_content, digest), filename, 'pdf')
+    elif file_extension in ['docx', 'doc']:
+        return SchemeDocument(extract_text_from_docx(file_content), filename, 'docx')
+    elif file_extension == 'txt':
+        return SchemeDocument(read_source(file_content).decode('utf-8'), filename, 'txt')
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+
+def _finished_lesson(current_lesson_data: Dict) -> Optional[Dict]:
+    """A copy of the week's lesson with defaults filled in, or None when it has no content"""
+    if current_lesson_data and current_lesson_data.get('week'):
+        # Handle title parsing for strand/sub_strand extraction
+        title = current_lesson_data.get('title', '')
+        if title and not current_lesson_data.get('strand'):
+            if ':' in title:
+                parts = title.split(':', 1)
+                current_lesson_data['strand'] = parts[0].strip()
+                current_lesson_data['sub_strand'] = parts[1].strip()
+            elif '-' in title:
+                parts = title.split('-', 1)
+                current_lesson_data['strand'] = parts[0].strip()
+                current_lesson_data['sub_strand'] = parts[1].strip()
+            else:
+                current_lesson_data['strand'] = title
+
+        # Ensure we have at least some content
+        if (current_lesson_data.get('strand') or 
+            current_lesson_data.get('title') or 
+            current_lesson_data.get('specific_learning_outcomes') or
+            current_lesson_data.get('activities')):
+
+            # Set defaults for missing fields
+            if not current_lesson_data.get('sub_strand'):
+                current_lesson_data['sub_strand'] = 'N/A'
+            if not current_lesson_data.get('title'):
+                current_lesson_data['title'] = f"Week {current_lesson_data['week']} Lesson"
+
+            lesson = current_lesson_data.copy()
+            print(f"DEBUG: Saved lesson for week {current_lesson_data['week']}")
+            return lesson
+    return None
+
+
+def parse_week_lines(week_num: int, lines: List[str], line_codes: Sequence[int],
+                     section_headers: Sequence[SectionHeader]) -> Optional[Dict]:
+    """Build the lesson plan for one week from its stripped, non-blank lines.
+
+    line_codes holds each line's segmenter code and section_headers its
+    section header or None. Returns None when the week has no lesson
+    content. Only these lines are read, so a week's lesson stays valid for
+    as long as its text is unchanged.
+    """
+    current_lesson_data = {
+        'week': week_num,
+        'lessonNumber': 1,
+        'title': '', 'strand': '', 'sub_strand': '',
+        'specific_learning_outcomes': [], 'core_competencies': [],
+        'key_inquiry_question': '', 'learning_resources': [],
+        'activities': [], 'assessment': '', 'reflection': ''
+    }
+    
+    current_section = None
+    
+    print(f"DEBUG: Processing week {week_num} with {len(lines)} lines")
+    
+    for line, line_code, header in zip(lines, line_codes, section_headers):
+        is_week_header = line_code == WEEK_HEADER
+        found_section = False
+        
+        # Check for section headers
+        if header:
+            section, keyword, separator_hits = header
+            current_section = section
+            if separator_hits:
+                # Extract content after the keyword
+                content = ""
+                if ':' in line:
+                    content = line.split(':', 1)[-1].strip()
+                elif '-' in line:
+                    content = line.split('-', 1)[-1].strip()
+
+                # Each of the section's keywords followed by a separator adds the content
+                for _ in range(separator_hits):
+                    if content:
+                        if isinstance(current_lesson_data[current_section], list):
+                            current_lesson_data[current_section].append(content)
+                        else:
+                            current_lesson_data[current_section] = content
+                    print(f"DEBUG: Found section '{section}' with content: '{content[:50]}...'")
+            else:
+                # Also check if line starts with keyword
+                content = line[len(keyword):].strip()
+                if content:
+                    if isinstance(current_lesson_data[current_section], list):
+                        current_lesson_data[current_section].append(content)
+                    else:
+                        current_lesson_data[current_section] = content
+                print(f"DEBUG: Found section '{section}' starting with keyword")
+            found_section = True
+
+        # If no section found but we have a current section, add to it
+        if not found_section and current_section and line:
+            # Skip if it looks like a new week number
+            skip_line = is_week_header
+
+            if not skip_line:
+                if isinstance(current_lesson_data[current_section], list):
+                    current_lesson_data[current_section].append(line)
+                else:
+                    current_lesson_data[current_section] += f" {line}"
+                print(f"DEBUG: Added to section '{current_section}': '{line[:30]}...'")
+
+        # If no section is set yet, try to infer from content
+        if not current_section and not found_section:
+            # If it's not a week header and contains meaningful content
+            if not is_week_header:
+                if len(line) > 10:  # Reasonable content length
+                    # Default to title if nothing else is set
+                    if not current_lesson_data['title']:
+                        current_lesson_data['title'] = line
+                        print(f"DEBUG: Set title from content: '{line}'")
+                    else:
+                        # Add to activities as fallback
+                        current_lesson_data['activities'].append(line)
+                        print(f"DEBUG: Added to activities: '{line[:30]}...'")
+    
+    # Save this week's lesson
+    return _finished_lesson(current_lesson_data)
+
+
+def parse_scheme_of_work(text: Union[str, SchemeDocument], filename: str = "") -> dict:
+    """Enhanced parsing with multiple strategies and robust error handling"""
+    
+    # Extracted documents are read without their page markers; raw text is read as-is
+    page_bodies_only = isinstance(text, SchemeDocument)
+    document = SchemeDocument.coerce(text)
+    
+    # Initialize enhanced parser
+    enhanced_parser = EnhancedSchemeParser()
+    
+    # Try enhanced parsing first (for file uploads)
+    if filename:
+        try:
+            # This assumes we have the file content as bytes
+            # For text input, we'll use the fallback method
+            pass
+        except Exception as e:
+            print(f"Enhanced parser failed: {e}")
+    
+    # Fallback to original parsing method
+    try:
+        weeks_found = []
+        lesson_plans = []
+        current_week = None
+        
+        # Debug information
+        print(f"DEBUG: Processing {document.line_count} lines of text")
+        
+        # First pass: look for week patterns and collect all content
+        # Each week's content is kept as line numbers into the shared document,
+        # with week headers found by the segmenter and only header lines scanned for a section
+        week_content = {}
+        current_week_lines = []
+        segmentation = LEGACY_SEGMENTER.segment(document)
+        line_codes = segmentation.codes
+        section_headers = {}
+        
+        for line_index in document.line_indices(page_bodies_only=page_bodies_only):
+            line_code = line_codes[line_index]
+            if line_code == BLANK:
+                continue
+            if line_code in HEADER_CODES:
+                section_headers[line_index] = SECTION_HEADER_MATCHER.classify(document.line_lower(line_index).strip())
+            
+            # Check for week pattern
+            if line_code == WEEK_HEADER:
+                # Save previous week's content
+                if current_week and current_week_lines:
+                    week_content[current_week] = current_week_lines.copy()
+                
+                week_num = segmentation.weeks[line_index]
+                if week_num not in weeks_found:
+                    weeks_found.append(week_num)
+                current_week = week_num
+                current_week_lines = [line_index]
+                print(f"DEBUG: Found week {week_num}")
+            elif current_week:
+                current_week_lines.append(line_index)
+        
+        # Save the last week's content
+        if current_week and current_week_lines:
+            week_content[current_week] = current_week_lines.copy()
+
+        # Second pass: parse each week's content
+        for week_num in sorted(weeks_found):
+            if week_num not in week_content:
+                continue
+            
+            # Blank lines were already dropped in the first pass
+            week_lines = week_content[week_num]
+            lesson = parse_week_lines(week_num, [document.line(line_index).strip() for line_index in week_lines],
+                                      [line_codes[line_index] for line_index in week_lines],
+                                      [section_headers.get(line_index) for line_index in week_lines])
+            if lesson:
+                lesson_plans.append(lesson)
+
+        print(f"DEBUG: Found {len(weeks_found)} weeks, created {len(lesson_plans)} lesson plans")
+
+        if not weeks_found:
+            return {'error': "No week numbers found. Please ensure your document contains week indicators like 'Week 1', 'Week 2', etc."}
+        
+        if not lesson_plans:
+            # Provide more detailed error information
+            debug_info = f"Weeks found: {weeks_found}. "
+            if week_content:
+                sample_content = [document.line(i).strip() for i in list(week_content.values())[0][:3]]  # First few lines of first week
+                debug_info += f"Sample content: {sample_content}"
+            
+            return {'error': f"Found week numbers but could not parse lesson content. {debug_info}"}
+
+        return {
+            'weeks_found': sorted(weeks_found),
+            'lesson_plans': lesson_plans,
+            'total_weeks': len(weeks_found),
+            'confidence': 1.0 if len(lesson_plans) > 0 else 0.5
+        }
+        
+    except Exception as e:
+        print(f"DEBUG: Exception occurred: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {'error': f'An unexpected error occurred during parsing: {str(e)}'}
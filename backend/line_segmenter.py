@@ -0,0 +1,156 @@
+"""
+Single-pass line classifier and week segmenter shared by every parsing strategy
+"""
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from scheme_document import SchemeDocument
+
+# Line codes, in the order a line is tested for them
+WEEK_HEADER, LESSON_HEADER, SECTION_HEADER, BULLET, BLANK, CONTENT = range(6)
+LINE_TYPE_NAMES = ('week_header', 'lesson_header', 'section_header', 'bullet', 'blank', 'content')
+
+# Codes of lines that may start a section
+HEADER_CODES = (WEEK_HEADER, LESSON_HEADER, SECTION_HEADER)
+
+# Characters that start a bulleted line
+BULLET_CHARS = ('•', '\uf0b7', '●', '○', '▪', '-', '*', '→', '◦')
+
+# A line starting with a lesson number
+LESSON_HEADER_PATTERN = r'^lesson\s*\d+'
+
+# Whitespace that stays within a line
+_SPACE = r'[^\S\n]'
+_CLASS_WITH_SPACE = re.compile(r'\[[^\]]*\\s')
+
+
+def _within_line(pattern: str) -> Tuple[bool, str]:
+    """(anchored, pattern) for a pattern searched for in one stripped line, rewritten not to cross line ends"""
+    if _CLASS_WITH_SPACE.search(pattern):
+        raise ValueError(f"\\s inside a character class is not supported: {pattern}")
+    pattern = pattern.replace(r'\s', _SPACE)
+    if pattern.endswith('$'):
+        pattern = f'{pattern[:-1]}{_SPACE}*$'
+    if pattern.startswith('^'):
+        return True, f'{_SPACE}*{pattern[1:]}'
+    return False, pattern
+
+
+def _line_start_pattern(pattern: str) -> str:
+    """Rewrite a pattern searched for in one stripped line to match from that line's start in the whole text"""
+    anchored, pattern = _within_line(pattern)
+    return pattern if anchored else r'[^\n]*?' + pattern
+
+
+def word_alternation(words: Iterable[str]) -> str:
+    """Regex matching any of words, nested as a prefix tree so the engine tries one branch per character"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ''
+        if '' in node:
+            return f'(?:{"|".join(branches)})?'
+        return branches[0] if len(branches) == 1 else f'(?:{"|".join(branches)})'
+
+    return build(trie)
+
+
+class Segmentation:
+    """Line codes of one document, with the week number of each week header line"""
+
+    def __init__(self, codes: array, weeks: Dict[int, int]):
+        self.codes = codes
+        self.weeks = weeks
+
+    def week_blocks(self) -> List[Tuple[int, int, int]]:
+        """(week, header line, end line) spans from each week header to the next one"""
+        starts = sorted(self.weeks)
+        ends = starts[1:] + [len(self.codes)]
+        return [(self.weeks[start], start, end) for start, end in zip(starts, ends)]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of lines of each type"""
+        counts = dict.fromkeys(LINE_TYPE_NAMES, 0)
+        for code in self.codes:
+            counts[LINE_TYPE_NAMES[code]] += 1
+        return counts
+
+
+class LineSegmenter:
+    """Classifies every line of a document with one combined regex.
+
+    A line is a WEEK_HEADER when one of week_patterns matches it (as
+    re.search against the stripped line, ignoring case, with the first
+    pattern that matches giving the week number), else a LESSON_HEADER,
+    SECTION_HEADER (a section keyword followed by a separator, or starting
+    the line), BULLET, BLANK or CONTENT line. Each rule becomes a lookahead
+    from the line start and all of them are joined into one MULTILINE
+    pattern, so segment() classifies a whole document in a single finditer
+    pass. Each week pattern needs exactly one capturing group, the week number.
+    """
+
+    def __init__(self, week_patterns: Sequence[str], section_keywords: Iterable[str] = (),
+                 section_separators: Sequence[str] = (':', '-')):
+        alternatives = []
+        # Line code of each capturing group; a match's last group tells which rule it came from
+        self._group_codes = [None]
+
+        def add(code: int, lookahead: str, groups: int = 1) -> None:
+            alternatives.append(lookahead)
+            self._group_codes.extend([code] * groups)
+
+        for pattern in week_patterns:
+            if re.compile(pattern).groups != 1:
+                raise ValueError(f"Week pattern needs exactly one capturing group: {pattern}")
+        if week_patterns:
+            # One scan rules out most lines before the patterns are tried in order; the
+            # gate's groups close before the chosen pattern's, so lastindex still names it
+            rewritten = [_within_line(pattern) for pattern in week_patterns]
+            floating = '|'.join(pattern for anchored, pattern in rewritten if not anchored)
+            gate = [pattern for anchored, pattern in rewritten if anchored]
+            if floating:
+                gate.append(f'[^\\n]*?(?:{floating})')
+            in_order = '|'.join(f'(?={_line_start_pattern(pattern)})' for pattern in week_patterns)
+            add(WEEK_HEADER, f'(?={"|".join(gate)})(?:{in_order})', groups=2 * len(week_patterns))
+        add(LESSON_HEADER, f'()(?={_line_start_pattern(LESSON_HEADER_PATTERN)})')
+
+        keywords = word_alternation(section_keywords)
+        if keywords:
+            separators = '|'.join(map(re.escape, section_separators))
+            # Lines without any separator's first non-space character skip the keyword search
+            separator_chars = ''.join(sorted({(separator.strip() or separator)[0] for separator in section_separators}))
+            add(SECTION_HEADER, f'()(?={_SPACE}*(?:{keywords}) '
+                                f'|(?=[^\\n]*?[{re.escape(separator_chars)}])[^\\n]*?(?:{keywords})(?:{separators}))')
+        bullets = ''.join(map(re.escape, BULLET_CHARS))
+        add(BULLET, f'()(?={_SPACE}*[{bullets}])')
+        add(BLANK, f'()(?={_SPACE}*$)')
+        add(CONTENT, '()')
+
+        self.pattern = re.compile(f'^(?:{"|".join(alternatives)})[^\\n]*', re.MULTILINE | re.IGNORECASE)
+
+    def segment(self, document: Union[str, SchemeDocument]) -> Segmentation:
+        """Classify every line of the document (lines as split on '\\n')"""
+        document = SchemeDocument.coerce(document)
+        group_codes = self._group_codes
+        codes = array('b')
+        weeks = {}
+        for line_index, match in enumerate(self.pattern.finditer(document.text)):
+            code = group_codes[match.lastindex]
+            codes.append(code)
+            if code == WEEK_HEADER:
+                weeks[line_index] = int(match.group(match.lastindex))
+        return Segmentation(codes, weeks)
+
+    def classify(self, line: str) -> Tuple[int, Optional[int]]:
+        """(code, week number or None) for a single line, for callers reading lines one at a time"""
+        match = self.pattern.match(line)
+        code = self._group_codes[match.lastindex]
+        return code, int(match.group(match.lastindex)) if code == WEEK_HEADER else None
@@ -0,0 +1,379 @@
+"""
+Linear-time equivalents of the lazy "keyword, phrase, terminator" regexes run on whole week blocks
+"""
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# The last lazy run in a pattern (the phrase), optionally captured, and what precedes and follows it
+_LAZY_RUN = re.compile(r'(?s)(?P<prefix>.*?)(?P<open>\()?(?P<body>\[(?:\\.|[^\]\\])*\]|\\[sSwWdD]|\.)'
+                       r'(?P<quantifier>[+*])\?(?(open)\))(?P<terminator>(?:(?!(?:\[(?:\\.|[^\]\\])*\]|\\.|.)[+*]\?).)*)')
+# Items between the keyword and the phrase, read from the end: an optional class, a run, or a lazy skip to a character
+_TAIL_ITEM = re.compile(r'(?s)(?:(?P<class>\[(?:\\.|[^\]\\])*\]|\\[sSwWdD])(?P<kind>[?*+])'
+                        r'|\[\^(?P<skip>\\.|[^\]\\])\]\*\?(?P<to>\\.|[^\\]))$')
+_SPACE_RUN = re.compile(r'\s*')
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Top-level alternatives of pattern, unwrapping one enclosing (?:...) group"""
+    if pattern.startswith('(?:') and _closing_paren(pattern, 0) == len(pattern) - 1:
+        pattern = pattern[3:-1]
+    alternatives, depth, start, index = [], 0, 0, 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            index += 1
+        elif char == '[':
+            index = _closing_bracket(pattern, index)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            alternatives.append(pattern[start:index])
+            start = index + 1
+        index += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def _closing_bracket(pattern: str, index: int) -> int:
+    index += 1
+    if pattern[index:index + 1] == '^':
+        index += 1
+    if pattern[index:index + 1] == ']':
+        index += 1
+    while pattern[index] != ']':
+        index += 2 if pattern[index] == '\\' else 1
+    return index
+
+
+def _closing_paren(pattern: str, index: int) -> int:
+    depth = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            index += 1
+        elif char == '[':
+            index = _closing_bracket(pattern, index)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return -1
+
+
+class LinearMatch:
+    """The parts of a match callers read: group(0), group(1) (the phrase), start() and end()"""
+
+    __slots__ = ('string', '_spans')
+
+    def __init__(self, string: str, start: int, end: int, phrase: Tuple[int, int]):
+        self.string = string
+        self._spans = ((start, end), phrase)
+
+    def group(self, index: int = 0) -> str:
+        start, end = self._spans[index]
+        return self.string[start:end]
+
+    def start(self, index: int = 0) -> int:
+        return self._spans[index][0]
+
+    def end(self, index: int = 0) -> int:
+        return self._spans[index][1]
+
+    def span(self, index: int = 0) -> Tuple[int, int]:
+        return self._spans[index]
+
+
+class LazyRunPattern:
+    """re.search for patterns shaped KEYWORD TAIL (BODY+?) (TERMINATOR|...), in time linear in the text.
+
+    KEYWORD is any regex with a single way to match at a position (it may
+    be empty, then the phrase starts the pattern), TAIL a sequence of
+    optional classes (x?), a lazy skip to a character ([^:]*?:) and at most
+    one final run (x* or x+) whose characters BODY also matches, BODY a
+    single character class (+? or *?, captured or not) and each TERMINATOR
+    either \\s+ followed by something that cannot start with whitespace,
+    or anything matching in constant time (a character, $, a word).
+
+    The backtracking engine retries every start, and within a start every
+    split of whitespace between the tail, the phrase and a \\s+ terminator,
+    so these patterns take quadratic or cubic time on long runs without a
+    terminator. Here terminators are found in one forward scan and each
+    start is settled in constant time from the end of its body run, giving
+    the same match as re.search on the same pattern.
+    """
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.pattern = pattern
+        self.flags = flags
+        parsed = _LAZY_RUN.fullmatch(pattern)
+        if parsed is None:
+            raise ValueError(f"Not a lazy phrase pattern: {pattern}")
+        self.min_body = 1 if parsed.group('quantifier') == '+' else 0
+
+        prefix, tail = parsed.group('prefix'), []
+        while True:
+            item = _TAIL_ITEM.search(prefix)
+            # Only the last tail item may be a run
+            if item is None or (item.group('kind') in ('*', '+') and tail):
+                break
+            if item.group('skip') is not None:
+                if item.group('skip') != item.group('to'):
+                    break
+                tail.insert(0, (re.compile(item.group('to'), flags), 'to'))
+            else:
+                tail.insert(0, (re.compile(item.group('class'), flags), item.group('kind')))
+            prefix = prefix[:item.start()]
+        self._tail = tail
+        self._star = re.compile(f'{tail[-1][0].pattern}*', flags) if tail and tail[-1][1] in '*+' else None
+        if tail and not prefix:
+            raise ValueError(f"A tail needs a keyword before it: {pattern}")
+        # The regex a match starts with (None when it starts with the phrase)
+        self.keyword = prefix or None
+        self._keyword = re.compile(prefix, flags) if prefix else None
+
+        body = parsed.group('body')
+        self._body_run = re.compile(f'{body}*', flags)
+        self._body_starts = re.compile(f'(?<!{body}){body}', flags)
+
+        terminator = parsed.group('terminator')
+        self._terminator = re.compile(terminator, flags)
+        space_rests, others = [], []
+        for alternative in _split_alternatives(terminator):
+            if alternative.startswith(r'\s+'):
+                space_rests.append(alternative[3:])
+            else:
+                others.append(alternative)
+        parts = []
+        if space_rests:
+            self._space_rest = re.compile(f'(?:{"|".join(space_rests)})', flags)
+            if self._space_rest.match(' ') or self._space_rest.match('\n'):
+                raise ValueError(f"Terminator after \\s+ may not start with whitespace: {pattern}")
+            # A \s+ terminator matches at every position of a whitespace run; report each run once, from its start
+            parts.append(rf'(?<!\s)(?P<run>\s+)(?:{"|".join(space_rests)})')
+        else:
+            self._space_rest = None
+        parts.extend(others)
+        self._terminator_scan = re.compile(f'(?=(?:{"|".join(parts)}))', flags)
+
+    def search(self, text: str, keywords: Optional[Iterable[Tuple[int, int]]] = None) -> Optional[LinearMatch]:
+        """Like re.search; keywords are the (start, end) spans of every keyword match, in order, if already known"""
+        return _Search(self, text).run(keywords)
+
+
+class _Search:
+    """State of one search: terminator positions found so far and the current body run"""
+
+    def __init__(self, pattern: LazyRunPattern, text: str):
+        self.pattern = pattern
+        self.text = text
+        # Disjoint [start, end) spans of positions where a terminator matches, in order
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.origin = None
+        self.matches = None
+        self.body_span = None  # (start, end) of the body run last looked up
+        self.skip = None  # (from, found) of the last lazy skip
+
+    def run(self, keywords: Optional[Iterable[Tuple[int, int]]] = None) -> Optional[LinearMatch]:
+        pattern, text = self.pattern, self.text
+        last_tail, last_result = None, None
+        for start, tail_start in self._keyword_spans() if keywords is None else keywords:
+            if self.origin is None:
+                self._scan_from(tail_start)
+            # Starts whose keyword ends at the same place share their outcome
+            if tail_start != last_tail:
+                last_tail = tail_start
+                last_result = self._settle(tail_start)
+            if last_result is not None:
+                phrase_start, phrase_end = last_result
+                end = pattern._terminator.match(text, phrase_end).end()
+                return LinearMatch(text, start, end, (phrase_start, phrase_end))
+        return None
+
+    def _keyword_spans(self) -> Iterator[Tuple[int, int]]:
+        """(start, end) of every keyword match, or with no keyword, of every body run start"""
+        pattern, text = self.pattern, self.text
+        position = 0
+        while position <= len(text):
+            if pattern._keyword is None:
+                found = pattern._body_starts.search(text, position)
+                if found is None:
+                    return
+                yield found.start(), found.start()
+            else:
+                found = pattern._keyword.search(text, position)
+                if found is None:
+                    return
+                yield found.start(), found.end()
+            position = found.start() + 1
+
+    def _settle(self, tail_start: int) -> Optional[Tuple[int, int]]:
+        """(phrase start, phrase end) for the first way through the tail that reaches a terminator"""
+        for low, high in self._tail_ends(tail_start, 0):
+            settled = self._phrase(low, high)
+            if settled is not None:
+                return settled
+        return None
+
+    def _tail_ends(self, position: int, index: int):
+        """Phrase start ranges (low, high) for the tail items from index on, in the engine's order"""
+        tail = self.pattern._tail
+        if index == len(tail):
+            yield position, position
+            return
+        cls, kind = tail[index]
+        if kind == '?':
+            if cls.match(self.text, position):
+                yield from self._tail_ends(position + 1, index + 1)
+            yield from self._tail_ends(position, index + 1)
+        elif kind == 'to':
+            found = self._skip_to(cls, position)
+            if found is not None:
+                yield from self._tail_ends(found + 1, index + 1)
+        else:
+            end = self.pattern._star.match(self.text, position).end()
+            low = position + (kind == '+')
+            if end >= low:
+                yield low, end
+
+    def _phrase(self, low: int, high: int) -> Optional[Tuple[int, int]]:
+        """The phrase for the largest start in [low, high] that reaches a terminator within its body run"""
+        min_body = self.pattern.min_body
+        run_end = self._run_end(high)
+        end = self._next_terminator(high + min_body)
+        if end is not None and end <= run_end:
+            return high, end
+        if low < high:
+            # Giving back tail characters lets the phrase end earlier, at the last terminator before high
+            end = self._last_terminator(low + min_body, high + min_body - 1)
+            if end is not None:
+                return end - min_body, end
+        return None
+
+    def _run_end(self, position: int) -> int:
+        """First position at or after position that the body does not match"""
+        if self.body_span is not None:
+            start, end = self.body_span
+            if start <= position <= end:
+                return end
+            if position < start and self.pattern._body_run.match(self.text, position, start).end() == start:
+                self.body_span = (position, end)
+                return end
+        end = self.pattern._body_run.match(self.text, position).end()
+        self.body_span = (position, end)
+        return end
+
+    def _skip_to(self, cls, position: int) -> Optional[int]:
+        if self.skip is not None and self.skip[0] <= position and (self.skip[1] is None or position <= self.skip[1]):
+            return self.skip[1]
+        found = cls.search(self.text, position)
+        self.skip = (position, found.start() if found else None)
+        return self.skip[1]
+
+    def _scan_from(self, position: int) -> None:
+        self.origin = position
+        self.starts, self.ends = [], []
+        space_rest = self.pattern._space_rest
+        if space_rest is not None:
+            # The scan only reports whitespace runs from their start; one already under way is checked here
+            run_end = _SPACE_RUN.match(self.text, position).end()
+            if run_end > position and space_rest.match(self.text, run_end):
+                self._add(position, run_end)
+        self.matches = self.pattern._terminator_scan.finditer(self.text, position)
+
+    def _add(self, start: int, end: int) -> None:
+        if self.ends and start <= self.ends[-1]:
+            self.ends[-1] = max(self.ends[-1], end)
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def _scan_past(self, position: int) -> None:
+        """Find terminators until one is known to end after position (or there are no more)"""
+        if self.origin is None or position < self.origin:
+            self._scan_from(position)
+        while self.matches is not None and (not self.ends or self.ends[-1] <= position):
+            found = next(self.matches, None)
+            if found is None:
+                self.matches = None
+                break
+            run = found.groupdict().get('run')
+            self._add(found.start(), found.start() + (len(run) if run else 1))
+
+    def _next_terminator(self, position: int) -> Optional[int]:
+        self._scan_past(position)
+        index = bisect_right(self.ends, position)
+        if index == len(self.ends):
+            return None
+        return max(self.starts[index], position)
+
+    def _last_terminator(self, low: int, high: int) -> Optional[int]:
+        if high < low:
+            return None
+        self._scan_past(high)
+        index = bisect_right(self.starts, high) - 1
+        if index < 0:
+            return None
+        end = min(self.ends[index] - 1, high)
+        return end if end >= max(low, self.starts[index]) else None
+
+
+@lru_cache(maxsize=256)
+def linear_pattern(pattern: str, flags: int = 0) -> LazyRunPattern:
+    """A cached LazyRunPattern, for patterns built at run time (like re's own cache)"""
+    return LazyRunPattern(pattern, flags)
+
+
+_PHRASE_END = re.compile(r'[\s.]')
+
+
+def phrase_containing(text: str, word: str) -> Optional[str]:
+    """group(1) of re.search(r'([^.]*?' + re.escape(word) + r'[^.]*?)(?:\\s|$|\\.)', text), in linear time.
+
+    The leftmost start is just after the last period before the first
+    occurrence of word, and the phrase ends at the first whitespace or period
+    after it (or at the end of the text).
+    """
+    found = text.find(word)
+    if found < 0:
+        return None
+    end = _PHRASE_END.search(text, found + len(word))
+    return text[text.rfind('.', 0, found) + 1:end.start() if end else len(text)]
+
+
+INQUIRY_QUESTION_KEYWORD = r'inquiry\s+question'
+_INQUIRY_QUESTION = re.compile(INQUIRY_QUESTION_KEYWORD)
+_COLON_SPACE_RUN = re.compile(r'[:\s]*')
+
+
+def inquiry_question(text: str, keywords: Optional[Iterable[Tuple[int, int]]] = None) -> Optional[str]:
+    """What re.search(r'inquiry\\s+question[s]?[:\\s]*([^.]+[?.])', text) matches, in linear time.
+
+    The greedy phrase runs to the first period after the keyword, or when
+    there is none, back to the last question mark; only when either is
+    right after the tail does the tail give back a character. keywords are
+    the spans of every INQUIRY_QUESTION_KEYWORD match, if already known.
+    """
+    last_question = text.rfind('?')
+    period = None  # first period at or after some earlier tail end, or -1
+    if keywords is None:
+        keywords = (keyword.span() for keyword in _INQUIRY_QUESTION.finditer(text))
+    for start, end in keywords:
+        tail_starts = [end + 1, end] if text.startswith('s', end) else [end]
+        for tail_start in tail_starts:
+            high = _COLON_SPACE_RUN.match(text, tail_start).end()
+            # Tail characters are never periods, so every phrase start in [tail_start, high] sees the same one
+            if period is None or (period != -1 and period < high):
+                period = text.find('.', high)
+            if period > high or (period == high and high > tail_start):
+                return text[start:period + 1]
+            if period == -1 and last_question > tail_start:
+                return text[start:last_question + 1]
+    return None
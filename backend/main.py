@@ -1,36 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import (
+    FastAPI, Depends, HTTPException, status, UploadFile, File, Request, WebSocket, WebSocketDisconnect, Query, Header,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, Text, Date
+from sqlalchemy import create_engine, Column, Integer, String, Text, Date, JSON, Index, and_, or_, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker, Session, deferred, load_only, undefer_group
+import datetime
 from datetime import date
-from typing import List, Optional
+from typing import List, Optional, Union
 import urllib.parse
-import PyPDF2
+import asyncio
+import base64
 import io
-import re
-from docx import Document
-import fitz  # PyMuPDF for better PDF parsing
+import json
+import logging
+import time
 from dotenv import load_dotenv
 import os
-from document_generator import DocumentGenerator
 from enhanced_parser import EnhancedSchemeParser
+from job_store import JOB_COMPLETED, UNFINISHED_STATUSES, get_job_store
+from progress_events import TERMINAL_STAGES, format_sse, get_progress_hub
+# The extraction helpers and legacy parser live in legacy_parser so worker processes can import them
+from legacy_parser import LEGACY_SEGMENTER, extract_text_from_docx, extract_text_from_pdf
+from line_segmenter import BLANK
+from cbc_taxonomy import get_taxonomy, get_taxonomy_loader
+from incremental_parser import IncrementalParseSession
+from parse_budget import PARSE_BUDGET_MAX_SECONDS
+from scheme_document import SchemeDocument
+from single_flight import SingleFlight
+from upload_spool import (
+    MAX_BATCH_FILES, MAX_BATCH_UPLOAD_BYTES, MAX_UPLOAD_BYTES, MULTIPART_OVERHEAD_BYTES,
+    spool_upload, spool_zip_members, upload_too_large,
+)
+from worker_pool import (
+    PARSE_RESULT_VERSION, export_pdf, export_word, get_default_pool, parse_scheme_text, parse_scheme_upload,
+    parse_scheme_upload_within, resume_scheme_parse, run_parse_job,
+)
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Database Configuration
-db_password = os.getenv("DB_PASSWORD")
-db_host = os.getenv("DB_HOST")
+# Database Configuration; a DATABASE_URL replaces the MySQL settings (the API tests use SQLite)
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    db_password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST")
 
-if not db_password or not db_host:
-    raise ValueError("DB_PASSWORD and DB_HOST environment variables are not set")
+    if not db_password or not db_host:
+        raise ValueError("DB_PASSWORD and DB_HOST environment variables are not set")
 
-# URL encode the password to handle special characters
-password = urllib.parse.quote_plus(db_password)
-DATABASE_URL = f"mysql+pymysql://root:{password}@{db_host}/lesson_plans_db"
+    # URL encode the password to handle special characters
+    password = urllib.parse.quote_plus(db_password)
+    DATABASE_URL = f"mysql+pymysql://root:{password}@{db_host}/lesson_plans_db"
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -39,6 +66,9 @@ Base = declarative_base()
 # SQLAlchemy Model
 class DBLessonPlan(Base):
     __tablename__ = "lesson_plans"
+    # List fields are JSON arrays (development_steps of step objects); migrate_lesson_plan_json.py converts
+    # tables from the newline-joined text they used to hold. The long text and JSON columns are loaded only
+    # when asked for, together, with undefer_group("content")
 
     id = Column(Integer, primary_key=True, index=True)
     school = Column(String(255), index=True)
@@ -52,23 +82,38 @@ class DBLessonPlan(Base):
     title = Column(String(255))
     strand = Column(String(255))
     sub_strand = Column(String(255))
-    specific_learning_outcomes = Column(Text)
-    core_competencies = Column(Text)
-    key_inquiry_question = Column(Text)
-    learning_resources = Column(Text)
+    specific_learning_outcomes = deferred(Column(JSON), group="content")
+    core_competencies = deferred(Column(JSON), group="content")
+    key_inquiry_question = deferred(Column(Text), group="content")
+    learning_resources = deferred(Column(JSON), group="content")
     introduction_duration = Column(String(255))
-    introduction_activities = Column(Text)
+    introduction_activities = deferred(Column(JSON), group="content")
     development_duration = Column(String(255))
-    development_steps = Column(Text)
+    development_steps = deferred(Column(JSON), group="content")
     conclusion_duration = Column(String(255))
-    conclusion_activities = Column(Text)
-    extended_activities = Column(Text)
-    assessment = Column(Text)
-    teacher_self_evaluation = Column(Text)
-    reflection = Column(Text)
+    conclusion_activities = deferred(Column(JSON), group="content")
+    extended_activities = deferred(Column(JSON), group="content")
+    assessment = deferred(Column(Text), group="content")
+    teacher_self_evaluation = deferred(Column(Text), group="content")
+    reflection = deferred(Column(Text), group="content")
 
-# Create database tables
+    __table_args__ = (
+        # GET /lesson-plans/ filters by school and learning area and pages in (term, week, lesson_number, id) order
+        Index("ix_lesson_plans_browse", "school", "learning_area", "term", "week", "lesson_number", "id"),
+        Index("ix_lesson_plans_order", "term", "week", "lesson_number", "id"),
+    )
+
+# Create database tables, and indexes added since a table was created
 Base.metadata.create_all(bind=engine)
+for index in DBLessonPlan.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
+# Keyset pagination order of GET /lesson-plans/. term, week and lesson_number may be NULL, which MySQL and SQLite
+# sort before every value
+LESSON_PLAN_ORDER = (DBLessonPlan.term, DBLessonPlan.week, DBLessonPlan.lesson_number, DBLessonPlan.id)
+
+# A bulk insert may be a single multi-row INSERT on MySQL, whose placeholders are capped at 65,535
+MAX_BULK_LESSON_PLANS = int(os.getenv("MAX_BULK_LESSON_PLANS", "1000"))
 
 # Pydantic Schemas
 class Introduction(BaseModel):
@@ -117,18 +162,97 @@ class LessonPlan(LessonPlanBase):
     class Config:
         from_attributes = True
 
+class LessonPlanSummary(BaseModel):
+    """Some fields of a lesson plan, as asked for with fields=; those not asked for are left out of the response"""
+    id: int
+    school: Optional[str] = None
+    level: Optional[str] = None
+    learningArea: Optional[str] = None
+    date: Optional[datetime.date] = None  # not Optional[date]: the field's own name would shadow the type
+    roll: Optional[str] = None
+    term: Optional[int] = None
+    week: Optional[int] = None
+    lessonNumber: Optional[int] = None
+    title: Optional[str] = None
+    strand: Optional[str] = None
+    subStrand: Optional[str] = None
+    specificLearningOutcomes: Optional[List[str]] = None
+    coreCompetencies: Optional[List[str]] = None
+    keyInquiryQuestion: Optional[str] = None
+    learningResources: Optional[List[str]] = None
+    introduction: Optional[Introduction] = None
+    lessonDevelopment: Optional[LessonDevelopment] = None
+    conclusion: Optional[Introduction] = None
+    extendedActivities: Optional[List[str]] = None
+    assessment: Optional[str] = None
+    teacherSelfEvaluation: Optional[str] = None
+    reflection: Optional[str] = None
+
+class LessonPlanPage(BaseModel):
+    lesson_plans: List[Union[LessonPlan, LessonPlanSummary]]
+    next_cursor: Optional[str] = None  # pass as cursor for the next page; None on the last page
+
+class BulkLessonPlanResponse(BaseModel):
+    ids: List[int]  # generated ids, in the order the lesson plans were sent
+
 class ParsedSchemeResponse(BaseModel):
     success: bool
     message: str
     weeks_found: List[int]
     lesson_plans: List[dict]
+    strategy: Optional[str] = None  # "enhanced" or "legacy": which parser produced the result
+    # Set when a time budget ran out: lesson_plans holds the lessons finished so far
+    partial: bool = False
+    next_page: Optional[int] = None  # first page not yet extracted
+    next_week: Optional[int] = None  # first week not yet parsed, when known
+    continuation_token: Optional[str] = None  # for POST /parse-scheme/continue/{token}
 
 class TextInput(BaseModel):
     text_content: str
 
+class BatchFileResult(BaseModel):
+    filename: str
+    duplicate_of: Optional[str] = None  # earlier file with identical content whose result is reused
+    seconds: float
+    result: ParsedSchemeResponse
+
+class BatchTiming(BaseModel):
+    files: int
+    unique_files: int
+    spool_seconds: float
+    parse_seconds: float  # wall time spent parsing the unique files in parallel
+    total_file_seconds: float  # the same files' parse times added up
+    total_seconds: float
+
+class BatchParseResponse(BaseModel):
+    results: List[BatchFileResult]
+    timing: BatchTiming
+
+class ParseJobStatus(BaseModel):
+    id: str
+    filename: str
+    status: str  # queued, running, completed, failed or interrupted
+    pages_done: int
+    pages_total: Optional[int] = None
+    lessons_found: int
+    elapsed_seconds: float
+    error: Optional[str] = None
+
 # FastAPI App
 app = FastAPI(title="Lesson Plan Generator API", version="1.0.0")
 
+# Uploads of the same scheme that arrive while it is being parsed wait for that parse
+parse_flights = SingleFlight()
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse bodies over the upload cap from Content-Length, before the multipart body is read"""
+    max_bytes = MAX_BATCH_UPLOAD_BYTES if request.url.path == "/parse-scheme/batch" else MAX_UPLOAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        return JSONResponse(status_code=413, content={"detail": upload_too_large(max_bytes).detail})
+    return await call_next(request)
+
 # Add CORS middleware to allow frontend connections
 app.add_middleware(
     CORSMiddleware,
@@ -146,304 +270,59 @@ def get_db():
     finally:
         db.close()
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF using PyMuPDF (better for complex layouts)"""
-    try:
-        doc = fitz.open(stream=file_content, filetype="pdf")
-        text = ""
-        for page in doc:
-            text += page.get_text("text")
-        doc.close()
-        return text
-    except Exception as e:
-        # Fallback to PyPDF2
-        try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text
-        except Exception as e2:
-            raise HTTPException(status_code=400, detail=f"Failed to extract text from PDF: {str(e2)}")
-
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file"""
-    try:
-        doc = Document(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to extract text from DOCX: {str(e)}")
+@app.on_event("startup")
+async def start_progress_relay():
+    get_progress_hub().start_relay(asyncio.get_running_loop())
 
-def parse_scheme_of_work(text: str, filename: str = "") -> dict:
-    """Enhanced parsing with multiple strategies and robust error handling"""
-    
-    # Initialize enhanced parser
-    enhanced_parser = EnhancedSchemeParser()
-    
-    # Try enhanced parsing first (for file uploads)
-    if filename:
-        try:
-            # This assumes we have the file content as bytes
-            # For text input, we'll use the fallback method
-            pass
-        except Exception as e:
-            print(f"Enhanced parser failed: {e}")
-    
-    # Fallback to original parsing method
-    try:
-        # Enhanced patterns for week detection
-        week_patterns = [
-            r'WEEK\s*(\d+)', r'WK\s*(\d+)', r'W(\d+)', r'(\d+)\s*WEEK',
-            r'^\s*(\d+)\s*[.\-:]', r'Week\s+(\d+)', r'week\s+(\d+)',
-            r'TERM\s+\d+\s+WEEK\s+(\d+)', r'T\d+W(\d+)'
-        ]
-        
-        # More comprehensive keyword mapping with variations
-        keyword_map = {
-            'lesson': ['lesson', 'lessons', 'lesson title', 'topic', 'lesson topic'],
-            'strand': ['strand', 'theme', 'topic area', 'main topic', 'subject area', 'content area'],
-            'sub_strand': ['sub-strand', 'sub strand', 'substrand', 'subtopic', 'sub-theme', 
-                          'sub-topic', 'sub topic', 'specific topic', 'focus area'],
-            'title': ['title', 'lesson title', 'topic title', 'subject', 'lesson name'],
-            'specific_learning_outcomes': ['learning outcomes', 'specific learning', 'slo', 'objectives', 
-                                         'learning objectives', 'expected outcomes', 'outcomes', 'goals'],
-            'core_competencies': ['core competencies', 'competencies', 'core skills', 'skills', 
-                                'key competencies', 'competency areas'],
-            'key_inquiry_question': ['key inquiry', 'inquiry question', 'kiq', 'guiding question', 
-                                   'essential question', 'inquiry questions'],
-            'learning_resources': ['resources', 'materials', 'learning materials', 'references', 
-                                 'teaching materials', 'learning resources', 'teaching aids'],
-            'assessment': ['assessment', 'evaluation', 'assessment methods', 'assessment techniques', 
-                         'evaluation methods', 'assessment strategies'],
-            'reflection': ['reflection', 'self-reflection', 'teacher reflection', 'reflections'],
-            'activities': ['activity', 'activities', 'introduction', 'development', 'conclusion', 
-                         'learning experiences', 'procedure', 'teaching activities', 'learning activities']
-        }
-
-        lines = text.split('\n')
-        weeks_found = []
-        lesson_plans = []
-        current_lesson_data = {}
-        current_week = None
-        current_section = None
-        
-        # Debug information
-        print(f"DEBUG: Processing {len(lines)} lines of text")
-        
-        def save_current_lesson():
-            if current_lesson_data and current_lesson_data.get('week'):
-                # Handle title parsing for strand/sub_strand extraction
-                title = current_lesson_data.get('title', '')
-                if title and not current_lesson_data.get('strand'):
-                    if ':' in title:
-                        parts = title.split(':', 1)
-                        current_lesson_data['strand'] = parts[0].strip()
-                        current_lesson_data['sub_strand'] = parts[1].strip()
-                    elif '-' in title:
-                        parts = title.split('-', 1)
-                        current_lesson_data['strand'] = parts[0].strip()
-                        current_lesson_data['sub_strand'] = parts[1].strip()
-                    else:
-                        current_lesson_data['strand'] = title
-                
-                # Ensure we have at least some content
-                if (current_lesson_data.get('strand') or 
-                    current_lesson_data.get('title') or 
-                    current_lesson_data.get('specific_learning_outcomes') or
-                    current_lesson_data.get('activities')):
-                    
-                    # Set defaults for missing fields
-                    if not current_lesson_data.get('sub_strand'):
-                        current_lesson_data['sub_strand'] = 'N/A'
-                    if not current_lesson_data.get('title'):
-                        current_lesson_data['title'] = f"Week {current_lesson_data['week']} Lesson"
-                    
-                    lesson_plans.append(current_lesson_data.copy())
-                    print(f"DEBUG: Saved lesson for week {current_lesson_data['week']}")
-
-        # First pass: look for week patterns and collect all content
-        week_content = {}
-        current_week_lines = []
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check for week pattern
-            found_week = False
-            for pattern in week_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    # Save previous week's content
-                    if current_week and current_week_lines:
-                        week_content[current_week] = current_week_lines.copy()
-                    
-                    week_num = int(match.group(1))
-                    if week_num not in weeks_found:
-                        weeks_found.append(week_num)
-                    current_week = week_num
-                    current_week_lines = [line]
-                    found_week = True
-                    print(f"DEBUG: Found week {week_num}")
-                    break
-            
-            if not found_week and current_week:
-                current_week_lines.append(line)
-        
-        # Save the last week's content
-        if current_week and current_week_lines:
-            week_content[current_week] = current_week_lines.copy()
-
-        # Second pass: parse each week's content
-        for week_num in sorted(weeks_found):
-            if week_num not in week_content:
-                continue
-                
-            current_lesson_data = {
-                'week': week_num,
-                'lessonNumber': 1,
-                'title': '', 'strand': '', 'sub_strand': '',
-                'specific_learning_outcomes': [], 'core_competencies': [],
-                'key_inquiry_question': '', 'learning_resources': [],
-                'activities': [], 'assessment': '', 'reflection': ''
-            }
-            
-            current_section = None
-            week_lines = week_content[week_num]
-            
-            print(f"DEBUG: Processing week {week_num} with {len(week_lines)} lines")
-            
-            for line in week_lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                line_lower = line.lower()
-                found_section = False
-                
-                # Check for section headers
-                for section, keywords in keyword_map.items():
-                    for keyword in keywords:
-                        keyword_lower = keyword.lower()
-                        
-                        # Check various patterns
-                        patterns_to_check = [
-                            f'{keyword_lower}:',
-                            f'{keyword_lower} :',
-                            f'{keyword_lower}-',
-                            f'{keyword_lower} -',
-                        ]
-                        
-                        for pattern in patterns_to_check:
-                            if pattern in line_lower:
-                                current_section = section
-                                # Extract content after the keyword
-                                content = ""
-                                if ':' in line:
-                                    content = line.split(':', 1)[-1].strip()
-                                elif '-' in line:
-                                    content = line.split('-', 1)[-1].strip()
-                                
-                                if content:
-                                    if isinstance(current_lesson_data[current_section], list):
-                                        current_lesson_data[current_section].append(content)
-                                    else:
-                                        current_lesson_data[current_section] = content
-                                
-                                found_section = True
-                                print(f"DEBUG: Found section '{section}' with content: '{content[:50]}...'")
-                                break
-                        
-                        # Also check if line starts with keyword
-                        if not found_section and line_lower.startswith(keyword_lower + ' '):
-                            current_section = section
-                            content = line[len(keyword):].strip()
-                            if content:
-                                if isinstance(current_lesson_data[current_section], list):
-                                    current_lesson_data[current_section].append(content)
-                                else:
-                                    current_lesson_data[current_section] = content
-                            found_section = True
-                            print(f"DEBUG: Found section '{section}' starting with keyword")
-                            break
-                    
-                    if found_section:
-                        break
-                
-                # If no section found but we have a current section, add to it
-                if not found_section and current_section and line:
-                    # Skip if it looks like a new week number
-                    skip_line = False
-                    for pattern in week_patterns:
-                        if re.search(pattern, line, re.IGNORECASE):
-                            skip_line = True
-                            break
-                    
-                    if not skip_line:
-                        if isinstance(current_lesson_data[current_section], list):
-                            current_lesson_data[current_section].append(line)
-                        else:
-                            current_lesson_data[current_section] += f" {line}"
-                        print(f"DEBUG: Added to section '{current_section}': '{line[:30]}...'")
-                
-                # If no section is set yet, try to infer from content
-                if not current_section and not found_section:
-                    # If it's not a week header and contains meaningful content
-                    if not any(re.search(pattern, line, re.IGNORECASE) for pattern in week_patterns):
-                        if len(line) > 10:  # Reasonable content length
-                            # Default to title if nothing else is set
-                            if not current_lesson_data['title']:
-                                current_lesson_data['title'] = line
-                                print(f"DEBUG: Set title from content: '{line}'")
-                            else:
-                                # Add to activities as fallback
-                                current_lesson_data['activities'].append(line)
-                                print(f"DEBUG: Added to activities: '{line[:30]}...'")
-            
-            # Save this week's lesson
-            save_current_lesson()
+@app.on_event("startup")
+def mark_interrupted_jobs():
+    # Jobs still queued or running belonged to a previous server process
+    interrupted = get_job_store().mark_interrupted()
+    if interrupted:
+        logger.warning("Marked %d unfinished parse jobs as interrupted", interrupted)
 
-        print(f"DEBUG: Found {len(weeks_found)} weeks, created {len(lesson_plans)} lesson plans")
-
-        if not weeks_found:
-            return {'error': "No week numbers found. Please ensure your document contains week indicators like 'Week 1', 'Week 2', etc."}
-        
-        if not lesson_plans:
-            # Provide more detailed error information
-            debug_info = f"Weeks found: {weeks_found}. "
-            if week_content:
-                sample_content = list(week_content.values())[0][:3]  # First few lines of first week
-                debug_info += f"Sample content: {sample_content}"
-            
-            return {'error': f"Found week numbers but could not parse lesson content. {debug_info}"}
-
-        return {
-            'weeks_found': sorted(weeks_found),
-            'lesson_plans': lesson_plans,
-            'total_weeks': len(weeks_found),
-            'confidence': 1.0 if len(lesson_plans) > 0 else 0.5
-        }
-        
-    except Exception as e:
-        print(f"DEBUG: Exception occurred: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {'error': f'An unexpected error occurred during parsing: {str(e)}'}
+@app.on_event("shutdown")
+def shutdown_worker_pool():
+    get_default_pool().shutdown()
+    get_progress_hub().stop_relay()
 
 @app.get("/")
 def read_root():
     return {"message": "Lesson Plan Generator API is running!"}
 
+@app.get("/worker-pool/stats")
+def read_worker_pool_stats():
+    """Queue depth, wait times and rejections of the parse/export pool, for sizing it"""
+    return get_default_pool().stats()
+
+@app.get("/single-flight/stats")
+def read_single_flight_stats():
+    """Parses started and duplicate uploads that shared an in-flight parse instead"""
+    return parse_flights.stats()
+
+@app.get("/taxonomy/version")
+def read_taxonomy_version():
+    """Version and digest of the CBC taxonomy this process is using, and any failed reload"""
+    return get_taxonomy_loader().status()
+
+def parse_budget_seconds(budget: Optional[float], header_budget: Optional[float]) -> Optional[float]:
+    """The time budget asked for with ?budget= or X-Parse-Budget (the query parameter wins), in seconds"""
+    seconds = budget if budget is not None else header_budget
+    if seconds is not None and not 0 < seconds <= PARSE_BUDGET_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Time budget must be between 0 and {PARSE_BUDGET_MAX_SECONDS:g} seconds")
+    return seconds
+
 @app.post("/parse-scheme/", response_model=ParsedSchemeResponse)
-async def parse_scheme_file(file: UploadFile = File(...)):
-    """Enhanced parsing of uploaded scheme of work file"""
+async def parse_scheme_file(file: UploadFile = File(...), budget: Optional[float] = Query(None),
+                            x_parse_budget: Optional[float] = Header(None)):
+    """Enhanced parsing of uploaded scheme of work file.
+
+    With a time budget (seconds, ?budget= or X-Parse-Budget) a PDF parse
+    stops between pages or weeks once the budget is spent and returns a
+    partial result; POST /parse-scheme/continue/{token} picks it up again.
+    """
     try:
+        budget_seconds = parse_budget_seconds(budget, x_parse_budget)
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file uploaded")
 
@@ -456,62 +335,353 @@ async def parse_scheme_file(file: UploadFile = File(...)):
                 detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
             )
 
-        file_content = await file.read()
-        
-        # Try enhanced parser first
-        try:
-            enhanced_parser = EnhancedSchemeParser()
-            if file_extension == 'pdf':
-                parsed_data = enhanced_parser.parse_scheme(file_content, file.filename)
-                
-                if parsed_data['success'] and parsed_data['lesson_plans']:
-                    return ParsedSchemeResponse(
-                        success=True,
-                        message=parsed_data['message'],
-                        weeks_found=parsed_data['weeks_found'],
-                        lesson_plans=parsed_data['lesson_plans']
-                    )
-        except Exception as e:
-            print(f"Enhanced parser failed, falling back to original: {e}")
-        
-        # Fallback to original parsing
-        if file_extension == 'pdf':
-            text = extract_text_from_pdf(file_content)
-        elif file_extension in ['docx', 'doc']:
-            text = extract_text_from_docx(file_content)
-        elif file_extension == 'txt':
-            text = file_content.decode('utf-8')
+        # Refuse before spooling the upload when the parse queue is already full
+        parse_pool = get_default_pool()
+        parse_pool.check_capacity()
+
+        # Spool to disk (rejecting oversized files with 413); a worker process
+        # extracts it once and falls back to the original parser if needed
+        upload = await spool_upload(file)
+        if budget_seconds is None:
+            parsed_data = await parse_upload_once(parse_pool, upload, file_extension)
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format")
+            # A budgeted parse may stop early, so it is not shared with other uploads
+            with upload:
+                parsed_data = await parse_pool.run(parse_scheme_upload_within, upload.path, file_extension,
+                                                   upload.filename, upload.digest, budget_seconds)
+
+        return ParsedSchemeResponse(**parsed_data)
+        
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
-        parsed_data = parse_scheme_of_work(text, file.filename)
+@app.post("/parse-scheme/continue/{token}", response_model=ParsedSchemeResponse)
+async def continue_parse_scheme(token: str, budget: Optional[float] = Query(None),
+                                x_parse_budget: Optional[float] = Header(None)):
+    """Resume a parse that ran out of its time budget; each token can be used once.
 
-        if 'error' in parsed_data:
-            # If parsing fails, return a more helpful response
-            return ParsedSchemeResponse(
-                success=False,
-                message=f"Could not parse scheme structure. {parsed_data['error']}. Please check if your scheme follows standard CBC format.",
-                weeks_found=[],
-                lesson_plans=[]
-            )
+    Lessons are returned cumulatively, so the last response holds the
+    whole scheme, as an unbudgeted parse would.
+    """
+    budget_seconds = parse_budget_seconds(budget, x_parse_budget) or PARSE_BUDGET_MAX_SECONDS
+    parse_pool = get_default_pool()
+    return ParsedSchemeResponse(**await parse_pool.run(resume_scheme_parse, token, budget_seconds))
 
+@app.post("/parse-scheme/batch", response_model=BatchParseResponse)
+async def parse_scheme_batch(files: List[UploadFile] = File(...)):
+    """Parse several schemes, or ZIP archives of them, in parallel on the worker pool.
+
+    Files with identical content are parsed once and share the result.
+    """
+    started = time.perf_counter()
+    parse_pool = get_default_pool()
+    parse_pool.check_capacity()
+
+    uploads = []
+    handed_over = set()  # uploads now owned by a (possibly shared) parse, which deletes them
+    try:
+        for file in files:
+            if not file.filename:
+                raise HTTPException(status_code=400, detail="No file uploaded")
+            if file.filename.lower().endswith('.zip'):
+                with await spool_upload(file, MAX_BATCH_UPLOAD_BYTES) as archive:
+                    uploads.extend(await run_in_threadpool(
+                        spool_zip_members, archive, max_files=MAX_BATCH_FILES - len(uploads)
+                    ))
+            else:
+                uploads.append(await spool_upload(file))
+            if len(uploads) > MAX_BATCH_FILES:
+                raise HTTPException(status_code=413, detail=f"Too many files. Maximum is {MAX_BATCH_FILES} per batch")
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No scheme files found in the upload")
+        spooled = time.perf_counter()
+
+        first_by_digest = {}
+        for upload in uploads:
+            first_by_digest.setdefault(upload.digest, upload)
+
+        # At most one file per worker at a time, so the rest of the queue stays free for other requests
+        slots = asyncio.Semaphore(parse_pool.workers)
+
+        async def parse_file(upload):
+            async with slots:
+                file_started = time.perf_counter()
+                handed_over.add(upload.path)
+                result = await parse_batch_file(parse_pool, upload)
+                return result, time.perf_counter() - file_started
+
+        outcomes = dict(zip(
+            first_by_digest,
+            await asyncio.gather(*(parse_file(upload) for upload in first_by_digest.values()))
+        ))
+        parsed = time.perf_counter()
+    finally:
+        for upload in uploads:
+            if upload.path not in handed_over:
+                upload.close()
+
+    results = []
+    for upload in uploads:
+        result, seconds = outcomes[upload.digest]
+        first = first_by_digest[upload.digest]
+        results.append(BatchFileResult(
+            filename=upload.filename,
+            duplicate_of=first.filename if first is not upload else None,
+            seconds=round(seconds if first is upload else 0.0, 3),
+            result=result
+        ))
+
+    return BatchParseResponse(
+        results=results,
+        timing=BatchTiming(
+            files=len(uploads),
+            unique_files=len(first_by_digest),
+            spool_seconds=round(spooled - started, 3),
+            parse_seconds=round(parsed - spooled, 3),
+            total_file_seconds=round(sum(seconds for _, seconds in outcomes.values()), 3),
+            total_seconds=round(time.perf_counter() - started, 3)
+        )
+    )
+
+async def parse_upload_once(parse_pool, upload, file_extension: str) -> dict:
+    """Parse a spooled upload on the pool, sharing the parse with concurrent uploads of the same content.
+
+    Takes ownership of the upload: it is deleted straight away when another
+    request is already parsing the same bytes, otherwise once the shared
+    parse finishes, even if this request has been cancelled by then.
+    """
+    async def parse():
+        with upload:
+            return await parse_pool.run(parse_scheme_upload, upload.path, file_extension, upload.filename, upload.digest)
+
+    # Uploads only share a parse made with the same taxonomy
+    key = (upload.digest, file_extension, PARSE_RESULT_VERSION, get_taxonomy().digest)
+    future, started = parse_flights.flight(key, parse)
+    if not started:
+        upload.close()
+    return await asyncio.shield(future)
+
+async def parse_batch_file(parse_pool, upload) -> ParsedSchemeResponse:
+    """Parse one file of a batch, taking ownership of the upload.
+
+    Failures become an unsuccessful result instead of failing the batch.
+    """
+    allowed_types = ['.pdf', '.docx', '.doc', '.txt']
+    file_extension = upload.filename.lower().split('.')[-1]
+    if f'.{file_extension}' not in allowed_types:
+        upload.close()
         return ParsedSchemeResponse(
-            success=True,
-            message=f"Successfully parsed {parsed_data['total_weeks']} weeks of lesson plans",
-            weeks_found=parsed_data['weeks_found'],
-            lesson_plans=parsed_data['lesson_plans']
+            success=False,
+            message=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}",
+            weeks_found=[],
+            lesson_plans=[]
         )
-        
+
+    try:
+        parsed_data = await parse_upload_once(parse_pool, upload, file_extension)
     except HTTPException as e:
-        raise e
+        return ParsedSchemeResponse(success=False, message=str(e.detail), weeks_found=[], lesson_plans=[])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+        return ParsedSchemeResponse(success=False, message=f"An unexpected error occurred: {str(e)}", weeks_found=[], lesson_plans=[])
+    return ParsedSchemeResponse(**parsed_data)
+
+@app.post("/jobs/parse-scheme", status_code=202)
+async def create_parse_job(file: UploadFile = File(...)):
+    """Queue a scheme for parsing and return a job id straight away.
+
+    Poll GET /jobs/{id} for progress and fetch GET /jobs/{id}/result once
+    the job has completed.
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    allowed_types = ['.pdf', '.txt']
+    file_extension = file.filename.lower().split('.')[-1]
+
+    if f'.{file_extension}' not in allowed_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
+        )
+
+    parse_pool = get_default_pool()
+    parse_pool.check_capacity()
+    upload = await spool_upload(file)
+
+    store = get_job_store()
+    job_id = store.create(file.filename)
+    try:
+        future = parse_pool.submit(run_parse_job, job_id, upload.path, file.filename, upload.digest)
+    except BaseException as e:
+        upload.close()
+        store.fail(job_id, str(getattr(e, 'detail', e)))
+        raise
+
+    def job_finished(future):
+        upload.close()
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            # The worker never got to record the outcome (e.g. it was killed)
+            store.fail(job_id, f"Parse worker failed: {error or 'cancelled'}")
+            get_progress_hub().publish(job_id, {'stage': 'failed', 'error': f"Parse worker failed: {error or 'cancelled'}"})
+
+    future.add_done_callback(job_finished)
+
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+        "events_url": f"/jobs/{job_id}/events",
+    }
+
+@app.get("/jobs/{job_id}", response_model=ParseJobStatus)
+def read_parse_job(job_id: str):
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ParseJobStatus(**job)
+
+# Seconds a quiet event stream waits before re-reading the stored job state and sending a keep-alive
+JOB_EVENTS_KEEPALIVE_SECONDS = 15
+
+@app.get("/jobs/{job_id}/events")
+async def stream_parse_job_events(job_id: str):
+    """Server-Sent Events for a parse job.
+
+    Sends a "status" event with the stored job state, then one event per
+    progress step ("started", "pages", "weeks", "lessons", "enhance") until
+    "completed" or "failed". Progress events carry elapsed and stage times.
+    """
+    store = get_job_store()
+    hub = get_progress_hub()
+
+    # Subscribe before reading the stored state so no event can fall in between
+    queue = hub.subscribe(job_id)
+    job = store.get(job_id)
+    if job is None:
+        hub.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def generate_events():
+        try:
+            yield format_sse("status", job)
+            if job['status'] not in UNFINISHED_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=JOB_EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Fall back to the store in case the final event was missed
+                    current = store.get(job_id)
+                    if current['status'] not in UNFINISHED_STATUSES:
+                        yield format_sse("status", current)
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event['stage'], event)
+                if event['stage'] in TERMINAL_STAGES:
+                    return
+        finally:
+            hub.unsubscribe(job_id, queue)
+
+    # The background task also unsubscribes if the client disconnects before streaming starts
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(hub.unsubscribe, job_id, queue)
+    )
+
+@app.get("/jobs/{job_id}/result", response_model=ParsedSchemeResponse)
+def read_parse_job_result(job_id: str):
+    store = get_job_store()
+    job = store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job['status'] in UNFINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is still {job['status']}")
+    if job['status'] != JOB_COMPLETED:
+        return ParsedSchemeResponse(
+            success=False,
+            message=f"Parsing job {job['status']}: {job['error']}",
+            weeks_found=[],
+            lesson_plans=[],
+            strategy="enhanced"
+        )
+    return ParsedSchemeResponse(**store.get_result(job_id))
+
+@app.post("/parse-scheme/stream")
+async def parse_scheme_file_stream(file: UploadFile = File(...)):
+    """Stream parsed lessons as NDJSON while the scheme is still being processed.
+
+    Each line is a JSON record: {"type": "lesson", ...} for every lesson as soon
+    as its week block or table row is complete, then one {"type": "summary", ...} record
+    (or {"type": "error", ...} if parsing fails part-way).
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+
+    allowed_types = ['.pdf', '.docx', '.doc', '.txt']
+    file_extension = file.filename.lower().split('.')[-1]
+
+    if f'.{file_extension}' not in allowed_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
+        )
+
+    # PDFs are read from the spooled file page by page while streaming
+    upload = await spool_upload(file)
+    enhanced_parser = EnhancedSchemeParser()
+
+    try:
+        if file_extension == 'pdf':
+            lessons = enhanced_parser.iter_pdf_lessons(upload.path, upload.digest)
+        elif file_extension in ['docx', 'doc']:
+            lessons = enhanced_parser.iter_lessons(extract_text_from_docx(upload.path).split('\n'))
+        else:
+            lessons = enhanced_parser.iter_lessons(upload.read_bytes().decode('utf-8', errors='ignore').split('\n'))
+    except BaseException:
+        upload.close()
+        raise
+
+    def generate_records():
+        weeks_found = set()
+        lesson_count = 0
+        try:
+            for lesson in lessons:
+                weeks_found.add(lesson.get('week', 1))
+                lesson_count += 1
+                yield json.dumps({"type": "lesson", "index": lesson_count, "lesson": lesson}, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "message": f"Error parsing scheme: {str(e)}", "lessons_sent": lesson_count}) + "\n"
+            return
+        finally:
+            # Close the PDF before deleting the spooled file (required on Windows)
+            lessons.close()
+            upload.close()
+
+        yield json.dumps({
+            "type": "summary",
+            "success": lesson_count > 0,
+            "message": f"Successfully parsed {lesson_count} lessons from scheme of work",
+            "weeks_found": sorted(weeks_found),
+            "lesson_count": lesson_count,
+        }) + "\n"
+
+    # A sync generator is iterated in Starlette's threadpool, so parsing does not block the event loop
+    # The background task also removes the spooled file if the client disconnects before streaming starts
+    return StreamingResponse(generate_records(), media_type="application/x-ndjson",
+                             background=BackgroundTask(upload.close))
 
 @app.post("/parse-text/", response_model=ParsedSchemeResponse)
 async def parse_text_input(text_input: TextInput):
     """Parse text content to extract lesson plan data"""
     try:
-        parsed_data = parse_scheme_of_work(text_input.text_content)
+        parsed_data = await get_default_pool().run(parse_scheme_text, text_input.text_content)
         if 'error' in parsed_data:
             raise HTTPException(status_code=400, detail=parsed_data['error'])
             
@@ -526,24 +696,90 @@ async def parse_text_input(text_input: TextInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse text: {str(e)}")
 
+@app.websocket("/ws/parse-text")
+async def parse_text_session(websocket: WebSocket):
+    """Parse text as it is edited, re-parsing only the weeks each edit touches.
+
+    The client sends {"type": "replace", "text": ...} to load text and
+    {"type": "edit", "changes": [{"start", "end", "text"}, ...]} for each
+    batch of keystrokes, with offsets in characters of the text so far.
+    Each message is answered with a "delta" holding the lessons that
+    changed and the weeks that lost theirs, or with an "error" after which
+    the session is unchanged.
+    """
+    await websocket.accept()
+    session = IncrementalParseSession(max_length=MAX_UPLOAD_BYTES)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+                if message.get('type') == 'replace':
+                    delta = await run_in_threadpool(session.replace, str(message['text']))
+                elif message.get('type') == 'edit':
+                    changes = [(int(change['start']), int(change['end']), str(change.get('text', '')))
+                               for change in message['changes']]
+                    delta = await run_in_threadpool(session.edit, changes)
+                else:
+                    raise ValueError(f"Unknown message type: {message.get('type')}")
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                await websocket.send_json({'type': 'error', 'version': session.version, 'message': str(e)})
+                continue
+            await websocket.send_json({'type': 'delta', **delta})
+    except WebSocketDisconnect:
+        pass
+
 @app.post("/api/export/word")
 async def export_to_word(lesson_plan: dict):
-    buffer = DocumentGenerator.generate_word_doc(lesson_plan)
+    document_bytes = await get_default_pool().run(export_word, lesson_plan)
     return StreamingResponse(
-        buffer,
+        io.BytesIO(document_bytes),
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         headers={"Content-Disposition": "attachment; filename=lesson_plan.docx"}
     )
 
 @app.post("/api/export/pdf")
 async def export_to_pdf(lesson_plan: dict):
-    buffer = DocumentGenerator.generate_pdf(lesson_plan)
+    document_bytes = await get_default_pool().run(export_pdf, lesson_plan)
     return StreamingResponse(
-        buffer,
+        io.BytesIO(document_bytes),
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=lesson_plan.pdf"}
     )
 
+def debug_line_report(text: str, week_line_limit: Optional[int] = None) -> dict:
+    """Line statistics for the debug endpoints, from one segmentation of the text"""
+    document = SchemeDocument(text)
+    segmentation = LEGACY_SEGMENTER.segment(document)
+    non_empty = [line_index for line_index, code in enumerate(segmentation.codes) if code != BLANK]
+    non_empty_lines = [document.line(line_index).strip() for line_index in non_empty]
+    
+    weeks_found = []
+    week_lines = []
+    for i, line_index in enumerate(non_empty[:week_line_limit]):
+        week_num = segmentation.weeks.get(line_index)
+        if week_num is not None:
+            weeks_found.append(week_num)
+            week_lines.append(f"Line {i+1}: {non_empty_lines[i]}")
+    
+    # Look for potential keywords
+    keywords_to_check = ['strand', 'sub-strand', 'title', 'objective', 'outcome', 'resource', 'activity', 'assessment']
+    non_empty_lower = [document.line_lower(line_index).strip() for line_index in non_empty]
+    keyword_counts = {keyword: sum(1 for line_lower in non_empty_lower if keyword in line_lower)
+                      for keyword in keywords_to_check}
+    
+    return {
+        "total_characters": len(text),
+        "total_lines": document.line_count,
+        "non_empty_lines": len(non_empty_lines),
+        "first_20_lines": non_empty_lines[:20],
+        "weeks_found": list(set(weeks_found)),
+        "week_lines": week_lines,
+        "line_types": segmentation.counts(),
+        "keyword_counts": keyword_counts,
+        "sample_text": text[:1000] + "..." if len(text) > 1000 else text
+    }
+
 @app.post("/debug-parse-scheme/")
 async def debug_parse_scheme_file(file: UploadFile = File(...)):
     """Debug version of parse scheme file to see what's happening"""
@@ -560,59 +796,19 @@ async def debug_parse_scheme_file(file: UploadFile = File(...)):
                 detail=f"Unsupported file type. Allowed types: {', '.join(allowed_types)}"
             )
 
-        file_content = await file.read()
-        
         # Extract text based on file type
-        if file_extension == 'pdf':
-            text = extract_text_from_pdf(file_content)
-        elif file_extension in ['docx', 'doc']:
-            text = extract_text_from_docx(file_content)
-        elif file_extension == 'txt':
-            text = file_content.decode('utf-8')
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format")
+        with await spool_upload(file) as upload:
+            if file_extension == 'pdf':
+                text = extract_text_from_pdf(upload.path, upload.digest)
+            elif file_extension in ['docx', 'doc']:
+                text = extract_text_from_docx(upload.path)
+            elif file_extension == 'txt':
+                text = upload.read_bytes().decode('utf-8')
+            else:
+                raise HTTPException(status_code=400, detail="Unsupported file format")
 
-        # Return debug information
-        lines = text.split('\n')
-        non_empty_lines = [line.strip() for line in lines if line.strip()]
-        
-        # Check for week patterns
-        week_patterns = [
-            r'WEEK\s*(\d+)', r'WK\s*(\d+)', r'W(\d+)', r'(\d+)\s*WEEK',
-            r'^\s*(\d+)\s*[.\-:]', r'Week\s+(\d+)', r'week\s+(\d+)',
-        ]
-        
-        weeks_found = []
-        week_lines = []
-        
-        for i, line in enumerate(non_empty_lines[:50]):  # First 50 lines for debug
-            for pattern in week_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    week_num = int(match.group(1))
-                    weeks_found.append(week_num)
-                    week_lines.append(f"Line {i+1}: {line}")
-                    break
-        
-        # Look for potential keywords
-        keyword_counts = {}
-        keywords_to_check = ['strand', 'sub-strand', 'title', 'objective', 'outcome', 'resource', 'activity', 'assessment']
-        
-        for keyword in keywords_to_check:
-            count = sum(1 for line in non_empty_lines if keyword.lower() in line.lower())
-            keyword_counts[keyword] = count
-        
-        return {
-            "filename": file.filename,
-            "total_characters": len(text),
-            "total_lines": len(lines),
-            "non_empty_lines": len(non_empty_lines),
-            "first_20_lines": non_empty_lines[:20],
-            "weeks_found": list(set(weeks_found)),
-            "week_lines": week_lines,
-            "keyword_counts": keyword_counts,
-            "sample_text": text[:1000] + "..." if len(text) > 1000 else text
-        }
+        # Return debug information (week lines from the first 50 non-empty lines)
+        return {"filename": file.filename, **debug_line_report(text, week_line_limit=50)}
         
     except Exception as e:
         return {"error": str(e), "traceback": str(e.__traceback__)}
@@ -621,53 +817,14 @@ async def debug_parse_scheme_file(file: UploadFile = File(...)):
 async def debug_parse_text_input(text_input: TextInput):
     """Debug version of parse text input"""
     try:
-        text = text_input.text_content
-        lines = text.split('\n')
-        non_empty_lines = [line.strip() for line in lines if line.strip()]
-        
-        # Check for week patterns
-        week_patterns = [
-            r'WEEK\s*(\d+)', r'WK\s*(\d+)', r'W(\d+)', r'(\d+)\s*WEEK',
-            r'^\s*(\d+)\s*[.\-:]', r'Week\s+(\d+)', r'week\s+(\d+)',
-        ]
-        
-        weeks_found = []
-        week_lines = []
-        
-        for i, line in enumerate(non_empty_lines):
-            for pattern in week_patterns:
-                match = re.search(pattern, line, re.IGNORECASE)
-                if match:
-                    week_num = int(match.group(1))
-                    weeks_found.append(week_num)
-                    week_lines.append(f"Line {i+1}: {line}")
-                    break
-        
-        # Look for potential keywords
-        keyword_counts = {}
-        keywords_to_check = ['strand', 'sub-strand', 'title', 'objective', 'outcome', 'resource', 'activity', 'assessment']
-        
-        for keyword in keywords_to_check:
-            count = sum(1 for line in non_empty_lines if keyword.lower() in line.lower())
-            keyword_counts[keyword] = count
-        
-        return {
-            "total_characters": len(text),
-            "total_lines": len(lines),
-            "non_empty_lines": len(non_empty_lines),
-            "first_20_lines": non_empty_lines[:20],
-            "weeks_found": list(set(weeks_found)),
-            "week_lines": week_lines,
-            "keyword_counts": keyword_counts,
-            "sample_text": text[:1000] + "..." if len(text) > 1000 else text
-        }
+        return debug_line_report(text_input.text_content)
         
     except Exception as e:
         return {"error": str(e)}
 
-@app.post("/lesson-plans/", response_model=LessonPlan)
-def create_lesson_plan(lesson_plan: LessonPlanCreate, db: Session = Depends(get_db)):
-    db_lesson_plan = DBLessonPlan(
+def lesson_plan_columns(lesson_plan: LessonPlanCreate) -> dict:
+    """Column values of the lesson_plans row for a lesson plan"""
+    return dict(
         school=lesson_plan.school,
         level=lesson_plan.level,
         learning_area=lesson_plan.learningArea,
@@ -679,157 +836,186 @@ def create_lesson_plan(lesson_plan: LessonPlanCreate, db: Session = Depends(get_
         title=lesson_plan.title,
         strand=lesson_plan.strand,
         sub_strand=lesson_plan.subStrand,
-        specific_learning_outcomes="\n".join(lesson_plan.specificLearningOutcomes),
-        core_competencies="\n".join(lesson_plan.coreCompetencies),
+        specific_learning_outcomes=lesson_plan.specificLearningOutcomes,
+        core_competencies=lesson_plan.coreCompetencies,
         key_inquiry_question=lesson_plan.keyInquiryQuestion,
-        learning_resources="\n".join(lesson_plan.learningResources),
+        learning_resources=lesson_plan.learningResources,
         introduction_duration=lesson_plan.introduction.duration,
-        introduction_activities="\n".join(lesson_plan.introduction.activities),
+        introduction_activities=lesson_plan.introduction.activities,
         development_duration=lesson_plan.lessonDevelopment.duration,
-        development_steps="\n".join([f"{step.stepNumber}. {step.activity} ({step.duration})" for step in lesson_plan.lessonDevelopment.steps]),
+        development_steps=[step.model_dump() for step in lesson_plan.lessonDevelopment.steps],
         conclusion_duration=lesson_plan.conclusion.duration,
-        conclusion_activities="\n".join(lesson_plan.conclusion.activities),
-        extended_activities="\n".join(lesson_plan.extendedActivities),
+        conclusion_activities=lesson_plan.conclusion.activities,
+        extended_activities=lesson_plan.extendedActivities,
         assessment=lesson_plan.assessment,
         teacher_self_evaluation=lesson_plan.teacherSelfEvaluation,
         reflection=lesson_plan.reflection,
     )
+
+def insert_lesson_plans(db: Session, lesson_plans: List[LessonPlanCreate]) -> List[int]:
+    """Insert lesson plans in one transaction, without committing; their ids in the same order"""
+    if not lesson_plans:
+        return []
+    table = DBLessonPlan.__table__
+    rows = [lesson_plan_columns(lesson_plan) for lesson_plan in lesson_plans]
+    if db.get_bind().dialect.insert_executemany_returning:
+        result = db.execute(table.insert().returning(table.c.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars())
+    # MySQL has no RETURNING, and PyMySQL would send an executemany INSERT as multi-row statements split by size,
+    # reporting the first id of the last one
+    increment, lock_mode = db.execute(text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")).one()
+    if lock_mode in (0, 1):
+        # These lock modes reserve one multi-row statement's ids as a block, stepped by the increment
+        result = db.execute(table.insert().values(rows))
+        return list(range(result.lastrowid, result.lastrowid + increment * len(rows), increment))
+    # Interleaved mode (MySQL 8's default) may mix ids between concurrent statements, so each row's id is read as
+    # it is inserted, still in the one transaction
+    return [db.execute(table.insert(), row).lastrowid for row in rows]
+
+# Each LessonPlan field: the lesson_plans columns it is read from, and how
+LESSON_PLAN_FIELDS = {
+    "id": (["id"], lambda lp: lp.id),
+    "school": (["school"], lambda lp: lp.school),
+    "level": (["level"], lambda lp: lp.level),
+    "learningArea": (["learning_area"], lambda lp: lp.learning_area),
+    "date": (["plan_date"], lambda lp: lp.plan_date),
+    "roll": (["roll"], lambda lp: lp.roll),
+    "term": (["term"], lambda lp: lp.term),
+    "week": (["week"], lambda lp: lp.week),
+    "lessonNumber": (["lesson_number"], lambda lp: lp.lesson_number),
+    "title": (["title"], lambda lp: lp.title),
+    "strand": (["strand"], lambda lp: lp.strand),
+    "subStrand": (["sub_strand"], lambda lp: lp.sub_strand),
+    "specificLearningOutcomes": (["specific_learning_outcomes"], lambda lp: lp.specific_learning_outcomes or []),
+    "coreCompetencies": (["core_competencies"], lambda lp: lp.core_competencies or []),
+    "keyInquiryQuestion": (["key_inquiry_question"], lambda lp: lp.key_inquiry_question),
+    "learningResources": (["learning_resources"], lambda lp: lp.learning_resources or []),
+    "introduction": (["introduction_duration", "introduction_activities"], lambda lp: Introduction(
+        duration=lp.introduction_duration, activities=lp.introduction_activities or [])),
+    "lessonDevelopment": (["development_duration", "development_steps"], lambda lp: LessonDevelopment(
+        duration=lp.development_duration, steps=lp.development_steps or [])),
+    "conclusion": (["conclusion_duration", "conclusion_activities"], lambda lp: Introduction(
+        duration=lp.conclusion_duration, activities=lp.conclusion_activities or [])),
+    "extendedActivities": (["extended_activities"], lambda lp: lp.extended_activities or []),
+    "assessment": (["assessment"], lambda lp: lp.assessment),
+    "teacherSelfEvaluation": (["teacher_self_evaluation"], lambda lp: lp.teacher_self_evaluation),
+    "reflection": (["reflection"], lambda lp: lp.reflection),
+}
+
+def lesson_plan_response(lp: DBLessonPlan) -> LessonPlan:
+    """The API form of a lesson_plans row; list columns are JSON, so they are used as they are"""
+    return LessonPlan(**{name: value(lp) for name, (_, value) in LESSON_PLAN_FIELDS.items()})
+
+def parse_fields(fields: str) -> List[str]:
+    """LessonPlan field names from a comma-separated fields parameter, id first"""
+    names = list(dict.fromkeys(["id"] + [name.strip() for name in fields.split(",") if name.strip()]))
+    unknown = [name for name in names if name not in LESSON_PLAN_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+@app.post("/lesson-plans/", response_model=LessonPlan)
+def create_lesson_plan(lesson_plan: LessonPlanCreate, db: Session = Depends(get_db)):
+    db_lesson_plan = DBLessonPlan(**lesson_plan_columns(lesson_plan))
     db.add(db_lesson_plan)
     db.commit()
     db.refresh(db_lesson_plan)
-    return db_lesson_plan
-
-@app.get("/lesson-plans/", response_model=List[LessonPlan])
-def read_lesson_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    lesson_plans = db.query(DBLessonPlan).offset(skip).limit(limit).all()
-    result = []
-    for lp in lesson_plans:
-        development_steps = []
-        if lp.development_steps:
-            for step_str in lp.development_steps.split("\n"):
-                if step_str.strip():
-                    try:
-                        parts = step_str.split('. ', 1)
-                        if len(parts) == 2:
-                            step_num = int(parts[0])
-                            activity_duration = parts[1]
-                            if '(' in activity_duration and activity_duration.endswith(')'):
-                                activity = activity_duration.rsplit('(', 1)[0].strip()
-                                duration = activity_duration.rsplit('(', 1)[1][:-1]
-                            else:
-                                activity = activity_duration
-                                duration = ""
-                            development_steps.append(LessonDevelopmentStep(
-                                stepNumber=step_num,
-                                activity=activity,
-                                duration=duration
-                            ))
-                    except (ValueError, IndexError):
-                        continue
-
-        lesson_plan_dict = {
-            "id": lp.id,
-            "school": lp.school,
-            "level": lp.level,
-            "learningArea": lp.learning_area,
-            "date": lp.plan_date,
-            "roll": lp.roll,
-            "term": lp.term,
-            "week": lp.week,
-            "lessonNumber": lp.lesson_number,
-            "title": lp.title,
-            "strand": lp.strand,
-            "subStrand": lp.sub_strand,
-            "specificLearningOutcomes": lp.specific_learning_outcomes.split("\n") if lp.specific_learning_outcomes else [],
-            "coreCompetencies": lp.core_competencies.split("\n") if lp.core_competencies else [],
-            "keyInquiryQuestion": lp.key_inquiry_question,
-            "learningResources": lp.learning_resources.split("\n") if lp.learning_resources else [],
-            "introduction": {
-                "duration": lp.introduction_duration,
-                "activities": lp.introduction_activities.split("\n") if lp.introduction_activities else []
-            },
-            "lessonDevelopment": {
-                "duration": lp.development_duration,
-                "steps": development_steps
-            },
-            "conclusion": {
-                "duration": lp.conclusion_duration,
-                "activities": lp.conclusion_activities.split("\n") if lp.conclusion_activities else []
-            },
-            "extendedActivities": lp.extended_activities.split("\n") if lp.extended_activities else [],
-            "assessment": lp.assessment,
-            "teacherSelfEvaluation": lp.teacher_self_evaluation,
-            "reflection": lp.reflection
-        }
-        result.append(LessonPlan(**lesson_plan_dict))
-
-    return result
+    return lesson_plan_response(db_lesson_plan)
+
+@app.post("/lesson-plans/bulk", response_model=BulkLessonPlanResponse)
+def create_lesson_plans_bulk(lesson_plans: List[LessonPlanCreate], db: Session = Depends(get_db)):
+    """Save a parsed term's lesson plans in one transaction; all or none are saved"""
+    if len(lesson_plans) > MAX_BULK_LESSON_PLANS:
+        raise HTTPException(status_code=413, detail=f"Too many lesson plans. Maximum is {MAX_BULK_LESSON_PLANS} per request")
+    ids = insert_lesson_plans(db, lesson_plans)
+    db.commit()
+    return BulkLessonPlanResponse(ids=ids)
+
+def encode_cursor(lp: DBLessonPlan) -> str:
+    """Opaque cursor for the rows after lp in LESSON_PLAN_ORDER"""
+    position = [getattr(lp, column.key) for column in LESSON_PLAN_ORDER]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_cursor(cursor: str) -> List[Optional[int]]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        position = None
+    if not (isinstance(position, list) and len(position) == len(LESSON_PLAN_ORDER)
+            and all(value is None or type(value) is int for value in position[:-1]) and type(position[-1]) is int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+def after_position(position: List[Optional[int]]):
+    """Rows after position in LESSON_PLAN_ORDER, as nested comparisons an index range scan can use.
+
+    NULL sorts first, so every value comes after a NULL and nothing comes before one.
+    """
+    condition = LESSON_PLAN_ORDER[-1] > position[-1]
+    for column, value in zip(reversed(LESSON_PLAN_ORDER[:-1]), reversed(position[:-1])):
+        if value is None:
+            condition = or_(column.is_not(None), and_(column.is_(None), condition))
+        else:
+            condition = or_(column > value, and_(column == value, condition))
+    return condition
+
+@app.get("/lesson-plans/", response_model=LessonPlanPage, response_model_exclude_unset=True)
+def read_lesson_plans(
+    school: Optional[str] = None,
+    level: Optional[str] = None,
+    learning_area: Optional[str] = None,
+    term: Optional[int] = None,
+    week_from: Optional[int] = None,
+    week_to: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Lesson plans in term, week and lesson order, a page at a time; next_cursor continues after the page.
+
+    With fields (comma-separated LessonPlan field names, e.g. id,title,strand,week,date for the list view)
+    each lesson plan has only those fields, and only their columns are read.
+    """
+    query = db.query(DBLessonPlan)
+    if fields is None:
+        names = None
+        query = query.options(undefer_group("content"))
+    else:
+        names = parse_fields(fields)
+        columns = {column for name in names for column in LESSON_PLAN_FIELDS[name][0]}
+        columns.update(column.key for column in LESSON_PLAN_ORDER)
+        query = query.options(load_only(*(getattr(DBLessonPlan, column) for column in columns), raiseload=True))
+    if school is not None:
+        query = query.filter(DBLessonPlan.school == school)
+    if level is not None:
+        query = query.filter(DBLessonPlan.level == level)
+    if learning_area is not None:
+        query = query.filter(DBLessonPlan.learning_area == learning_area)
+    if term is not None:
+        query = query.filter(DBLessonPlan.term == term)
+    if week_from is not None:
+        query = query.filter(DBLessonPlan.week >= week_from)
+    if week_to is not None:
+        query = query.filter(DBLessonPlan.week <= week_to)
+    if cursor is not None:
+        query = query.filter(after_position(decode_cursor(cursor)))
+    # One row past the page tells whether there is a next one
+    lesson_plans = query.order_by(*LESSON_PLAN_ORDER).limit(limit + 1).all()
+    next_cursor = encode_cursor(lesson_plans[limit - 1]) if len(lesson_plans) > limit else None
+    if names is None:
+        return LessonPlanPage(lesson_plans=[lesson_plan_response(lp) for lp in lesson_plans[:limit]],
+                              next_cursor=next_cursor)
+    summaries = [LessonPlanSummary(**{name: LESSON_PLAN_FIELDS[name][1](lp) for name in names})
+                 for lp in lesson_plans[:limit]]
+    return LessonPlanPage(lesson_plans=summaries, next_cursor=next_cursor)
 
 @app.get("/lesson-plans/{lesson_plan_id}", response_model=LessonPlan)
 def read_lesson_plan(lesson_plan_id: int, db: Session = Depends(get_db)):
-    lp = db.query(DBLessonPlan).filter(DBLessonPlan.id == lesson_plan_id).first()
+    lp = db.query(DBLessonPlan).options(undefer_group("content")).filter(DBLessonPlan.id == lesson_plan_id).first()
     if lp is None:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
-
-    development_steps = []
-    if lp.development_steps:
-        for step_str in lp.development_steps.split("\n"):
-            if step_str.strip():
-                try:
-                    parts = step_str.split('. ', 1)
-                    if len(parts) == 2:
-                        step_num = int(parts[0])
-                        activity_duration = parts[1]
-                        if '(' in activity_duration and activity_duration.endswith(')'):
-                            activity = activity_duration.rsplit('(', 1)[0].strip()
-                            duration = activity_duration.rsplit('(', 1)[1][:-1]
-                        else:
-                            activity = activity_duration
-                            duration = ""
-                        development_steps.append(LessonDevelopmentStep(
-                            stepNumber=step_num,
-                            activity=activity,
-                            duration=duration
-                        ))
-                except (ValueError, IndexError):
-                    continue
-
-    lesson_plan_dict = {
-        "id": lp.id,
-        "school": lp.school,
-        "level": lp.level,
-        "learningArea": lp.learning_area,
-        "date": lp.plan_date,
-        "roll": lp.roll,
-        "term": lp.term,
-        "week": lp.week,
-        "lessonNumber": lp.lesson_number,
-        "title": lp.title,
-        "strand": lp.strand,
-        "subStrand": lp.sub_strand,
-        "specificLearningOutcomes": lp.specific_learning_outcomes.split("\n") if lp.specific_learning_outcomes else [],
-        "coreCompetencies": lp.core_competencies.split("\n") if lp.core_competencies else [],
-        "keyInquiryQuestion": lp.key_inquiry_question,
-        "learningResources": lp.learning_resources.split("\n") if lp.learning_resources else [],
-        "introduction": {
-            "duration": lp.introduction_duration,
-            "activities": lp.introduction_activities.split("\n") if lp.introduction_activities else []
-        },
-        "lessonDevelopment": {
-            "duration": lp.development_duration,
-            "steps": development_steps
-        },
-        "conclusion": {
-            "duration": lp.conclusion_duration,
-            "activities": lp.conclusion_activities.split("\n") if lp.conclusion_activities else []
-        },
-        "extendedActivities": lp.extended_activities.split("\n") if lp.extended_activities else [],
-        "assessment": lp.assessment,
-        "teacherSelfEvaluation": lp.teacher_self_evaluation,
-        "reflection": lp.reflection
-    }
-
-    return LessonPlan(**lesson_plan_dict)
+    return lesson_plan_response(lp)
 
 @app.delete("/lesson-plans/{lesson_plan_id}")
 def delete_lesson_plan(lesson_plan_id: int, db: Session = Depends(get_db)):
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Migrate lesson_plans list columns from newline-joined text to JSON
+
+Usage: python migrate_lesson_plan_json.py  (the database configured in .env; safe to run again)
+
+Each list column held its items joined by newlines, and development_steps held
+"n. activity (duration)" lines. The values are parsed the way the API used to
+read them, rewritten as JSON arrays, and the columns altered to JSON.
+"""
+import json
+import os
+import sys
+from typing import List, Optional
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import JSON, inspect, text
+
+LIST_COLUMNS = [
+    'specific_learning_outcomes', 'core_competencies', 'learning_resources', 'introduction_activities',
+    'conclusion_activities', 'extended_activities',
+]
+STEPS_COLUMN = 'development_steps'
+
+
+def legacy_list(value: Optional[str]) -> List[str]:
+    return value.split("\n") if value else []
+
+
+def legacy_steps(value: Optional[str]) -> List[dict]:
+    """Development steps from their "n. activity (duration)" lines; lines that do not parse are dropped"""
+    steps = []
+    if not value:
+        return steps
+    for step_str in value.split("\n"):
+        if step_str.strip():
+            try:
+                parts = step_str.split('. ', 1)
+                if len(parts) == 2:
+                    step_num = int(parts[0])
+                    activity_duration = parts[1]
+                    if '(' in activity_duration and activity_duration.endswith(')'):
+                        activity = activity_duration.rsplit('(', 1)[0].strip()
+                        duration = activity_duration.rsplit('(', 1)[1][:-1]
+                    else:
+                        activity = activity_duration
+                        duration = ""
+                    steps.append({"stepNumber": step_num, "activity": activity, "duration": duration})
+            except (ValueError, IndexError):
+                continue
+    return steps
+
+
+def json_value(name: str, value: Optional[str]) -> str:
+    """The JSON for a column value; one already converted (by a run cut short before its ALTER) is kept"""
+    if value and value.startswith('['):
+        try:
+            if isinstance(json.loads(value), list):
+                return value
+        except ValueError:
+            pass
+    return json.dumps(legacy_steps(value) if name == STEPS_COLUMN else legacy_list(value))
+
+
+def text_columns(connection) -> List[str]:
+    """List columns of lesson_plans not yet stored as JSON"""
+    types = {column['name']: column['type'] for column in inspect(connection).get_columns('lesson_plans')}
+    return [name for name in LIST_COLUMNS + [STEPS_COLUMN] if name in types and not isinstance(types[name], JSON)]
+
+
+def convert_rows(connection, columns: List[str]) -> int:
+    """Rewrite columns of every row as JSON text, in one executemany; the number of rows"""
+    if not columns:
+        return 0
+    rows = connection.execute(text(f"SELECT id, {', '.join(columns)} FROM lesson_plans")).mappings().all()
+    updates = [
+        {'row_id': row['id'], **{name: json_value(name, row[name]) for name in columns}} for row in rows
+    ]
+    if updates:
+        assignments = ', '.join(f"{name} = :{name}" for name in columns)
+        connection.execute(text(f"UPDATE lesson_plans SET {assignments} WHERE id = :row_id"), updates)
+    return len(updates)
+
+
+def migrate(engine) -> int:
+    """Convert the text list columns of lesson_plans to JSON; the number of rows rewritten"""
+    with engine.begin() as connection:
+        columns = text_columns(connection)
+        converted = convert_rows(connection, columns)
+        # A text column converts to JSON once every value in it is JSON; other databases keep JSON as text
+        if columns and connection.dialect.name == 'mysql':
+            connection.execute(text(
+                f"ALTER TABLE lesson_plans {', '.join(f'MODIFY {name} JSON' for name in columns)}"))
+    return converted
+
+
+if __name__ == "__main__":
+    from main import engine
+    with engine.connect() as connection:
+        columns = text_columns(connection)
+    if not columns:
+        print("lesson_plans list columns are already JSON")
+    else:
+        print(f"Converted {migrate(engine)} lesson plans: {', '.join(columns)} are now JSON")
@@ -0,0 +1,134 @@
+"""
+Time budgets for parsing, and the stored state that lets a budgeted parse resume
+"""
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, Optional
+
+# Continuation state outlives the request that stopped early for this long
+CONTINUATION_DIR = os.getenv("PARSE_CONTINUATION_DIR") or os.path.join(
+    tempfile.gettempdir(), "teach-easy-convert", "continuations")
+CONTINUATION_TTL_SECONDS = int(os.getenv("PARSE_CONTINUATION_TTL_SECONDS", "3600"))
+
+# Longest budget a client may ask for
+PARSE_BUDGET_MAX_SECONDS = float(os.getenv("PARSE_BUDGET_MAX_SECONDS", "600"))
+
+_TOKEN_PATTERN = re.compile(r'[0-9a-f]{32}')
+_STATE_SUFFIX = ".pickle"
+_SOURCE_SUFFIX = ".source"
+
+
+class ParseBudget:
+    """Seconds a parse may run for, counted from when it starts in the worker"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+def _owned(path: str) -> bool:
+    return not hasattr(os, 'getuid') or os.stat(path).st_uid == os.getuid()
+
+
+class ContinuationStore:
+    """Intermediate parse state saved under a random token, one pickle file per token.
+
+    A token can be claimed once: load() moves the state out of the store,
+    so two requests resuming the same token cannot both continue it. An
+    upload that is still needed (a PDF whose pages are not all extracted)
+    is moved in next to its state.
+    """
+
+    def __init__(self, directory: str = CONTINUATION_DIR, ttl_seconds: int = CONTINUATION_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def _path(self, token: str, suffix: str) -> str:
+        return os.path.join(self.directory, token + suffix)
+
+    def save(self, state: Dict, source_path: Optional[str] = None) -> str:
+        """Store state (and take over the file at source_path), returning the token to resume it with"""
+        self.evict_expired()
+        token = uuid.uuid4().hex
+        state = dict(state, source_path=None)
+        if source_path:
+            state['source_path'] = self._path(token, _SOURCE_SUFFIX)
+            shutil.move(source_path, state['source_path'])
+            # Expire it with its state, not by upload time
+            os.utime(state['source_path'])
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(token, _STATE_SUFFIX))
+        except BaseException:
+            os.unlink(tmp_path)
+            if state['source_path']:
+                os.unlink(state['source_path'])
+            raise
+        return token
+
+    def load(self, token: str) -> Optional[Dict]:
+        """Claim the state saved under token; None if it is unknown, expired or already claimed.
+
+        The caller owns the returned state's source_path file, if any.
+        """
+        if not _TOKEN_PATTERN.fullmatch(token or ""):
+            return None
+        claimed_path = self._path(f"{token}-{uuid.uuid4().hex}", ".claimed")
+        try:
+            os.rename(self._path(token, _STATE_SUFFIX), claimed_path)
+        except FileNotFoundError:
+            return None
+        try:
+            # Only unpickle state this user wrote (the directory may be shared)
+            if not (_owned(self.directory) and _owned(claimed_path)):
+                return None
+            if time.time() - os.path.getmtime(claimed_path) > self.ttl_seconds:
+                self.discard_source(self._path(token, _SOURCE_SUFFIX))
+                return None
+            with open(claimed_path, 'rb') as f:
+                return pickle.load(f)
+        finally:
+            os.unlink(claimed_path)
+
+    def discard_source(self, source_path: Optional[str]) -> None:
+        if source_path:
+            try:
+                os.unlink(source_path)
+            except FileNotFoundError:
+                pass
+
+    def evict_expired(self) -> int:
+        """Delete state and uploads older than the TTL; returns how many files were removed"""
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # claimed or evicted by another process
+        return removed
+
+
+_default_store = None
+
+
+def get_continuation_store() -> ContinuationStore:
+    """Return the store for CONTINUATION_DIR, shared within the process"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ContinuationStore()
+    return _default_store
@@ -0,0 +1,122 @@
+"""
+Relay of parse progress events from pool workers to Server-Sent Events subscribers
+"""
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+# Events buffered per subscriber before the oldest are dropped (slow clients must not block the relay)
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Stages after which a job emits no further events
+TERMINAL_STAGES = ('completed', 'failed')
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def event_publisher(job_id: str, events, subscriber_count) -> Callable[..., None]:
+    """Return a parser progress callback that forwards events for job_id to the API process.
+
+    Nothing is built or sent while subscriber_count (shared with the API
+    process) is zero, so unwatched jobs only pay for an integer read.
+    Each event carries the time since the job started and since its
+    stage's first event.
+    """
+    started = time.perf_counter()
+    stage_started = {}
+
+    def publish(stage: str, done: int = 0, total: Optional[int] = None, **details) -> None:
+        now = time.perf_counter()
+        stage_start = stage_started.setdefault(stage, now)
+        if not subscriber_count.value:
+            return
+        event = {
+            'stage': stage,
+            'done': done,
+            'total': total,
+            'elapsed_seconds': round(now - started, 4),
+            'stage_seconds': round(now - stage_start, 4),
+        }
+        event.update(details)
+        events.put((job_id, event))
+
+    return publish
+
+
+class ProgressHub:
+    """Fans worker progress events out to per-job asyncio subscriber queues.
+
+    Workers put (job_id, event) on a multiprocessing queue; a relay thread
+    hands them to the event loop, where publish() delivers them to every
+    subscriber of that job.
+    """
+
+    def __init__(self):
+        self.events = multiprocessing.Queue()
+        self.subscriber_count = multiprocessing.RawValue('i', 0)
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._relay = None
+
+    def worker_initargs(self) -> tuple:
+        """Arguments for the pool initializer, giving workers the queue and subscriber count"""
+        return self.events, self.subscriber_count
+
+    def start_relay(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._relay is None:
+            self._relay = threading.Thread(target=self._relay_events, args=(loop,), name="progress-relay", daemon=True)
+            self._relay.start()
+
+    def stop_relay(self) -> None:
+        if self._relay is not None:
+            self.events.put(None)
+            self._relay.join(timeout=5)
+            self._relay = None
+
+    def _relay_events(self, loop: asyncio.AbstractEventLoop) -> None:
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            try:
+                loop.call_soon_threadsafe(self.publish, *item)
+            except RuntimeError:
+                return  # event loop closed
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        self.subscriber_count.value += 1
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(job_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[job_id]
+        self.subscriber_count.value -= 1
+
+    def publish(self, job_id: str, event: Dict) -> None:
+        """Deliver an event to the job's subscribers; must run on the event loop"""
+        for queue in self._subscribers.get(job_id, ()):
+            if queue.full():
+                queue.get_nowait()  # drop the oldest event for a slow client
+            queue.put_nowait(event)
+
+
+_default_hub = None
+
+
+def get_progress_hub() -> ProgressHub:
+    """Return the API process's hub (created on first use, never in pool workers)"""
+    global _default_hub
+    if _default_hub is None:
+        _default_hub = ProgressHub()
+    return _default_hub
@@ -0,0 +1,164 @@
+"""
+Extracted scheme of work document shared by every parsing strategy
+"""
+import re
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+PAGE_MARKER_PATTERN = re.compile(r'^--- PAGE (\d+) ---$', re.MULTILINE)
+
+LOWER_CHUNK_CHARS = 64 * 1024
+
+
+class SchemeDocument:
+    """Text of one upload, extracted once and handed to every parser.
+
+    The text is kept as a single buffer with a line-offset array, so parser
+    stages iterate line slices instead of re-splitting it, and the lowercase
+    view is computed at most once. PDF text carries '--- PAGE n ---' marker
+    lines (the format produced by EnhancedSchemeParser.extract_text_from_pdf);
+    text from other sources is treated as a single page. PDFs whose lesson
+    table could be rebuilt from word positions also carry those rows as
+    {field: cell text} dicts.
+    """
+
+    def __init__(self, text: str, filename: str = "", source_type: str = "txt",
+                 table_rows: Optional[List[Dict[str, str]]] = None):
+        self.text = text
+        self.filename = filename
+        self.source_type = source_type
+        self.table_rows = table_rows
+        self._line_starts = None
+        self._lower = None
+        self._page_spans = None
+        self._marker_lines = None
+
+    @classmethod
+    def coerce(cls, document: Union[str, 'SchemeDocument']) -> 'SchemeDocument':
+        """Wrap plain text so parser stages accept either form"""
+        if isinstance(document, SchemeDocument):
+            return document
+        return cls(document)
+
+    @property
+    def line_starts(self) -> array:
+        """Offset of the first character of every line (lines as split on '\\n')"""
+        if self._line_starts is None:
+            starts = array('q', [0])
+            find = self.text.find
+            pos = find('\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = find('\n', pos + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    @property
+    def lower_text(self) -> Optional[str]:
+        """Lowercase copy of the whole text, or None when lowering changes its length.
+
+        A few characters (such as 'İ') lower to two code points, which would
+        misalign the line offsets; lines are then lowered one at a time.
+        """
+        if self._lower is None:
+            lower = ''.join(self._lower_chunks())
+            self._lower = lower if len(lower) == len(self.text) else False
+        return self._lower or None
+
+    def _lower_chunks(self) -> Iterator[str]:
+        # str.lower() briefly needs about 12 bytes per character of input, so
+        # large texts are lowered a block of whole lines at a time
+        text = self.text
+        start = 0
+        while start < len(text):
+            end = text.find('\n', start + LOWER_CHUNK_CHARS)
+            end = len(text) if end == -1 else end + 1
+            yield text[start:end].lower()
+            start = end
+
+    def _line_span(self, index: int) -> Tuple[int, int]:
+        starts = self.line_starts
+        start = starts[index]
+        end = starts[index + 1] - 1 if index + 1 < len(starts) else len(self.text)
+        return start, end
+
+    def line(self, index: int) -> str:
+        start, end = self._line_span(index)
+        return self.text[start:end]
+
+    def line_lower(self, index: int) -> str:
+        start, end = self._line_span(index)
+        lower = self.lower_text
+        return lower[start:end] if lower is not None else self.text[start:end].lower()
+
+    def iter_lines(self, start: int = 0, stop: Optional[int] = None,
+                   page_bodies_only: bool = False) -> Iterator[str]:
+        """Yield lines [start, stop) without materialising the whole split.
+
+        With page_bodies_only, page marker lines (and anything before the
+        first page) are skipped, leaving the lines of each page body.
+        """
+        for index in self.line_indices(start, stop, page_bodies_only):
+            yield self.line(index)
+
+    def iter_line_pairs(self, start: int = 0, stop: Optional[int] = None,
+                        page_bodies_only: bool = False) -> Iterator[Tuple[str, str]]:
+        """Yield (line, lowercase line) pairs from the shared buffers"""
+        for index in self.line_indices(start, stop, page_bodies_only):
+            yield self.line(index), self.line_lower(index)
+
+    def line_indices(self, start: int = 0, stop: Optional[int] = None,
+                     page_bodies_only: bool = False) -> Iterator[int]:
+        """Indices of the lines iter_lines would yield"""
+        stop = self.line_count if stop is None else min(stop, self.line_count)
+        if not page_bodies_only:
+            return iter(range(start, stop))
+        first_body_line = bisect_right(self.line_starts, self.page_spans[0][0]) - 1
+        markers = self.marker_lines
+        return (index for index in range(max(start, first_body_line), stop) if index not in markers)
+
+    @property
+    def page_spans(self) -> List[Tuple[int, int]]:
+        """(start, end) text offsets of each page body, split on consecutive page markers"""
+        if self._page_spans is None:
+            self._find_pages()
+        return self._page_spans
+
+    @property
+    def marker_lines(self) -> set:
+        """Indices of the lines holding the page markers used as page breaks"""
+        if self._marker_lines is None:
+            self._find_pages()
+        return self._marker_lines
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_spans)
+
+    def _find_pages(self) -> None:
+        spans = []
+        marker_lines = set()
+        expected = 1
+        body_start = None
+        for match in PAGE_MARKER_PATTERN.finditer(self.text):
+            # Only accept markers numbered 1, 2, 3... so page text that happens to
+            # look like a marker is not treated as a page break
+            if int(match.group(1)) != expected:
+                continue
+            if body_start is not None:
+                spans.append((body_start, match.start()))
+            marker_lines.add(bisect_right(self.line_starts, match.start()) - 1)
+            body_start = match.end() + 1
+            expected += 1
+
+        if body_start is None:
+            spans.append((0, len(self.text)))
+        else:
+            spans.append((min(body_start, len(self.text)), len(self.text)))
+        self._page_spans = spans
+        self._marker_lines = marker_lines
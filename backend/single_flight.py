@@ -0,0 +1,55 @@
+"""
+Coalescing of concurrent identical requests so the work runs once
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Shares one in-flight run of an async function between callers with the same key.
+
+    The first caller for a key starts fn as a task; callers arriving while
+    it runs await the same task instead of starting their own. The key is
+    forgotten once the task finishes, so later callers run fn afresh.
+    Must be used from a single event loop, so the counters need no locking.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def flight(self, key: Hashable, fn: Callable[..., Awaitable], *args) -> Tuple[asyncio.Future, bool]:
+        """Return the in-flight task for key, starting fn(*args) if there is none.
+
+        The flag is True when this call started the task, which then owns
+        whatever fn was given; callers that joined can release their copies.
+        Await the task through asyncio.shield, so a caller that is cancelled
+        stops waiting without cancelling the shared run.
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future, False
+
+        future = asyncio.ensure_future(fn(*args))
+        self._flights[key] = future
+        self.started += 1
+        future.add_done_callback(lambda f: self._land(key, f))
+        return future, True
+
+    def _land(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._flights.get(key) is future:
+            del self._flights[key]
+        # Retrieve the exception so it is not logged as unhandled when every caller has gone away
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': len(self._flights),
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'failed': self.failed,
+        }
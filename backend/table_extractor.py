@@ -0,0 +1,280 @@
+"""
+Geometric table extraction for schemes of work using PyMuPDF word coordinates
+"""
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# A word as returned by page.get_text("words"):
+# (x0, y0, x1, y1, text, block_no, line_no, word_no)
+Word = Tuple[float, float, float, float, str, int, int, int]
+
+# Header cell text (lowercased, letters only) -> lesson field, checked in order
+HEADER_FIELDS = [
+    ('specific_learning_outcomes', ['outcome', 'objective']),
+    ('key_inquiry_question', ['inquiry', 'question', 'kiq']),
+    ('learning_resources', ['resource', 'material']),
+    ('assessment', ['assess', 'evaluation']),
+    ('activities', ['experience', 'activit']),
+    ('sub_strand', ['substrand', 'subtopic', 'subtheme']),
+    ('strand', ['strand', 'theme', 'topic']),
+    ('week', ['week', 'wk']),
+    ('lessonNumber', ['lesson', 'lsn', 'ls', 'period']),
+    ('reflection', ['refl', 'remark', 'ref']),
+]
+
+# Words that mark a visual line as a table header, grouped so that
+# "Learning" appearing in three header cells only counts once. Header
+# cells are often narrow, so words may be cut short ("ASSESSMEN", "Wee").
+HEADER_TOKENS = {
+    'wk': 'week', 'wee': 'week', 'ls': 'lesson', 'lsn': 'lesson', 'less': 'lesson',
+    'kiq': 'inquiry', 'refl': 'reflection',
+}
+HEADER_TOKEN_PREFIXES = [
+    ('week', 'week'), ('lesson', 'lesson'), ('strand', 'strand'), ('theme', 'strand'),
+    ('outcome', 'outcomes'), ('inquir', 'inquiry'), ('question', 'inquiry'),
+    ('resource', 'resources'), ('experience', 'experience'), ('assess', 'assessment'),
+    ('reflection', 'reflection'),
+]
+MIN_HEADER_CATEGORIES = 4
+
+LINE_TOLERANCE = 3.0     # words whose tops are this close share a visual line
+CELL_GAP = 6.0           # wider horizontal gaps separate header cells
+HEADER_MAX_HEIGHT = 50.0  # header cells may wrap over this many points
+
+CARRIED_FIELDS = ('week', 'strand', 'sub_strand')
+
+ROW_NUMBER_PATTERN = re.compile(r'^\d{1,3}(?:[-–,&]\d{1,3})?[.)]?$')
+NON_LETTERS_PATTERN = re.compile(r'[^a-z]')
+
+
+def _header_token_category(word: str) -> Optional[str]:
+    token = NON_LETTERS_PATTERN.sub('', word.lower())
+    if token in HEADER_TOKENS:
+        return HEADER_TOKENS[token]
+    for prefix, category in HEADER_TOKEN_PREFIXES:
+        if token.startswith(prefix):
+            return category
+    return None
+
+
+def classify_header(label: str) -> Optional[str]:
+    """Map a header cell label to a lesson field, or None if unrecognised"""
+    letters = NON_LETTERS_PATTERN.sub('', label.lower())
+    for field, keywords in HEADER_FIELDS:
+        if any(keyword in letters for keyword in keywords):
+            return field
+    return None
+
+
+def _visual_lines(words: List[Word]) -> List[List[Word]]:
+    """Group words into visual lines by their top coordinate, each sorted left to right"""
+    lines = []
+    current = []
+    line_top = None
+    for word in sorted(words, key=lambda w: (w[1], w[0])):
+        if line_top is None or word[1] - line_top > LINE_TOLERANCE:
+            if current:
+                lines.append(sorted(current, key=lambda w: w[0]))
+            current = []
+            line_top = word[1]
+        current.append(word)
+    if current:
+        lines.append(sorted(current, key=lambda w: w[0]))
+    return lines
+
+
+class TableColumnModel:
+    """Column boundaries and field names for one table layout"""
+
+    def __init__(self, fields: List[Optional[str]], boundaries: List[float]):
+        self.fields = fields
+        self.boundaries = boundaries  # x positions separating column i and i + 1
+
+    def column_for(self, x0: float, x1: float) -> int:
+        return bisect_right(self.boundaries, (x0 + x1) / 2)
+
+    def index_of(self, field: str) -> Optional[int]:
+        return self.fields.index(field) if field in self.fields else None
+
+
+class GeometricTableExtractor:
+    """Recover scheme-of-work table rows from word bounding boxes.
+
+    Pages are fed in order with add_page(). The column model found under a
+    table header is carried over to following pages, as is a row that
+    continues past the bottom of a page. Each completed row is returned as
+    a {field: cell text} dict in column order.
+    """
+
+    def __init__(self):
+        self.column_model = None
+        self._open_row = None
+        self._carried = {}
+
+    def add_page(self, words: List[Word], page_width: float) -> List[Dict[str, str]]:
+        """Process one page's words; returns the rows completed on this page"""
+        lines = _visual_lines(words)
+
+        header_index = self._find_header(lines)
+        if header_index is not None:
+            model, data_start = self._build_column_model(lines, header_index, page_width)
+            if model is not None:
+                # A new header closes any row still open from the previous table
+                completed = self.finish()
+                self.column_model = model
+                return completed + self._assign_rows(lines[data_start:])
+
+        if self.column_model is None:
+            return []
+        return self._assign_rows(lines)
+
+    def finish(self) -> List[Dict[str, str]]:
+        """Flush the row left open at the end of the document"""
+        if self._open_row is None:
+            return []
+        row = self._close_row(self._open_row)
+        self._open_row = None
+        return [row]
+
+    def _find_header(self, lines: List[List[Word]]) -> Optional[int]:
+        for index, line in enumerate(lines):
+            categories = {_header_token_category(word[4]) for word in line} - {None}
+            if len(categories) >= MIN_HEADER_CATEGORIES:
+                return index
+        return None
+
+    def _build_column_model(self, lines: List[List[Word]], header_index: int,
+                            page_width: float) -> Tuple[Optional[TableColumnModel], int]:
+        """Build a column model from the header at lines[header_index]"""
+        # Header cells are separated by wide horizontal gaps on the first header line
+        cells = []  # [x0, x1, label words]
+        for word in lines[header_index]:
+            if cells and word[0] - cells[-1][1] <= CELL_GAP:
+                cells[-1][1] = max(cells[-1][1], word[2])
+                cells[-1][2].append(word[4])
+            else:
+                cells.append([word[0], word[2], [word[4]]])
+
+        # Wrapped header text ("Wee" / "k") continues on the following lines
+        header_top = lines[header_index][0][1]
+        data_start = header_index + 1
+        while data_start < len(lines):
+            line = lines[data_start]
+            if line[0][1] - header_top > HEADER_MAX_HEIGHT or any(ROW_NUMBER_PATTERN.match(w[4]) for w in line):
+                break
+            for word in line:
+                center = (word[0] + word[2]) / 2
+                cell = min(cells, key=lambda c: abs((c[0] + c[1]) / 2 - center))
+                cell[2].append(word[4])
+            data_start += 1
+
+        fields = [classify_header(''.join(cell[2])) for cell in cells]
+        if 'week' not in fields and 'lessonNumber' not in fields:
+            # Some tables leave the week and lesson headers blank (or rotate
+            # them); the numbers left of the first header cell stand in for them
+            leading = self._leading_numbers(lines[data_start:], cells[0][0])
+            if not leading:
+                return None, data_start
+            cells = [[w[0], w[2], []] for w in leading] + cells
+            fields = ['week', 'lessonNumber'][:len(leading)] + fields
+
+        boundaries = self._column_boundaries(cells, lines[data_start:], page_width)
+        return TableColumnModel(fields, boundaries), data_start
+
+    def _leading_numbers(self, data_lines: List[List[Word]], table_left: float) -> List[Word]:
+        """Numeric words left of table_left on the first data line (at most two)"""
+        for line in data_lines[:1]:
+            leading = [w for w in line if w[2] <= table_left]
+            if 0 < len(leading) <= 2 and all(ROW_NUMBER_PATTERN.match(w[4]) for w in leading):
+                return leading
+        return []
+
+    def _column_boundaries(self, cells: List[list], data_lines: List[List[Word]],
+                           page_width: float) -> List[float]:
+        """Place each boundary in the emptiest vertical strip between two header cells.
+
+        Cell text is not always aligned with its header (it is often centred),
+        so the gutters are found from how much of the page's text covers each
+        x position rather than from the header edges alone.
+        """
+        width = int(page_width) + 2
+        delta = [0] * (width + 1)
+        text_lines = {}
+        for line in data_lines:
+            for word in line:
+                key = (word[5], word[6])
+                span = text_lines.get(key)
+                text_lines[key] = (min(span[0], word[0]), max(span[1], word[2])) if span else (word[0], word[2])
+        for x0, x1 in text_lines.values():
+            start = min(max(int(x0), 0), width)
+            stop = min(max(int(x1) + 1, start), width)
+            delta[start] += 1
+            delta[stop] -= 1
+
+        coverage = []
+        running = 0
+        for step in delta[:width]:
+            running += step
+            coverage.append(running)
+
+        boundaries = []
+        for left, right in zip(cells, cells[1:]):
+            lo = int((left[0] + left[1]) / 2)
+            hi = int((right[0] + right[1]) / 2)
+            edge_gap_mid = (left[1] + right[0]) / 2
+            candidates = range(max(lo, 0), min(hi, width - 1) + 1)
+            if not candidates:
+                boundaries.append(edge_gap_mid)
+                continue
+            best = min(candidates, key=lambda x: (coverage[x], abs(x - edge_gap_mid)))
+            boundaries.append(float(best))
+        return boundaries
+
+    def _assign_rows(self, lines: List[List[Word]]) -> List[Dict[str, str]]:
+        """Assign words to cells; a number in the lesson column starts a new row"""
+        model = self.column_model
+        # Week numbers are not always level with the first lesson of the week,
+        # so they only start rows when there is no lesson column
+        anchor_column = model.index_of('lessonNumber')
+        if anchor_column is None:
+            anchor_column = model.index_of('week')
+
+        # Lines that cross column boundaries are page titles or footers, not cell text
+        text_line_columns = {}
+        for line in lines:
+            for word in line:
+                text_line_columns.setdefault((word[5], word[6]), set()).add(model.column_for(word[0], word[2]))
+        spanning = {key for key, columns in text_line_columns.items() if len(columns) > 1}
+
+        completed = []
+        for line in lines:
+            placed = [(model.column_for(w[0], w[2]), w) for w in line if (w[5], w[6]) not in spanning]
+            if not placed:
+                continue
+            if any(column == anchor_column and ROW_NUMBER_PATTERN.match(w[4]) for column, w in placed):
+                if self._open_row is not None:
+                    completed.append(self._close_row(self._open_row))
+                self._open_row = [[] for _ in model.fields]
+            if self._open_row is None:
+                continue  # text above the first row of the table
+            for column, word in placed:
+                if column < len(self._open_row):
+                    self._open_row[column].append(word[4])
+        return completed
+
+    def _close_row(self, cells: List[List[str]]) -> Dict[str, str]:
+        row = {}
+        for field, words in zip(self.column_model.fields, cells):
+            if field and field not in row:
+                row[field] = ' '.join(words)
+
+        # Merged cells (the week or strand spanning several lessons) only
+        # carry text on their first row
+        for field in CARRIED_FIELDS:
+            if field in row:
+                if row[field]:
+                    self._carried[field] = row[field]
+                else:
+                    row[field] = self._carried.get(field, '')
+        return row
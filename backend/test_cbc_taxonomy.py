@@ -0,0 +1,117 @@
+"""
+Test loading the CBC taxonomy from YAML, its snapshots and hot reload
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import cbc_taxonomy
+from cbc_taxonomy import TAXONOMY_PATH, TaxonomyLoader, compile_taxonomy, get_taxonomy
+from enhanced_parser import EnhancedSchemeParser
+from improved_strand_identifier import ImprovedStrandIdentifier
+
+SMALL_TAXONOMY = """
+version: "{version}"
+strands:
+  mathematics:
+    aliases: [maths]
+    sub_strands:
+      numbers: [{keyword}]
+strand_patterns:
+  numbers: '(?:numbers?)'
+normalizations:
+  maths: Mathematics
+"""
+
+
+def write_taxonomy(path, version='1', keyword='fractions', mtime=None):
+    path.write_text(SMALL_TAXONOMY.format(version=version, keyword=keyword))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_shipped_taxonomy_loads():
+    with open(TAXONOMY_PATH, 'rb') as f:
+        taxonomy = compile_taxonomy(f.read())
+    assert 'mathematics' in taxonomy.cbc_strands
+    assert 'numbers' in taxonomy.strand_patterns
+    assert taxonomy.normalizations['maths'] == 'Mathematics'
+    assert get_taxonomy().digest == taxonomy.digest
+    assert EnhancedSchemeParser().normalize_strand_name('Maths') == 'Mathematics'
+
+
+def test_snapshot_is_reused_by_a_new_process(tmp_path):
+    path = tmp_path / 'taxonomy.yaml'
+    write_taxonomy(path)
+    first = TaxonomyLoader(str(path), str(tmp_path / 'snapshots'), check_interval=0)
+    assert first.current().version == '1'
+    assert first.loaded_from == 'yaml'
+
+    second = TaxonomyLoader(str(path), str(tmp_path / 'snapshots'), check_interval=0)
+    taxonomy = second.current()
+    assert second.loaded_from == 'snapshot'
+    assert taxonomy.digest == first.current().digest
+    assert taxonomy.score('we added fractions today')[:2] == ('mathematics', 'numbers')
+
+
+def test_edited_file_is_reloaded(tmp_path):
+    path = tmp_path / 'taxonomy.yaml'
+    write_taxonomy(path, mtime=1000)
+    loader = TaxonomyLoader(str(path), None, check_interval=0)
+    identifier = ImprovedStrandIdentifier(loader.current())
+    assert loader.current().score('decimals')[1] is None
+
+    write_taxonomy(path, version='2', keyword='decimals', mtime=2000)
+    assert loader.current().version == '2'
+    assert loader.current().score('decimals')[1] == 'numbers'
+    # An identifier given a taxonomy keeps using it
+    assert identifier.taxonomy.version == '1'
+
+
+def test_broken_file_keeps_the_previous_taxonomy(tmp_path):
+    path = tmp_path / 'taxonomy.yaml'
+    write_taxonomy(path, mtime=1000)
+    loader = TaxonomyLoader(str(path), None, check_interval=0)
+    before = loader.current()
+
+    write_taxonomy(path, version='2', keyword='Decimals', mtime=2000)
+    assert loader.current() is before
+    assert 'lowercase' in loader.status()['last_error']
+
+    path.write_text("strands: [")
+    os.utime(path, (3000, 3000))
+    assert loader.current() is before
+
+    write_taxonomy(path, version='3', mtime=4000)
+    assert loader.current().version == '3'
+    assert loader.status()['last_error'] is None
+
+
+def test_first_load_of_a_broken_file_fails(tmp_path):
+    path = tmp_path / 'taxonomy.yaml'
+    path.write_text(SMALL_TAXONOMY.format(version='1', keyword='fractions').replace("'(?:numbers?)'", "'(?:numbers'"))
+    with pytest.raises(ValueError):
+        TaxonomyLoader(str(path), None).current()
+
+
+def test_identifier_follows_the_default_taxonomy(tmp_path, monkeypatch):
+    path = tmp_path / 'taxonomy.yaml'
+    write_taxonomy(path, mtime=1000)
+    monkeypatch.setattr(cbc_taxonomy, '_default_loader', TaxonomyLoader(str(path), None, check_interval=0))
+    identifier = ImprovedStrandIdentifier()
+    assert identifier.identify('Fractions and maths') == ('Mathematics', 'Numbers')
+
+    write_taxonomy(path, version='2', keyword='decimals', mtime=2000)
+    assert identifier.identify('Decimals and maths') == ('Mathematics', 'Numbers')
+    assert identifier.taxonomy.version == '2'
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_shipped_taxonomy_loads()
+    test_snapshot_is_reused_by_a_new_process(pathlib.Path(tempfile.mkdtemp()))
+    test_edited_file_is_reloaded(pathlib.Path(tempfile.mkdtemp()))
+    test_broken_file_keeps_the_previous_taxonomy(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,60 @@
+"""
+Test the one-pass lesson component sweep against searching for each indicator and pattern in turn
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import re
+
+from component_lexicon import ComponentLexicon
+from enhanced_parser import (ASSESSMENT_INDICATORS, INQUIRY_PATTERNS, LESSON_COMPONENT_LEXICON, OUTCOME_PATTERNS,
+                             RESOURCE_INDICATORS)
+
+PIECES = [' ', '  ', '\n', ':', '?', '.', '-', 'a)', 'x', 'by the end of the lesson', 'by  the end', 'learners should be able to',
+          'objectives', 'learning outcomes', 'how', ' how ', 'how can we', 'what is', 'why', 'whatever', 'when ', 'where ',
+          'inquiry question', 'inquiry questions:', 'flashcards', 'cards', 'maps', 'textbook', 'oral', 'moral', 'tests',
+          'questions', 'chart.', 'written work']
+
+
+def components_one_by_one(text):
+    """The components as extract_lesson_components found them, one regex search per indicator and pattern"""
+    outcomes = None
+    for pattern in OUTCOME_PATTERNS:
+        match = re.search(pattern, text)
+        if match:
+            outcomes = match.group(1)
+            break
+    question = None
+    for pattern in INQUIRY_PATTERNS + [r'inquiry\s+question[s]?[:\s]*([^.]+[?.])']:
+        match = re.search(pattern, text)
+        if match:
+            question = match.group(0)
+            break
+    phrases = [re.search(r'([^.]*?' + re.escape(indicator) + r'[^.]*?)(?:\s|$|\.)', text).group(1)
+               for indicator in RESOURCE_INDICATORS if indicator in text]
+    return outcomes, question, phrases, [indicator for indicator in ASSESSMENT_INDICATORS if indicator in text]
+
+
+def test_sweep_matches_searching_one_by_one():
+    rng = random.Random(21)
+    for _ in range(3000):
+        text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 20)))
+        found = LESSON_COMPONENT_LEXICON.scan(text)
+        assert (found.outcomes, found.inquiry_question, found.resource_phrases, found.assessments) == \
+            components_one_by_one(text)
+
+
+def test_entries_starting_at_the_same_place_are_all_found():
+    # The sweep reports one entry per position; 'what ' also starts the word 'what', and 'maps' also 'map'
+    lexicon = ComponentLexicon(['maps', 'map', 'what'], ['mapping'], [], [r'what\s+[^?]*?\?'])
+    found = lexicon.scan('a. what maps? whatnot mapping')
+    assert found.resource_phrases == [' what maps?', ' what maps?', ' what']
+    assert found.inquiry_question == 'what maps?'
+    assert found.assessments == ['mapping']
+
+
+if __name__ == "__main__":
+    test_sweep_matches_searching_one_by_one()
+    test_entries_starting_at_the_same_place_are_all_found()
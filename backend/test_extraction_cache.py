@@ -0,0 +1,114 @@
+"""
+Test the content-addressed extraction cache
+"""
+import sys
+import os
+import stat
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_parser import EnhancedSchemeParser, TEXT_EXTRACTOR_VERSION
+import extraction_cache
+from extraction_cache import ExtractionCache, content_digest
+
+SOWS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'SOWS')
+
+
+def test_hit_miss_and_versioning(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    digest = content_digest(b'%PDF-1.4 sample')
+
+    assert cache.get(digest, 'v1') is None
+    cache.put(digest, 'v1', 'line one\r\nline two\n')
+    assert cache.get(digest, 'v1') == 'line one\r\nline two\n'
+    # A different extractor version never sees the old entry
+    assert cache.get(digest, 'v2') is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+
+    for name in ['a', 'b', 'c']:
+        cache.put(content_digest(name.encode()), 'v1', name * 100)
+        time.sleep(0.01)
+
+    # Only two 100-byte entries fit; 'a' was least recently used
+    assert cache.get(content_digest(b'a'), 'v1') is None
+    assert cache.get(content_digest(b'b'), 'v1') == 'b' * 100
+
+    # 'b' was just read, so adding 'd' evicts 'c' instead
+    time.sleep(0.01)
+    cache.put(content_digest(b'd'), 'v1', 'd' * 100)
+    assert cache.get(content_digest(b'b'), 'v1') is not None
+    assert cache.get(content_digest(b'c'), 'v1') is None
+
+
+def test_abandoned_temporary_files_are_removed(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+    abandoned = tmp_path / 'abandoned.tmp'
+    abandoned.write_bytes(b'x' * 1000)
+    old = time.time() - extraction_cache._STALE_TMP_SECONDS - 60
+    os.utime(abandoned, (old, old))
+    writing = tmp_path / 'writing.tmp'
+    writing.write_bytes(b'y' * 100)
+
+    cache.put(content_digest(b'a'), 'v1', 'a' * 100)
+    assert not abandoned.exists()
+    assert cache.get(content_digest(b'a'), 'v1') == 'a' * 100
+
+    # A file still being written is not deleted, but its size counts towards the cap
+    time.sleep(0.01)
+    cache.put(content_digest(b'b'), 'v1', 'b' * 100)
+    assert writing.exists()
+    assert cache.get(content_digest(b'a'), 'v1') is None
+    assert cache.get(content_digest(b'b'), 'v1') == 'b' * 100
+
+
+def test_entries_of_another_user_are_not_trusted(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / 'cache'))
+    assert stat.S_IMODE(os.stat(cache.cache_dir).st_mode) == 0o700
+    digest = content_digest(b'%PDF-1.4 sample')
+    cache.put(digest, 'v1', 'extracted text')
+
+    # An entry planted by someone else is a miss
+    uid = os.getuid()
+    real_fstat = os.fstat
+    monkeypatch.setattr(os, 'fstat', lambda fd: os.stat_result((0, 0, 0, 0, uid + 1) + tuple(real_fstat(fd))[5:]))
+    assert cache.get(digest, 'v1') is None
+    monkeypatch.undo()
+    assert cache.get(digest, 'v1') == 'extracted text'
+
+    # Nothing is read from or written to a directory someone else owns
+    monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+    assert cache.get(digest, 'v1') is None
+    cache.put(content_digest(b'other'), 'v1', 'private text')
+    assert not os.path.exists(cache._path(content_digest(b'other'), 'v1'))
+
+
+def test_parser_reuses_cached_text_for_identical_uploads(tmp_path, monkeypatch):
+    """Byte-identical '- Copy' uploads are only extracted once"""
+    original = os.path.join(SOWS_DIR, 'Term2.gr-2-mathematics-schemes-of-work-term-2.pdf')
+    copy = os.path.join(SOWS_DIR, 'Term2.gr-2-mathematics-schemes-of-work-term-2 - Copy.pdf')
+    with open(original, 'rb') as f:
+        original_content = f.read()
+    with open(copy, 'rb') as f:
+        copy_content = f.read()
+
+    parser = EnhancedSchemeParser(extract_workers=1, text_cache=ExtractionCache(str(tmp_path)))
+    first = parser.extract_text_from_pdf(original_content)
+    assert parser.text_cache.get(content_digest(original_content), TEXT_EXTRACTOR_VERSION) == first
+
+    def fail(*args, **kwargs):
+        raise AssertionError("cached upload should not be re-extracted")
+
+    monkeypatch.setattr(parser, '_extract_content_uncached', fail)
+    assert parser.extract_text_from_pdf(copy_content) == first
+    assert list(parser.iter_pdf_lines(copy_content)) == first.split('\n')
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_hit_miss_and_versioning(pathlib.Path(tempfile.mkdtemp()))
+    test_least_recently_used_entries_are_evicted(pathlib.Path(tempfile.mkdtemp()))
+    test_abandoned_temporary_files_are_removed(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,88 @@
+"""
+Test the incremental parse session against full parses of the edited text
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+
+import pytest
+
+from incremental_parser import IncrementalParseSession
+from legacy_parser import parse_scheme_of_work
+
+LINES = ['Week 1', 'WEEK 2: Numbers', 'week 3', 'Week 0', 'Strand: Numbers', 'Sub-strand: Fractions',
+         'Objectives: count', 'Learning outcomes:', '- add things', '• subtract', 'Activities: play',
+         'Resources: books', 'Assessment: oral', 'plain text', '', '  ', 'Term 1 Week 4', '5. Shapes', 'Wk 6']
+
+
+def scheme(weeks):
+    return ''.join(f"Week {week}\nStrand: Numbers\nSub-strand: Fractions\nObjectives: count to {week}\n"
+                   for week in range(1, weeks + 1))
+
+
+def test_random_edits_match_a_full_parse():
+    rng = random.Random(18)
+    for _ in range(60):
+        session = IncrementalParseSession(cache_size=rng.choice([2, 1024]))
+        session.replace('\n'.join(rng.choice(LINES) for _ in range(rng.randint(0, 25))))
+        for _ in range(10):
+            changes = []
+            length = len(session.text)
+            for _ in range(rng.randint(1, 3)):
+                start = rng.randint(0, length)
+                end = rng.randint(start, min(length, start + rng.choice([0, 1, 5, 40])))
+                text = rng.choice(['', 'x', '\n', 'Week 7\n', '\nObjectives: y\n', rng.choice(LINES) + '\n', '1'])
+                changes.append((start, end, text))
+                length += len(text) - (end - start)
+            session.edit(changes)
+            assert session.result() == parse_scheme_of_work(session.text)
+
+
+def test_edit_reparses_only_its_week():
+    session = IncrementalParseSession()
+    text = scheme(50)
+    delta = session.replace(text)
+    assert delta['blocks_parsed'] == 50
+    assert len(delta['lessons']) == 50
+
+    position = text.index('count to 30') + len('count')
+    delta = session.edit([(position, position, 'ing')])
+    assert delta['blocks_parsed'] == 1
+    assert [lesson['week'] for lesson in delta['lessons']] == [30]
+    assert delta['lessons'][0]['specific_learning_outcomes'] == ['counting to 30']
+
+    # Undoing brings back a block parsed before
+    delta = session.edit([(position, position + 3, '')])
+    assert delta['blocks_parsed'] == 0
+    assert session.result() == parse_scheme_of_work(text)
+
+
+def test_removed_week_is_reported():
+    session = IncrementalParseSession()
+    text = scheme(3)
+    session.replace(text)
+    start = text.index('Week 2')
+    delta = session.edit([(start, text.index('Week 3'), '')])
+    assert delta['removed_weeks'] == [2]
+    assert delta['weeks_found'] == [1, 3]
+
+
+def test_bad_edit_leaves_the_session_unchanged():
+    session = IncrementalParseSession(max_length=100)
+    session.replace(scheme(1))
+    text = session.text
+    with pytest.raises(ValueError):
+        session.edit([(0, 0, 'Week 9\n'), (0, len(text) + 50, '')])
+    with pytest.raises(ValueError):
+        session.edit([(0, 0, 'x' * 100)])
+    assert session.text == text
+    assert session.version == 1
+
+
+if __name__ == "__main__":
+    test_random_edits_match_a_full_parse()
+    test_edit_reparses_only_its_week()
+    test_removed_week_is_reported()
+    test_bad_edit_leaves_the_session_unchanged()
@@ -0,0 +1,143 @@
+"""
+Test the SQLite parse job store and parser progress reporting
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import sqlite3
+import stat
+import subprocess
+import time
+from contextlib import closing
+
+import job_store
+import worker_pool
+from enhanced_parser import EnhancedSchemeParser
+from job_store import JobStore
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def test_job_lifecycle_survives_a_new_store(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    store = JobStore(db_path)
+    job_id = store.create('scheme.pdf')
+    assert store.get(job_id)['status'] == 'queued'
+
+    store.start(job_id)
+    progress = store.progress_callback(job_id, min_interval=60)
+    progress('pages', 1, 10)   # first report is written
+    progress('pages', 2, 10)   # throttled
+    progress('pages', 10, 10)  # the final report is always written
+    job = store.get(job_id)
+    assert (job['status'], job['pages_done'], job['pages_total']) == ('running', 10, 10)
+
+    store.complete(job_id, {'success': True, 'message': 'ok', 'weeks_found': [1], 'lesson_plans': [{'week': 1}]})
+    reopened = JobStore(db_path)
+    assert reopened.get(job_id)['status'] == 'completed'
+    assert reopened.get(job_id)['lessons_found'] == 1
+    assert reopened.get_result(job_id)['lesson_plans'] == [{'week': 1}]
+    assert reopened.get('missing') is None
+
+
+def test_unfinished_jobs_are_marked_interrupted(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    queued = store.create('a.pdf')
+    running = store.create('b.pdf')
+    store.start(running)
+    done = store.create('c.pdf')
+    store.fail(done, 'bad file')
+    ours = store.create('d.pdf')
+    elsewhere = store.create('e.pdf')
+
+    # A process that has exited, and an earlier server that had this process's pid
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    store._update(queued, owner_pid=exited.pid)
+    store._update(running, owner_instance='before-restart')
+    # Another server process sharing the database is still running its job
+    store._update(elsewhere, owner_pid=os.getppid(), owner_instance='other-server')
+
+    assert store.mark_interrupted() == 2
+    assert store.get(queued)['status'] == 'interrupted'
+    assert store.get(running)['status'] == 'interrupted'
+    assert store.get(done)['status'] == 'failed'
+    assert store.get(ours)['status'] == 'queued'
+    assert store.get(elsewhere)['status'] == 'queued'
+
+
+def test_jobs_from_before_owners_were_recorded_are_interrupted(tmp_path):
+    db_path = str(tmp_path / 'jobs.sqlite3')
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("CREATE TABLE parse_jobs (id TEXT PRIMARY KEY, filename TEXT NOT NULL, status TEXT NOT NULL, "
+                     "pages_done INTEGER NOT NULL DEFAULT 0, pages_total INTEGER, "
+                     "lessons_found INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+                     "finished_at REAL, error TEXT, result TEXT)")
+        conn.execute("INSERT INTO parse_jobs (id, filename, status, created_at) VALUES ('old', 'a.pdf', 'running', 0)")
+        conn.commit()
+
+    store = JobStore(db_path)
+    assert store.mark_interrupted() == 1
+    assert store.get('old')['status'] == 'interrupted'
+
+
+def test_finished_jobs_expire(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs' / 'jobs.sqlite3'), ttl_seconds=60)
+    expired = store.create('a.pdf')
+    store.complete(expired, {'lesson_plans': []})
+    failed = store.create('b.pdf')
+    store.fail(failed, 'bad file')
+    running = store.create('c.pdf')
+    store.start(running)
+    store._update(expired, finished_at=time.time() - 61)
+    store._update(running, started_at=time.time() - 3600)
+
+    store.create('d.pdf')
+    assert store.get(expired) is None and store.get_result(expired) is None
+    assert store.get(failed)['status'] == 'failed'
+    assert store.get(running)['status'] == 'running'
+
+    # Results are private to this user on a shared host
+    if hasattr(os, 'getuid'):
+        assert stat.S_IMODE(os.stat(tmp_path / 'jobs').st_mode) == 0o700
+        assert stat.S_IMODE(os.stat(store.db_path).st_mode) == 0o600
+
+
+def test_parse_job_reports_pages_then_lessons(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(job_store, '_default_store', store)
+    monkeypatch.setattr(worker_pool, '_parser', EnhancedSchemeParser(extract_workers=1))
+    worker_pool._parser.text_cache = None
+
+    reports = []
+    store_callback = store.progress_callback
+
+    def recording_callback(job_id):
+        write = store_callback(job_id)
+
+        def progress(*report, **details):
+            reports.append(report)
+            write(*report, **details)
+        return progress
+
+    monkeypatch.setattr(store, 'progress_callback', recording_callback)
+
+    job_id = store.create('STM2025.pdf')
+    worker_pool.run_parse_job(job_id, SAMPLE_PDF, 'STM2025.pdf')
+
+    assert [r for r in reports if r[0] == 'pages'][-1] == ('pages', 15, 15)
+    assert [r for r in reports if r[0] == 'lessons'][-1] == ('lessons', 44, None)
+    assert reports[-1] == ('enhance', 44, 44)
+    job = store.get(job_id)
+    assert (job['status'], job['pages_done'], job['lessons_found']) == ('completed', 15, 44)
+    assert store.get_result(job_id)['weeks_found'] == list(range(1, 12))
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_job_lifecycle_survives_a_new_store(pathlib.Path(tempfile.mkdtemp()))
+    test_unfinished_jobs_are_marked_interrupted(pathlib.Path(tempfile.mkdtemp()))
+    test_jobs_from_before_owners_were_recorded_are_interrupted(pathlib.Path(tempfile.mkdtemp()))
+    test_finished_jobs_expire(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,64 @@
+"""
+Test the legacy line parser's single-scan section header matching
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+
+from legacy_parser import (
+    KEYWORD_MAP, LEGACY_SEGMENTER, SECTION_HEADER_MATCHER, SECTION_SEPARATORS, parse_scheme_of_work,
+)
+from line_segmenter import HEADER_CODES
+
+
+def classify_keyword_by_keyword(line_lower):
+    """The checks parse_scheme_of_work used to run for every keyword of every section"""
+    for section, keywords in KEYWORD_MAP.items():
+        separator_hits = 0
+        for keyword in keywords:
+            if any(f'{keyword}{separator}' in line_lower for separator in SECTION_SEPARATORS):
+                if not separator_hits:
+                    first_keyword = keyword
+                separator_hits += 1
+            elif not separator_hits and line_lower.startswith(keyword + ' '):
+                return section, keyword, 0
+        if separator_hits:
+            return section, first_keyword, separator_hits
+    return None
+
+
+def test_header_matches_keyword_by_keyword_checks():
+    cases = {
+        "sub-strand: counting": ('strand', 'strand', 1),  # 'strand:' is found before 'sub-strand:'
+        "learning outcomes: count to ten": ('specific_learning_outcomes', 'learning outcomes', 2),
+        "lesson title reading": ('lesson', 'lesson', 0),
+        "key inquiry questions - why?": ('key_inquiry_question', 'key inquiry', 0),  # starts with the keyword
+        "the learner reads aloud": None,
+    }
+    for line, expected in cases.items():
+        assert SECTION_HEADER_MATCHER.classify(line) == expected, line
+
+    tokens = [keyword for keywords in KEYWORD_MAP.values() for keyword in keywords]
+    tokens += list(SECTION_SEPARATORS) + [' ', 'x', 'week', 'w', 'wk', 'k', '3', '٣', 't2', 'i̇', '.']
+    rng = random.Random(13)
+    for _ in range(3000):
+        line = ''.join(rng.choice(tokens) for _ in range(rng.randint(1, 6))).strip()
+        header = SECTION_HEADER_MATCHER.classify(line)
+        assert header == classify_keyword_by_keyword(line), line
+        # The parser only classifies lines the segmenter marked as possible headers
+        if header:
+            assert LEGACY_SEGMENTER.classify(line.upper())[0] in HEADER_CODES, line
+
+
+def test_repeated_keywords_still_add_content_once_per_keyword():
+    parsed = parse_scheme_of_work("Week 1\nLearning outcomes: count to ten\nResources - charts\nmore charts\n")
+    lesson = parsed['lesson_plans'][0]
+    assert lesson['specific_learning_outcomes'] == ['count to ten', 'count to ten']
+    assert lesson['learning_resources'] == ['charts', 'more charts']
+
+
+if __name__ == "__main__":
+    test_header_matches_keyword_by_keyword_checks()
+    test_repeated_keywords_still_add_content_once_per_keyword()
@@ -0,0 +1,221 @@
+"""
+Test the lesson plan endpoints against a temporary SQLite database
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import base64
+import json
+import random
+import tempfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'lesson_plans.db'))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+import main
+from main import DBLessonPlan, SessionLocal
+
+client = TestClient(main.app)
+
+
+def clear_lesson_plans():
+    with SessionLocal() as db:
+        db.query(DBLessonPlan).delete()
+        db.commit()
+
+
+def add_rows(rows):
+    """Insert lesson_plans rows directly, returning their ids"""
+    with SessionLocal() as db:
+        lesson_plans = [DBLessonPlan(**row) for row in rows]
+        db.add_all(lesson_plans)
+        db.commit()
+        return [lp.id for lp in lesson_plans]
+
+
+def lesson_plan_payload(**fields):
+    """A LessonPlanCreate body, as the frontend sends one for a parsed lesson"""
+    return dict({
+        'school': 'Kilimani', 'level': 'Grade 9', 'learningArea': 'Mathematics', 'date': '2025-05-05', 'roll': '40',
+        'term': 2, 'week': 1, 'lessonNumber': 1, 'title': 'Fractions', 'strand': 'Numbers', 'subStrand': 'Fractions',
+        'specificLearningOutcomes': ['Add fractions\nwith unlike denominators', 'Compare fractions (like 1/2)'],
+        'coreCompetencies': ['Critical thinking'], 'keyInquiryQuestion': 'How do we share equally?',
+        'learningResources': ['Fraction charts'],
+        'introduction': {'duration': '5 minutes', 'activities': ['Review the previous lesson']},
+        'lessonDevelopment': {'duration': '30 minutes', 'steps': [
+            {'stepNumber': 1, 'activity': 'Discuss examples (in pairs)', 'duration': '15 minutes'}]},
+        'conclusion': {'duration': '5 minutes', 'activities': ['Summarise the lesson']},
+        'extendedActivities': [], 'assessment': 'Oral questions',
+    }, **fields)
+
+
+def lesson_plan_count():
+    with SessionLocal() as db:
+        return db.query(DBLessonPlan).count()
+
+
+def lesson_plan_selects(params):
+    """The listing for params, and the SELECTs it ran on lesson_plans"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.startswith('SELECT') and 'lesson_plans' in statement:
+            statements.append(statement)
+
+    event.listen(main.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/lesson-plans/', params=params)
+    finally:
+        event.remove(main.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def all_pages(params, limit):
+    """Ids of every lesson plan the filters in params select, following next_cursor from page to page"""
+    ids, cursor = [], None
+    while True:
+        page_params = dict(params, limit=limit, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/lesson-plans/', params=page_params)
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(lesson_plan['id'] for lesson_plan in page['lesson_plans'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def test_pages_walk_every_filtered_row_once():
+    clear_lesson_plans()
+    rng = random.Random(24)
+    # Rows saved before the API required them may lack a term, week or lesson number
+    rows = [{
+        'school': rng.choice(['Kilimani', 'Moi Avenue']), 'level': rng.choice(['Grade 8', 'Grade 9']),
+        'learning_area': rng.choice(['Mathematics', 'English']), 'title': f'Lesson {index}',
+        'term': rng.choice([None, 1, 2]), 'week': rng.choice([None, 1, 2, 3, 4]),
+        'lesson_number': rng.choice([None, 1, 2]),
+    } for index in range(120)]
+    for row, row_id in zip(rows, add_rows(rows)):
+        row['id'] = row_id
+
+    def order(row):
+        # NULL sorts first
+        return tuple((row[name] is not None, row[name] or 0) for name in ('term', 'week', 'lesson_number')) + (row['id'],)
+
+    def selected(row, params):
+        if any(row[name] != params[name] for name in ('school', 'level', 'learning_area', 'term') if name in params):
+            return False
+        if 'week_from' in params or 'week_to' in params:
+            return row['week'] is not None and params.get('week_from', row['week']) <= row['week'] <= params.get(
+                'week_to', row['week'])
+        return True
+
+    for params in [{}, {'school': 'Kilimani', 'learning_area': 'Mathematics'},
+                   {'school': 'Moi Avenue', 'term': 2, 'week_from': 2, 'week_to': 3}, {'level': 'Grade 8'}]:
+        expected = sorted((row for row in rows if selected(row, params)), key=order)
+        for limit in (1, 3, 50):
+            # A full LessonPlan needs a term, week and lesson number, so these rows are listed with fields
+            assert all_pages(dict(params, fields='title'), limit) == [row['id'] for row in expected]
+
+
+def test_invalid_cursor_is_rejected():
+    for position in ([1, 2], ['1', 1, 1, 1], [1, 1, 1, None]):
+        cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        assert client.get('/lesson-plans/', params={'cursor': cursor}).status_code == 400
+    assert client.get('/lesson-plans/', params={'cursor': 'not a cursor'}).status_code == 400
+
+
+def test_bulk_insert_returns_ids_in_request_order():
+    clear_lesson_plans()
+    payloads = [lesson_plan_payload(week=week, title=f'Week {week}') for week in (3, 1, 2)]
+    response = client.post('/lesson-plans/bulk', json=payloads)
+    assert response.status_code == 200
+    ids = response.json()['ids']
+    assert len(set(ids)) == 3
+    for lesson_plan_id, payload in zip(ids, payloads):
+        assert client.get(f'/lesson-plans/{lesson_plan_id}').json() == dict(
+            payload, id=lesson_plan_id, teacherSelfEvaluation=None, reflection=None)
+
+
+def test_bulk_insert_saves_all_or_nothing():
+    clear_lesson_plans()
+    # Rejected before anything is written
+    payloads = [lesson_plan_payload(), lesson_plan_payload(week='first')]
+    assert client.post('/lesson-plans/bulk', json=payloads).status_code == 422
+    assert lesson_plan_count() == 0
+
+    # The database refuses the third row after the first two are inserted
+    with SessionLocal() as db:
+        db.execute(text("CREATE TRIGGER refuse_lesson BEFORE INSERT ON lesson_plans WHEN NEW.title = 'Refused' "
+                        "BEGIN SELECT RAISE(ABORT, 'refused'); END"))
+        db.commit()
+    try:
+        payloads = [lesson_plan_payload(), lesson_plan_payload(), lesson_plan_payload(title='Refused')]
+        response = TestClient(main.app, raise_server_exceptions=False).post('/lesson-plans/bulk', json=payloads)
+        assert response.status_code == 500
+        assert lesson_plan_count() == 0
+    finally:
+        with SessionLocal() as db:
+            db.execute(text("DROP TRIGGER refuse_lesson"))
+            db.commit()
+
+
+def test_bulk_insert_is_capped(monkeypatch):
+    clear_lesson_plans()
+    monkeypatch.setattr(main, 'MAX_BULK_LESSON_PLANS', 2)
+    response = client.post('/lesson-plans/bulk', json=[lesson_plan_payload()] * 3)
+    assert response.status_code == 413
+    assert lesson_plan_count() == 0
+    assert client.post('/lesson-plans/bulk', json=[lesson_plan_payload()] * 2).status_code == 200
+
+
+def test_fields_select_only_those_fields_and_columns():
+    clear_lesson_plans()
+    client.post('/lesson-plans/bulk', json=[lesson_plan_payload(week=week) for week in (1, 2)])
+
+    response, selects = lesson_plan_selects({'fields': 'title,strand,week,date'})
+    assert [sorted(lesson_plan) for lesson_plan in response.json()['lesson_plans']] == [
+        ['date', 'id', 'strand', 'title', 'week']] * 2
+    assert len(selects) == 1
+    assert 'specific_learning_outcomes' not in selects[0] and 'assessment' not in selects[0]
+
+    # Every field can be projected without touching a column it did not load
+    payload = lesson_plan_payload(week=1)
+    for name in main.LESSON_PLAN_FIELDS:
+        response, _ = lesson_plan_selects({'fields': name})
+        assert response.status_code == 200, name
+        first = response.json()['lesson_plans'][0]
+        assert first.keys() == {'id', name}
+        if name in payload:
+            assert first[name] == payload[name]
+    response, _ = lesson_plan_selects({'fields': ','.join(main.LESSON_PLAN_FIELDS)})
+    assert response.json()['lesson_plans'][0] == dict(payload, id=first['id'], teacherSelfEvaluation=None,
+                                                      reflection=None)
+
+
+def test_unknown_fields_are_rejected():
+    response = client.get('/lesson-plans/', params={'fields': 'title,bogus'})
+    assert response.status_code == 400
+    assert 'bogus' in response.json()['detail']
+
+
+def test_full_listing_loads_deferred_columns_in_the_same_query():
+    clear_lesson_plans()
+    client.post('/lesson-plans/bulk', json=[lesson_plan_payload(week=week) for week in (1, 2, 3)])
+    response, selects = lesson_plan_selects({})
+    assert [lesson_plan['specificLearningOutcomes'] for lesson_plan in response.json()['lesson_plans']] == [
+        lesson_plan_payload()['specificLearningOutcomes']] * 3
+    assert len(selects) == 1
+    assert 'specific_learning_outcomes' in selects[0] and 'development_steps' in selects[0]
+
+
+if __name__ == "__main__":
+    test_pages_walk_every_filtered_row_once()
+    test_invalid_cursor_is_rejected()
+    test_bulk_insert_returns_ids_in_request_order()
+    test_bulk_insert_saves_all_or_nothing()
+    test_fields_select_only_those_fields_and_columns()
+    test_unknown_fields_are_rejected()
+    test_full_listing_loads_deferred_columns_in_the_same_query()
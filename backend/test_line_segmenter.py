@@ -0,0 +1,73 @@
+"""
+Test the single-pass line segmenter against per-line week pattern searches
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import re
+
+from enhanced_parser import FREE_FORMAT_SEGMENTER, FREE_FORMAT_WEEK_PATTERNS, EnhancedSchemeParser
+from legacy_parser import LEGACY_SEGMENTER, WEEK_PATTERNS
+from line_segmenter import (
+    BLANK, BULLET, CONTENT, LESSON_HEADER, SECTION_HEADER, WEEK_HEADER, LineSegmenter,
+)
+from scheme_document import SchemeDocument
+
+
+def first_week_match(patterns, line):
+    """Week number from the first pattern found in the stripped line, as the parsers used to search"""
+    for pattern in patterns:
+        match = re.search(pattern, line.strip(), re.IGNORECASE)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def random_text(rng, lines=200):
+    tokens = ['week', 'Week', 'WK', 'w', 'W', 'term', 't', '1', '12', '٣', ' ', '  ', '\t', ':', '-', '.',
+              'lesson', 'objectives', 'x', 'K', '•', '\r', '\x0b']
+    return '\n'.join(''.join(rng.choice(tokens) for _ in range(rng.randint(0, 7))) for _ in range(lines))
+
+
+def test_segment_codes_lines_like_the_documented_rules():
+    segmenter = LineSegmenter([r'WEEK\s*(\d+)', r'^\s*(\d+)\s*[.\-:]'], ['objectives'], (':', ' -'))
+    text = "Week 3 notes\n\n  12. Fractions\n- count\nObjectives: add\nLesson 4\nplain\nWEEK\n5\n   "
+    segmentation = segmenter.segment(text)
+    assert list(segmentation.codes) == [
+        WEEK_HEADER, BLANK, WEEK_HEADER, BULLET, SECTION_HEADER, LESSON_HEADER, CONTENT, CONTENT, CONTENT, BLANK,
+    ]
+    assert segmentation.weeks == {0: 3, 2: 12}
+    assert segmentation.week_blocks() == [(3, 0, 2), (12, 2, 10)]
+    assert segmenter.classify("wEEK7") == (WEEK_HEADER, 7)
+
+
+def test_segmenters_match_per_line_searches():
+    rng = random.Random(17)
+    for segmenter, patterns in ((LEGACY_SEGMENTER, WEEK_PATTERNS), (FREE_FORMAT_SEGMENTER, FREE_FORMAT_WEEK_PATTERNS)):
+        for _ in range(40):
+            text = random_text(rng)
+            segmentation = segmenter.segment(text)
+            lines = text.split('\n')
+            assert len(segmentation.codes) == len(lines)
+            for index, line in enumerate(lines):
+                week = first_week_match(patterns, line)
+                assert segmentation.weeks.get(index) == week, repr(line)
+                assert (segmentation.codes[index] == BLANK) == (not line.strip()), repr(line)
+                assert segmenter.classify(line) == (segmentation.codes[index], week), repr(line)
+
+
+def test_document_and_streamed_lines_give_the_same_blocks():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    text = "Scheme of work\nWeek 1\nStrand: Numbers\n\n  counting\n2 week\nreading\nW3: shapes\n"
+    blocks = list(parser.iter_lesson_blocks(SchemeDocument(text)))
+    assert blocks == list(parser.iter_lesson_blocks(iter(text.split('\n'))))
+    assert [block[0] for block in blocks] == [('week', 1), ('week', 2), ('week', 3)]
+    assert blocks[0][2:] == [('content', 'Strand: Numbers'), ('content', 'counting')]
+
+
+if __name__ == "__main__":
+    test_segment_codes_lines_like_the_documented_rules()
+    test_segmenters_match_per_line_searches()
+    test_document_and_streamed_lines_give_the_same_blocks()
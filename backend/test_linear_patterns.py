@@ -0,0 +1,103 @@
+"""
+Test the linear-time pattern searches against re and their running time on adversarial week blocks
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import random
+import re
+import time
+
+from enhanced_parser import EnhancedSchemeParser
+from linear_patterns import LazyRunPattern, inquiry_question, phrase_containing
+
+PATTERNS = [
+    (r'by\s+the\s+end[^:]*?:\s*([^?]+?)(?:\s+how\s+|$)', 0),
+    (r'learner[s]?\s+should\s+be\s+able\s+to[:\s]*([^?]+?)(?:\s+how\s+|$)', 0),
+    (r'objective[s]?[:\s]*([^?]+?)(?:\s+how\s+|$)', 0),
+    (r'how\s+can\s+[^?]*?\?', 0),
+    (r'what\s+[^?]*?\?', 0),
+    (r'strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+sub[\-\s]*strand|$|\.|\n)', re.IGNORECASE),
+    (r'sub[\-\s]*strand[s]?[:\-]?\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|$|\.|\n)', re.IGNORECASE),
+    (r':\s*([A-Za-z\s]+?)(?:\s+by\s+the\s+end|learning|objective|week|\d|$)', 0),
+    (r'mathematics[:\-]?\s*([A-Za-z\s,]+?)(?:\s+by\s+the\s+end|learning|objective|$)', 0),
+    (r'([A-Za-z\s]+?)\s+(?:concepts?|skills?|activities?|methods?)', 0),
+]
+
+# Pieces the random texts are built from: keywords, terminators and whitespace the patterns backtrack over
+PIECES = [' ', '  ', '\n', '\t', '\xa0', ':', '-', '?', '.', ',', 'a', 'S', 's', '1', 'ſ', 'how', ' how ', 'by the end',
+          'the end', 'objectives', 'learners should be able to', 'what', 'how can', 'strand', 'strands', 'sub strand',
+          'sub-strand', 'sub', 'week', 'learning', 'skills', 'concepts', 'mathematics', 'inquiry question',
+          'inquiry questions', 'map', 'maps']
+
+# Keywords that start a pattern's phrase, repeated with nothing that ends it
+KEYWORDS = ['objective', 'by the end', 'by the end:', 'learners should be able to', 'learning outcomes', 'what', 'how can',
+            'why', 'inquiry question', 'strand', 'subject', 'theme', 'learning area', 'sub strand', 'topic', 'sub topic',
+            'focus', ':', '-', 'mathematics', 'textbook', 'numbers', 'abc']
+
+
+def adversarial_texts(length):
+    """Week block texts of about length characters on which backtracking search is super-linear.
+
+    Each is a run with no period, question mark or other terminator, made
+    of a repeated keyword or of one keyword and a long whitespace run,
+    optionally closed by a character that ends no phrase the keyword starts.
+    """
+    for keyword in KEYWORDS:
+        for end in ('', '?', '.', 'x'):
+            yield ((keyword + ' ') * (length // (len(keyword) + 1)))[:length] + end
+            yield ('.' + keyword) * (length // (len(keyword) + 1)) + end
+            yield keyword + ' ' * length + end
+            yield keyword + ': ' + ' x' * (length // 2) + ' how' + end
+
+
+def test_searches_match_re():
+    rng = random.Random(20)
+    searches = [(re.compile(pattern, flags), LazyRunPattern(pattern, flags)) for pattern, flags in PATTERNS]
+    for _ in range(3000):
+        text = ''.join(rng.choice(PIECES) for _ in range(rng.randint(0, 16)))
+        if rng.random() < 0.5:
+            text = text.lower()
+        for expected, linear in searches:
+            match, found = expected.search(text), linear.search(text)
+            assert (match and (match.span(), match.group(expected.groups))) == \
+                (found and (found.span(), found.group(expected.groups)))
+
+        match = re.search(r'inquiry\s+question[s]?[:\s]*([^.]+[?.])', text)
+        assert inquiry_question(text) == (match.group(0) if match else None)
+        for word in ('map', 's', 'how'):
+            match = re.search(r'([^.]*?' + re.escape(word) + r'[^.]*?)(?:\s|$|\.)', text)
+            assert phrase_containing(text, word) == (match.group(1) if match else None)
+
+
+def test_adversarial_texts_match_re():
+    for text in adversarial_texts(60):
+        for pattern, flags in PATTERNS:
+            match, found = re.search(pattern, text, flags), LazyRunPattern(pattern, flags).search(text)
+            assert (match and match.span()) == (found and found.span())
+
+
+def worst_block_seconds(parser, length):
+    worst = 0
+    for text in adversarial_texts(length):
+        block = [('week', 1), ('raw_content', ['Week 1']), ('content', text)]
+        started = time.perf_counter()
+        parser.extract_lesson_from_block(block)
+        worst = max(worst, time.perf_counter() - started)
+    return worst
+
+
+def test_worst_block_time_grows_linearly():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    worst_block_seconds(parser, 500)
+    # Best of three runs, to keep scheduling noise out; quadratic growth would be 16 times
+    short = min(worst_block_seconds(parser, 2000) for _ in range(3))
+    long = min(worst_block_seconds(parser, 8000) for _ in range(3))
+    assert long < 8 * short
+
+
+if __name__ == "__main__":
+    test_searches_match_re()
+    test_adversarial_texts_match_re()
+    test_worst_block_time_grows_linearly()
@@ -0,0 +1,53 @@
+"""
+Test converting lesson_plans list columns from newline-joined text to JSON
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+
+from sqlalchemy import create_engine, text
+
+from migrate_lesson_plan_json import LIST_COLUMNS, STEPS_COLUMN, migrate
+
+
+def legacy_engine():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        columns = ', '.join(f'{name} TEXT' for name in LIST_COLUMNS + [STEPS_COLUMN])
+        connection.execute(text(f"CREATE TABLE lesson_plans (id INTEGER PRIMARY KEY, title VARCHAR(255), {columns})"))
+        connection.execute(text(
+            "INSERT INTO lesson_plans (id, title, specific_learning_outcomes, core_competencies, development_steps) "
+            "VALUES (1, 'Fractions', :outcomes, '', :steps)"),
+            {'outcomes': 'Add fractions\nCompare fractions (like 1/2)', 'steps': '1. Discuss (10 min)\n2. Practise\nnotes'})
+    return engine
+
+
+def read_row(engine):
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT * FROM lesson_plans")).mappings().one()
+    return {name: json.loads(row[name]) for name in LIST_COLUMNS + [STEPS_COLUMN]}
+
+
+def test_list_columns_become_json_as_reads_parsed_them():
+    engine = legacy_engine()
+    assert migrate(engine) == 1
+    row = read_row(engine)
+    assert row['specific_learning_outcomes'] == ['Add fractions', 'Compare fractions (like 1/2)']
+    assert row['core_competencies'] == [] and row['extended_activities'] == []
+    assert row[STEPS_COLUMN] == [{'stepNumber': 1, 'activity': 'Discuss', 'duration': '10 min'},
+                                 {'stepNumber': 2, 'activity': 'Practise', 'duration': ''}]
+
+
+def test_running_again_keeps_converted_values():
+    engine = legacy_engine()
+    migrate(engine)
+    converted = read_row(engine)
+    migrate(engine)
+    assert read_row(engine) == converted
+
+
+if __name__ == "__main__":
+    test_list_columns_become_json_as_reads_parsed_them()
+    test_running_again_keeps_converted_values()
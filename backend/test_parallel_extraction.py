@@ -0,0 +1,46 @@
+"""
+Test page-parallel PDF extraction against the serial path
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import enhanced_parser
+from enhanced_parser import EnhancedSchemeParser
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def _read_sample():
+    with open(SAMPLE_PDF, 'rb') as f:
+        return f.read()
+
+
+def test_parallel_matches_serial():
+    """Parallel extraction must produce the same text, in the same page order"""
+    content = _read_sample()
+
+    serial = EnhancedSchemeParser(extract_workers=1).extract_text_from_pdf(content)
+    parallel = EnhancedSchemeParser(extract_workers=3, parallel_min_pages=2).extract_text_from_pdf(content)
+
+    print(f"Serial: {len(serial)} chars, parallel: {len(parallel)} chars")
+    assert parallel == serial
+
+    page_markers = [line for line in parallel.split('\n') if line.startswith('--- PAGE ')]
+    assert page_markers == [f"--- PAGE {n} ---" for n in range(1, len(page_markers) + 1)]
+
+
+def test_small_documents_stay_serial(monkeypatch):
+    """Documents below the page threshold never touch the process pool"""
+    def fail(*args, **kwargs):
+        raise AssertionError("process pool should not be used for small documents")
+
+    monkeypatch.setattr(enhanced_parser, '_get_extraction_pool', fail)
+
+    parser = EnhancedSchemeParser(extract_workers=4, parallel_min_pages=1000)
+    text = parser.extract_text_from_pdf(_read_sample())
+    assert text.startswith('--- PAGE 1 ---')
+
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
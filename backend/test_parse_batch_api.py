@@ -0,0 +1,143 @@
+"""
+Test POST /parse-scheme/batch with ZIP archives of schemes
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+import pathlib
+import tempfile
+import zipfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'lesson_plans.db'))
+
+import docx
+from fastapi.testclient import TestClient
+
+import main
+import upload_spool
+from worker_pool import WorkerPool
+
+client = TestClient(main.app)
+
+STM2025 = pathlib.Path(__file__).resolve().parent.parent / 'STM2025.pdf'
+
+
+def scheme_docx():
+    """A two-week scheme of work as a Word document; the DOCX text is read from its paragraphs"""
+    document = docx.Document()
+    document.add_paragraph('GRADE 9 MATHEMATICS SCHEME OF WORK TERM 2')
+    for week, topic in ((1, 'add fractions'), (2, 'compare fractions')):
+        document.add_paragraph(f'Week {week}')
+        document.add_paragraph(f'Learning outcomes: {topic}')
+        document.add_paragraph('Resources - fraction charts')
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def zip_of(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def post_batch(files):
+    """POST files, a list of (filename, bytes), as one batch"""
+    return client.post('/parse-scheme/batch', files=[('files', (name, content)) for name, content in files])
+
+
+def use_pool(monkeypatch):
+    pool = WorkerPool(workers=1, max_pending=8)
+    monkeypatch.setattr(main, 'get_default_pool', lambda: pool)
+    return pool
+
+
+def test_mixed_archive_gets_a_result_per_member(monkeypatch):
+    pool = use_pool(monkeypatch)
+    try:
+        pdf = STM2025.read_bytes()
+        archive = zip_of({
+            'term2/stm2025.pdf': pdf, 'term2/scheme.docx': scheme_docx(), 'term2/cover.png': b'\x89PNG not a scheme',
+            'term2/broken.pdf': b'%PDF-1.4 truncated', 'copies/stm2025.pdf': pdf, '__MACOSX/._stm2025.pdf': b'fork',
+        })
+        response = post_batch([('schemes.zip', archive)])
+        assert response.status_code == 200
+        body = response.json()
+    finally:
+        pool.shutdown()
+
+    results = {entry['filename']: entry for entry in body['results']}
+    assert [entry['filename'] for entry in body['results']] == [
+        'term2/stm2025.pdf', 'term2/scheme.docx', 'term2/cover.png', 'term2/broken.pdf', 'copies/stm2025.pdf']
+    assert body['timing']['files'] == 5 and body['timing']['unique_files'] == 5 - 1
+
+    assert results['term2/stm2025.pdf']['result']['success']
+    assert results['term2/stm2025.pdf']['result']['lesson_plans']
+    assert results['copies/stm2025.pdf']['duplicate_of'] == 'term2/stm2025.pdf'
+    assert results['copies/stm2025.pdf']['result'] == results['term2/stm2025.pdf']['result']
+    assert results['term2/scheme.docx']['duplicate_of'] is None
+    assert results['term2/scheme.docx']['result']['success']
+    assert results['term2/scheme.docx']['result']['weeks_found'] == [1, 2]
+
+    # Members that cannot be parsed get an unsuccessful entry instead of failing the batch
+    assert not results['term2/cover.png']['result']['success']
+    assert results['term2/cover.png']['result']['message'].startswith('Unsupported file type')
+    assert not results['term2/broken.pdf']['result']['success']
+    assert results['term2/broken.pdf']['result']['message']
+    for name in ('term2/cover.png', 'term2/broken.pdf'):
+        assert results[name]['result']['lesson_plans'] == []
+
+
+def test_invalid_archive_is_rejected(monkeypatch):
+    pool = use_pool(monkeypatch)
+    try:
+        response = post_batch([('schemes.zip', b'not a zip')])
+    finally:
+        pool.shutdown()
+    assert response.status_code == 400
+    assert 'schemes.zip' in response.json()['detail']
+
+
+def test_archive_members_are_held_to_the_upload_cap(monkeypatch):
+    pool = use_pool(monkeypatch)
+    monkeypatch.setattr(upload_spool, 'MAX_UPLOAD_BYTES', 1024)
+    try:
+        response = post_batch([('schemes.zip', zip_of({'small.txt': b'WEEK 1', 'large.txt': b'x' * 4096}))])
+    finally:
+        pool.shutdown()
+    assert response.status_code == 413
+
+
+def test_batch_entry_count_is_capped(monkeypatch):
+    pool = use_pool(monkeypatch)
+    monkeypatch.setattr(main, 'MAX_BATCH_FILES', 2)
+    try:
+        members = {f'week{week}.txt': f'WEEK {week}'.encode() for week in (1, 2, 3)}
+        response = post_batch([('schemes.zip', zip_of(members))])
+        assert response.status_code == 413
+        # Files uploaded alongside an archive count towards the same cap
+        response = post_batch([('week0.txt', b'WEEK 0'), ('schemes.zip', zip_of(dict(list(members.items())[:2])))])
+        assert response.status_code == 413
+    finally:
+        pool.shutdown()
+
+
+def test_batch_body_size_is_capped(monkeypatch):
+    monkeypatch.setattr(main, 'MAX_BATCH_UPLOAD_BYTES', 1024)
+    monkeypatch.setattr(main, 'MULTIPART_OVERHEAD_BYTES', 0)
+    response = post_batch([('schemes.zip', zip_of({'large.txt': os.urandom(4096)}))])
+    assert response.status_code == 413
+    assert response.json()['detail'].startswith('File too large')
+
+
+if __name__ == "__main__":
+    import pytest
+    for test in (test_mixed_archive_gets_a_result_per_member, test_invalid_archive_is_rejected,
+                 test_archive_members_are_held_to_the_upload_cap, test_batch_entry_count_is_capped,
+                 test_batch_body_size_is_capped):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
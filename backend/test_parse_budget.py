@@ -0,0 +1,101 @@
+"""
+Test time-budgeted parsing, its partial results and resuming from a continuation token
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import shutil
+
+import parse_budget
+import worker_pool
+from enhanced_parser import EnhancedSchemeParser
+from parse_budget import ContinuationStore
+from scheme_document import SchemeDocument
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+TABLE_TEXT = ("Week 0  Lesson 0  Strand area  Sub-strand area  Learning outcomes  Learning experiences\n" +
+              "".join(f"{week}  1  Numbers  Fractions  Add fractions {week}  Group work\n" for week in range(1, 9)))
+FREE_TEXT = "".join(f"Week {week}\nStrand: Numbers\nObjectives: count to {week}\n" for week in range(1, 9))
+
+
+def test_continuation_can_be_claimed_once(tmp_path):
+    store = ContinuationStore(str(tmp_path / 'continuations'))
+    source = tmp_path / 'upload.pdf'
+    source.write_bytes(b'%PDF')
+
+    token = store.save({'position': 3}, str(source))
+    assert not source.exists()
+    state = store.load(token)
+    assert state['position'] == 3
+    with open(state['source_path'], 'rb') as f:
+        assert f.read() == b'%PDF'
+    assert store.load(token) is None
+    assert store.load('../' + token) is None
+
+    store.discard_source(state['source_path'])
+    assert os.listdir(store.directory) == []
+
+
+def test_expired_continuation_is_gone(tmp_path):
+    store = ContinuationStore(str(tmp_path / 'continuations'), ttl_seconds=60)
+    token = store.save({'position': 0})
+    state_path = os.path.join(store.directory, token + '.pickle')
+    os.utime(state_path, (1000, 1000))
+    assert store.load(token) is None
+    assert os.listdir(store.directory) == []
+
+
+def test_state_of_another_user_is_not_unpickled(tmp_path, monkeypatch):
+    store = ContinuationStore(str(tmp_path / 'continuations'))
+    assert os.stat(store.directory).st_mode & 0o777 == 0o700
+
+    token = store.save({'position': 3})
+    uid = os.getuid()
+    monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+    assert store.load(token) is None
+    assert os.listdir(store.directory) == []
+
+
+def test_resuming_a_stage_at_any_position_gives_the_rest():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    for text in (TABLE_TEXT, FREE_TEXT):
+        document = SchemeDocument(text)
+        units = list(parser.iter_resumable_lessons(document, 'text'))
+        assert [lesson for _, lesson in units if lesson] == parser.parse_table_format(document)
+        for index, (position, _) in enumerate(units):
+            assert list(parser.iter_resumable_lessons(document, 'text', position)) == units[index:]
+
+
+def test_budgeted_parse_resumes_to_the_full_result(tmp_path, monkeypatch):
+    monkeypatch.setattr(parse_budget, '_default_store', ContinuationStore(str(tmp_path / 'continuations')))
+    monkeypatch.setattr(worker_pool, '_parser', EnhancedSchemeParser(extract_workers=1))
+    worker_pool._parser.text_cache = None
+    expected = worker_pool.parse_scheme_upload(SAMPLE_PDF, 'pdf', 'STM2025.pdf')
+
+    # The spooled upload is handed over to the continuation store while pages remain
+    upload = tmp_path / 'upload.pdf'
+    shutil.copy(SAMPLE_PDF, upload)
+    parsed = worker_pool.parse_scheme_upload_within(str(upload), 'pdf', 'STM2025.pdf', None, 0.0)
+    assert parsed['partial']
+    assert (parsed['next_page'], parsed['lesson_plans']) == (2, [])
+    assert not upload.exists()
+
+    next_weeks = []
+    while parsed.get('partial'):
+        if parsed['next_week']:
+            next_weeks.append(parsed['next_week'])
+            assert all(lesson['week'] < parsed['next_week'] for lesson in parsed['lesson_plans'])
+        parsed = worker_pool.resume_scheme_parse(parsed['continuation_token'], 0.0)
+    assert next_weeks[:3] == [2, 3, 4]
+    assert parsed == expected
+    assert os.listdir(parse_budget.get_continuation_store().directory) == []
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pathlib
+    test_continuation_can_be_claimed_once(pathlib.Path(tempfile.mkdtemp()))
+    test_expired_continuation_is_gone(pathlib.Path(tempfile.mkdtemp()))
+    test_resuming_a_stage_at_any_position_gives_the_rest()
@@ -0,0 +1,149 @@
+"""
+Test streaming a parse job's progress from GET /jobs/{id}/events
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import functools
+import json
+import pathlib
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'lesson_plans.db'))
+
+from fastapi.testclient import TestClient
+
+import job_store
+import main
+import worker_pool
+from job_store import JobStore
+from progress_events import ProgressHub
+from worker_pool import WorkerPool
+
+STM2025 = pathlib.Path(__file__).resolve().parent.parent / 'STM2025.pdf'
+
+
+def run_parse_job_once_released(release_path, *args):
+    """run_parse_job, held back until release_path exists so the test can subscribe first"""
+    while not os.path.exists(release_path):
+        time.sleep(0.01)
+    worker_pool.run_parse_job(*args)
+
+
+def use_job_services(tmp_path, monkeypatch):
+    """A private job store, progress hub and one-worker pool for main"""
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(job_store, '_default_store', store)
+    hub = ProgressHub()
+    monkeypatch.setattr(main, 'get_progress_hub', lambda: hub)
+    pool = WorkerPool(workers=1, max_pending=4, initargs=hub.worker_initargs())
+    monkeypatch.setattr(main, 'get_default_pool', lambda: pool)
+    return store, hub
+
+
+def once_subscribed(hub, action, delay=0.0):
+    """Run action on a thread once the event stream has subscribed to the hub.
+
+    TestClient only returns a streamed response once it has ended, so the
+    job is moved along from here instead of between reads.
+    """
+    def wait_then_act():
+        while not hub.subscriber_count.value:
+            time.sleep(0.01)
+        time.sleep(delay)
+        action()
+
+    thread = threading.Thread(target=wait_then_act, daemon=True)
+    thread.start()
+    return thread
+
+
+def read_events(response):
+    return read_events_from(response.iter_lines())
+
+
+def read_events_from(lines):
+    """(event, data) for each message of an event stream; keep-alive comments are skipped"""
+    events = []
+    event = None
+    for line in lines:
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            events.append((event, json.loads(line[len('data: '):])))
+    return events
+
+
+def test_events_stream_status_then_progress_then_completed(tmp_path, monkeypatch):
+    _, hub = use_job_services(tmp_path, monkeypatch)
+    release_path = tmp_path / 'release'
+    monkeypatch.setattr(main, 'run_parse_job', functools.partial(run_parse_job_once_released, str(release_path)))
+
+    # Entering the client runs the startup hooks, which start the progress relay
+    with TestClient(main.app) as client:
+        response = client.post('/jobs/parse-scheme', files={'file': ('STM2025.pdf', STM2025.read_bytes())})
+        assert response.status_code == 202
+        job = response.json()
+        once_subscribed(hub, release_path.touch)
+        with client.stream('GET', job['events_url']) as events_response:
+            assert events_response.headers['content-type'].startswith('text/event-stream')
+            events = read_events(events_response)
+        result = client.get(job['result_url']).json()
+
+    stages = [event for event, _ in events]
+    assert stages[0] == 'status'
+    assert (events[0][1]['id'], events[0][1]['status']) == (job['job_id'], 'queued')
+    assert stages[1] == 'started'
+    assert 'pages' in stages and 'lessons' in stages
+    assert stages.index('pages') < stages.index('lessons')
+    assert stages[-1] == 'completed' and stages.count('completed') == 1
+
+    pages = [data for event, data in events if event == 'pages']
+    assert (pages[-1]['done'], pages[-1]['total']) == (15, 15)
+    assert events[-1][1]['done'] == len(result['lesson_plans']) == 44
+    elapsed = [data['elapsed_seconds'] for _, data in events[1:]]
+    assert elapsed == sorted(elapsed)
+
+
+def test_stream_falls_back_to_the_store_when_no_event_arrives(tmp_path, monkeypatch):
+    store, hub = use_job_services(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, 'JOB_EVENTS_KEEPALIVE_SECONDS', 0.05)
+    job_id = store.create('scheme.pdf')
+    store.start(job_id)
+
+    # The worker finishes without its final event reaching the hub
+    once_subscribed(hub, lambda: store.complete(
+        job_id, {'success': True, 'message': 'ok', 'weeks_found': [], 'lesson_plans': []}), delay=0.3)
+    with TestClient(main.app) as client:
+        with client.stream('GET', f'/jobs/{job_id}/events') as response:
+            lines = list(response.iter_lines())
+            events = read_events_from(lines)
+
+    assert [(event, data['status']) for event, data in events] == [('status', 'running'), ('status', 'completed')]
+    assert ': keep-alive' in lines
+
+
+def test_finished_and_unknown_jobs(tmp_path, monkeypatch):
+    store, _ = use_job_services(tmp_path, monkeypatch)
+    job_id = store.create('scheme.pdf')
+    store.fail(job_id, 'bad file')
+
+    with TestClient(main.app) as client:
+        with client.stream('GET', f'/jobs/{job_id}/events') as response:
+            events = read_events(response)
+        assert client.get('/jobs/missing/events').status_code == 404
+
+    # A finished job sends its stored state and ends the stream
+    assert [event for event, _ in events] == ['status']
+    assert (events[0][1]['status'], events[0][1]['error']) == ('failed', 'bad file')
+
+
+if __name__ == "__main__":
+    import pytest
+    for test in (test_events_stream_status_then_progress_then_completed,
+                 test_stream_falls_back_to_the_store_when_no_event_arrives, test_finished_and_unknown_jobs):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(pathlib.Path(tempfile.mkdtemp()), monkeypatch)
@@ -0,0 +1,80 @@
+"""
+Test parse progress events and their relay to subscribers
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import multiprocessing
+import queue
+
+from enhanced_parser import EnhancedSchemeParser
+from progress_events import ProgressHub, event_publisher
+from scheme_document import SchemeDocument
+
+FREE_FORMAT_SCHEME = """Week 1
+Strand: Numbers
+Learning outcomes: count to ten
+Week 2
+Strand: Measurement
+Learning outcomes: compare lengths
+"""
+
+
+def test_parser_reports_weeks_and_lessons():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    events = []
+    result = parser.parse_document(SchemeDocument(FREE_FORMAT_SCHEME),
+                                   lambda stage, done, total=None, **details: events.append((stage, done, details)))
+
+    assert len(result['lesson_plans']) == 2
+    assert [event for event in events if event[0] == 'weeks'] == [('weeks', 1, {'week': 1}), ('weeks', 2, {'week': 2})]
+    assert [event[1] for event in events if event[0] == 'lessons'] == [1, 2]
+    assert events[-1] == ('enhance', 2, {})
+
+
+def test_publisher_is_silent_without_subscribers():
+    events = queue.Queue()
+    subscriber_count = multiprocessing.RawValue('i', 0)
+    publish = event_publisher('job', events, subscriber_count)
+
+    publish('pages', 1, 3)
+    assert events.empty()
+
+    subscriber_count.value = 1
+    publish('pages', 2, 3)
+    publish('weeks', 1, None, week=4)
+    job_id, event = events.get_nowait()
+    assert job_id == 'job'
+    assert (event['stage'], event['done'], event['total']) == ('pages', 2, 3)
+    # Stage time runs from the stage's first event, even if that one was not sent
+    assert event['stage_seconds'] >= 0 and event['elapsed_seconds'] >= event['stage_seconds']
+    assert events.get_nowait()[1]['week'] == 4
+
+
+def test_hub_delivers_only_to_the_job_subscribers():
+    async def scenario():
+        hub = ProgressHub()
+        watched = hub.subscribe('a')
+        other = hub.subscribe('b')
+        assert hub.subscriber_count.value == 2
+
+        hub.publish('a', {'stage': 'pages', 'done': 1})
+        assert watched.get_nowait() == {'stage': 'pages', 'done': 1}
+        assert other.empty()
+
+        hub.unsubscribe('a', watched)
+        hub.unsubscribe('a', watched)  # unsubscribing twice is harmless
+        hub.unsubscribe('b', other)
+        assert hub.subscriber_count.value == 0
+        hub.publish('a', {'stage': 'pages', 'done': 2})
+        assert watched.empty()
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_parser_reports_weeks_and_lessons()
+    test_publisher_is_silent_without_subscribers()
+    test_hub_delivers_only_to_the_job_subscribers()
@@ -0,0 +1,80 @@
+"""
+Test the shared SchemeDocument used by the enhanced and legacy parsers
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_parser import EnhancedSchemeParser
+import scheme_document
+from scheme_document import SchemeDocument
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def test_page_spans_split_on_consecutive_markers():
+    text = "--- PAGE 1 ---\nWeek 1\nNumbers\n\n--- PAGE 2 ---\n--- PAGE 7 ---\nWeek 2\n\n"
+    document = SchemeDocument(text, 'scheme.pdf', 'pdf')
+
+    # Only consecutively numbered markers split pages
+    assert document.page_count == 2
+    assert [text[start:end] for start, end in document.page_spans] == [
+        "Week 1\nNumbers\n\n", "--- PAGE 7 ---\nWeek 2\n\n"]
+    assert list(document.iter_lines(page_bodies_only=True)) == [
+        "Week 1", "Numbers", "", "--- PAGE 7 ---", "Week 2", "", ""]
+
+
+def test_plain_text_is_a_single_page():
+    document = SchemeDocument.coerce("Week 1\nSTRAND: Mathematics")
+    assert document.page_count == 1
+    assert document.page_spans == [(0, len(document.text))]
+    assert list(document.iter_lines(page_bodies_only=True)) == ["Week 1", "STRAND: Mathematics"]
+    assert SchemeDocument.coerce(document) is document
+
+
+def test_line_views_match_split_and_lower():
+    text = "--- PAGE 1 ---\nWeek 1\r\nSTRAND: Numbers\n--- PAGE 2 ---\n\nLast line"
+    document = SchemeDocument(text)
+
+    assert document.line_count == len(text.split('\n'))
+    assert list(document.iter_lines()) == text.split('\n')
+    assert list(document.iter_lines(1, 3)) == text.split('\n')[1:3]
+    assert [lower for _, lower in document.iter_line_pairs()] == text.lower().split('\n')
+
+    # Page bodies skip the markers but keep every other line
+    assert list(document.iter_lines(page_bodies_only=True)) == ["Week 1\r", "STRAND: Numbers", "", "Last line"]
+
+
+def test_lowercase_view_is_built_in_line_aligned_chunks(monkeypatch):
+    monkeypatch.setattr(scheme_document, 'LOWER_CHUNK_CHARS', 4)
+    # Final sigma lowers differently at the end of a word, so chunks must not split words
+    text = "ΟΔΥΣΣΕΥΣ\nWeek 1 STRAND\n\nΣΟΦΙΑ Numbers"
+    document = SchemeDocument(text)
+    assert document.lower_text == text.lower()
+
+
+def test_lowercase_view_falls_back_when_lowering_changes_length():
+    # 'İ'.lower() is two code points, so offsets into a whole-text lowercase copy would drift
+    document = SchemeDocument("İzmir Week 1\nSTRAND: Numbers")
+    assert document.lower_text is None
+    assert document.line_lower(1) == "strand: numbers"
+    assert list(document.iter_line_pairs())[0] == ("İzmir Week 1", "İzmir Week 1".lower())
+
+
+def test_parse_document_matches_parse_scheme():
+    """Parsing a pre-extracted document gives the same result as parse_scheme"""
+    parser = EnhancedSchemeParser(extract_workers=1)
+    with open(SAMPLE_PDF, 'rb') as f:
+        content = f.read()
+
+    document = parser.extract_document(content, 'STM2025.pdf')
+    assert document.page_count == 15
+    assert parser.parse_document(document) == parser.parse_scheme(content, 'STM2025.pdf')
+
+
+if __name__ == "__main__":
+    test_page_spans_split_on_consecutive_markers()
+    test_plain_text_is_a_single_page()
+    test_line_views_match_split_and_lower()
+    test_lowercase_view_falls_back_when_lowering_changes_length()
+    test_parse_document_matches_parse_scheme()
@@ -0,0 +1,81 @@
+"""
+Test coalescing of concurrent identical requests
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+
+from single_flight import SingleFlight
+
+
+async def join(flights, key, fn, *args):
+    """Await the shared run for key the way the parse endpoints do"""
+    future, _ = flights.flight(key, fn, *args)
+    return await asyncio.shield(future)
+
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight()
+    calls = []
+
+    async def parse(name):
+        calls.append(name)
+        await asyncio.sleep(0.05)
+        return {'parsed': name}
+
+    async def scenario():
+        results = await asyncio.gather(*(join(flights, ('digest-a', 'v1'), parse, 'a') for _ in range(5)),
+                                       join(flights, ('digest-b', 'v1'), parse, 'b'))
+        # The key is released once the run finishes, so a later caller parses again
+        results.append(await join(flights, ('digest-a', 'v1'), parse, 'a'))
+        return results
+
+    results = asyncio.run(scenario())
+    assert calls == ['a', 'b', 'a']
+    assert results[:5] == [{'parsed': 'a'}] * 5
+    assert results[0] is results[4]
+    assert flights.stats() == {'in_flight': 0, 'started': 3, 'coalesced': 4, 'failed': 0}
+
+
+def test_errors_are_shared_and_cancelled_callers_do_not_stop_the_run():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("corrupt PDF")
+
+    async def scenario():
+        first = asyncio.ensure_future(join(flights, 'key', fail))
+        second = asyncio.ensure_future(join(flights, 'key', fail))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, asyncio.CancelledError)
+    assert isinstance(second, ValueError)
+    assert flights.stats() == {'in_flight': 0, 'started': 1, 'coalesced': 1, 'failed': 1}
+
+
+def test_only_the_first_caller_starts_the_run():
+    flights = SingleFlight()
+
+    async def parse():
+        await asyncio.sleep(0.01)
+        return 'parsed'
+
+    async def scenario():
+        first, first_started = flights.flight('key', parse)
+        joined, joined_started = flights.flight('key', parse)
+        assert joined is first
+        return first_started, joined_started, await first
+
+    assert asyncio.run(scenario()) == (True, False, 'parsed')
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_run()
+    test_errors_are_shared_and_cancelled_callers_do_not_stop_the_run()
+    test_only_the_first_caller_starts_the_run()
@@ -0,0 +1,69 @@
+"""
+Test the compiled CBC taxonomy used for strand and sub-strand scoring
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import improved_strand_identifier
+from improved_strand_identifier import CompiledTaxonomy, ImprovedStrandIdentifier, get_compiled_taxonomy
+
+BLOCKS = [
+    "STRAND: Mathematics SUB-STRAND: Numbers",
+    "Science: Living things and their environment",
+    "English - Reading comprehension skills",
+    "Week 1: Understanding fractions",
+    "Learners measure the length and mass of objects",
+    "Let us start with a story",
+    "the weather and climate of our county",
+    "Kusoma: ufahamu wa hadithi",
+    "No subject words here at all",
+    "",
+]
+
+
+def test_scan_distinguishes_whole_words_from_substrings():
+    taxonomy = CompiledTaxonomy({
+        'mathematics': {'aliases': ['maths'], 'sub_strands': {'numbers': ['place value', 'fractions'], 'geometry': ['2d']}},
+    })
+    hits = taxonomy.scan("adding fractions and place  value, then 2d-shapes with subfractions")
+    found = {taxonomy.entries[entry_id][3]: whole for entry_id, whole in hits.items()}
+    # 'place  value' has two spaces, so only the whole-word phrases that really occur count
+    assert found == {'fractions': True, '2d': True}
+
+    strand, sub_strand, score = taxonomy.score("Equivalent FRACTIONS using maths blocks")
+    assert (strand, sub_strand) == ('mathematics', 'numbers')
+    assert score == len('fractions') * 1.2
+
+
+def test_identifier_shares_the_process_taxonomy():
+    first, second = ImprovedStrandIdentifier(), ImprovedStrandIdentifier()
+    assert first.taxonomy is second.taxonomy is get_compiled_taxonomy()
+
+    # 'art' inside 'start' still counts as a partial keyword match, as it always has
+    for text in ("Week 1: Understanding fractions", "Let us start with a story", "ICT skills - computer programming"):
+        strand = first.identify_strand(text)
+        assert first.identify(text) == (strand, first.identify_substrand(text, strand))
+    assert first.identify("Let us start with a story") == ('Creative Arts', 'Visual Arts')
+
+
+def test_identify_many_matches_one_block_at_a_time(monkeypatch):
+    identifier = ImprovedStrandIdentifier()
+    expected = [identifier.identify(block) for block in BLOCKS]
+    assert identifier.identify_many(BLOCKS) == expected
+
+    batch = identifier.taxonomy.score_many(BLOCKS)
+    for index, block in enumerate(BLOCKS):
+        hits = identifier.taxonomy.scan(block.lower())
+        assert batch.best_strand(index)[0] == identifier.taxonomy.best_strand(hits)[0]
+        for strand_name in identifier.cbc_strands:
+            assert batch.best_sub_strand(index, strand_name)[0] == identifier.taxonomy.best_sub_strand(hits, strand_name)[0]
+
+    # Without NumPy every block is scored on its own
+    monkeypatch.setattr(improved_strand_identifier, 'np', None)
+    assert identifier.identify_many(BLOCKS) == expected
+
+
+if __name__ == "__main__":
+    test_scan_distinguishes_whole_words_from_substrings()
+    test_identifier_shares_the_process_taxonomy()
@@ -0,0 +1,59 @@
+"""
+Test the streaming lesson pipeline against the batch parse_scheme path
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_parser import EnhancedSchemeParser
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def _read_sample():
+    with open(SAMPLE_PDF, 'rb') as f:
+        return f.read()
+
+
+def test_pdf_lines_match_extracted_text():
+    """iter_pdf_lines yields exactly the lines of extract_text_from_pdf"""
+    parser = EnhancedSchemeParser(extract_workers=1)
+    content = _read_sample()
+
+    assert list(parser.iter_pdf_lines(content)) == parser.extract_text_from_pdf(content).split('\n')
+
+
+def test_streamed_lessons_match_parse_scheme():
+    """Streaming yields the same lessons as parse_scheme, in document order"""
+    parser = EnhancedSchemeParser(extract_workers=1)
+    content = _read_sample()
+
+    streamed = list(parser.iter_pdf_lessons(content))
+    batch = parser.parse_scheme(content, 'STM2025.pdf')
+
+    print(f"Streamed {len(streamed)} lessons, batch parsed {len(batch['lesson_plans'])}")
+    assert len(streamed) == len(batch['lesson_plans'])
+    assert sorted(streamed, key=lambda x: x.get('week', 0)) == batch['lesson_plans']
+
+
+def test_first_lesson_available_before_document_is_read():
+    """The first lesson is produced without consuming the whole input"""
+    parser = EnhancedSchemeParser()
+    consumed = []
+
+    def lines():
+        for week in range(1, 200):
+            for line in [f"Week {week}", "STRAND: Mathematics", "SUB-STRAND: Numbers",
+                         "By the end of the lesson, learners should be able to: count objects to 100"]:
+                consumed.append(line)
+                yield line
+
+    first_lesson = next(parser.iter_lessons(lines()))
+    assert first_lesson['week'] == 1
+    assert len(consumed) < 50
+
+
+if __name__ == "__main__":
+    test_pdf_lines_match_extracted_text()
+    test_streamed_lessons_match_parse_scheme()
+    test_first_lesson_available_before_document_is_read()
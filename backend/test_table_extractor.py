@@ -0,0 +1,88 @@
+"""
+Test geometric table extraction from PDF word coordinates
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_parser import EnhancedSchemeParser
+from table_extractor import GeometricTableExtractor, classify_header
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def _words(*lines):
+    """Build get_text("words") tuples; each line is (y, block, [(x, text), ...]).
+
+    Every word gets its own PyMuPDF line (as table cells do) unless the
+    block is given as (block, line_no).
+    """
+    words = []
+    for y, block, cells in lines:
+        for index, (x, text) in enumerate(cells):
+            block_no, line_no = block if isinstance(block, tuple) else (block, index)
+            words.append((x, y, x + 6.0 * len(text), y + 10, text, block_no, line_no, index))
+    return words
+
+
+def test_header_labels_map_to_lesson_fields():
+    assert classify_header('Wee k') == 'week'
+    assert classify_header('Ls n') == 'lessonNumber'
+    assert classify_header('Sub- strand') == 'sub_strand'
+    assert classify_header('Strand/ Theme') == 'strand'
+    assert classify_header('Specific Learning Outcomes') == 'specific_learning_outcomes'
+    assert classify_header('KIQ') == 'key_inquiry_question'
+    assert classify_header('ASSESSMEN T METHOD') == 'assessment'
+
+
+def test_rows_span_pages_and_skip_footers():
+    extractor = GeometricTableExtractor()
+    header = [(10, 'Wee'), (60, 'Less'), (110, 'Strand'), (210, 'Outcomes'), (330, 'Inquiry'), (450, 'Resources')]
+    page_one = _words(
+        (20, 1, [(100, 'SCHEMES'), (160, 'OF'), (180, 'WORK')]),
+        (50, 2, header),
+        (62, 3, [(10, 'k'), (60, 'on')]),
+        (80, 4, [(12, '1'), (62, '1'), (100, 'Numbers'), (200, 'Count'), (336, 'How?'), (440, 'Charts')]),
+        (120, 5, [(62, '2'), (200, 'Add'), (336, 'Why?')]),
+        (135, 6, [(200, 'numbers')]),
+        (500, (7, 0), [(30, 'FOR'), (60, 'COMPLETE'), (120, 'SCHEMES'), (170, 'OF'), (190, 'WORK')]),
+    )
+    page_two = _words(
+        (20, 1, [(200, 'together')]),
+        (40, 2, [(12, '2'), (62, '1'), (100, 'Geometry'), (200, 'Draw'), (336, 'What?')]),
+    )
+
+    rows = extractor.add_page(page_one, 600)
+    assert [row['lessonNumber'] for row in rows] == ['1']
+    assert rows[0]['strand'] == 'Numbers'
+    assert rows[0]['learning_resources'] == 'Charts'
+
+    rows = extractor.add_page(page_two, 600) + extractor.finish()
+    # The open row continues onto the next page; merged week/strand cells carry forward
+    assert rows[0] == {'week': '1', 'lessonNumber': '2', 'strand': 'Numbers',
+                       'specific_learning_outcomes': 'Add numbers together',
+                       'key_inquiry_question': 'Why?', 'learning_resources': ''}
+    assert rows[1]['week'] == '2'
+    assert rows[1]['strand'] == 'Geometry'
+
+
+def test_parse_scheme_uses_table_rows():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    with open(SAMPLE_PDF, 'rb') as f:
+        content = f.read()
+
+    document = parser.extract_document(content, 'STM2025.pdf')
+    assert len(document.table_rows) == 44
+
+    result = parser.parse_document(document)
+    lessons = result['lesson_plans']
+    assert sorted(result['weeks_found']) == list(range(1, 12))
+    assert [lesson['lessonNumber'] for lesson in lessons[:4]] == [1, 2, 3, 4]
+    assert lessons[0]['strand'] == 'LIVING THINGS'
+    assert lessons[0]['key_inquiry_question'].startswith('1. What is the main function of the human skeleton?')
+
+
+if __name__ == "__main__":
+    test_header_labels_map_to_lesson_fields()
+    test_rows_span_pages_and_skip_footers()
+    test_parse_scheme_uses_table_rows()
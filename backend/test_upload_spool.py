@@ -0,0 +1,103 @@
+"""
+Test spooling uploads to disk and extracting from the spooled file
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import io
+import zipfile
+
+from fastapi import HTTPException, UploadFile
+
+from enhanced_parser import EnhancedSchemeParser
+from extraction_cache import content_digest
+from upload_spool import spool_upload, spool_zip_members
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'STM2025.pdf')
+
+
+def _upload(data, filename='scheme.pdf'):
+    # No size attribute, as for a chunked request; the cap is enforced while reading
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def test_spool_hashes_while_copying():
+    data = b'WEEK 1\n' * 300000  # several spool chunks
+    upload = asyncio.run(spool_upload(_upload(data, 'scheme.txt')))
+    with upload:
+        assert upload.size == len(data)
+        assert upload.digest == content_digest(data) == content_digest(upload.path)
+        assert upload.read_bytes() == data
+        assert upload.path.endswith('.txt')
+    assert not os.path.exists(upload.path)
+
+
+def test_oversized_upload_is_rejected_without_leaving_a_file(tmp_path, monkeypatch):
+    import upload_spool
+    monkeypatch.setattr(upload_spool, 'SPOOL_DIR', str(tmp_path))
+
+    try:
+        asyncio.run(spool_upload(_upload(b'x' * 5000), max_bytes=4096))
+        assert False, "expected a 413"
+    except HTTPException as e:
+        assert e.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+def _zip_upload(tmp_path, entries):
+    archive_path = str(tmp_path / 'term.zip')
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+    with open(archive_path, 'rb') as f:
+        return asyncio.run(spool_upload(_upload(f.read(), 'term.zip')))
+
+
+def test_zip_members_are_spooled_individually(tmp_path):
+    scheme = b'WEEK 1\nStrand: Numbers\n'
+    archive = _zip_upload(tmp_path, [('SOWS/', b''), ('SOWS/maths.txt', scheme),
+                                     ('__MACOSX/SOWS/._maths.txt', b'fork'), ('maths - Copy.txt', scheme)])
+    with archive:
+        members = spool_zip_members(archive)
+    try:
+        assert [member.filename for member in members] == ['SOWS/maths.txt', 'maths - Copy.txt']
+        assert {member.digest for member in members} == {content_digest(scheme)}
+        assert members[0].read_bytes() == scheme
+    finally:
+        for member in members:
+            member.close()
+
+
+def test_zip_members_are_held_to_the_upload_cap(tmp_path, monkeypatch):
+    import upload_spool
+    archive = _zip_upload(tmp_path, [('small.txt', b'x' * 10), ('large.txt', b'x' * 5000)])
+    spool_dir = tmp_path / 'spool'
+    spool_dir.mkdir()
+    monkeypatch.setattr(upload_spool, 'SPOOL_DIR', str(spool_dir))
+
+    with archive:
+        for limit in ({'max_bytes': 4096}, {'max_files': 1}):
+            try:
+                spool_zip_members(archive, **limit)
+                assert False, "expected a 413"
+            except HTTPException as e:
+                assert e.status_code == 413
+            assert list(spool_dir.iterdir()) == []
+
+
+def test_extraction_from_spooled_path_matches_bytes():
+    parser = EnhancedSchemeParser(extract_workers=1)
+    parser.text_cache = None  # compare fresh extractions
+    with open(SAMPLE_PDF, 'rb') as f:
+        content = f.read()
+
+    with asyncio.run(spool_upload(_upload(content))) as upload:
+        assert parser.extract_pdf_content(upload.path) == parser.extract_pdf_content(content)
+        assert list(parser.iter_pdf_lessons(upload.path)) == list(parser.iter_pdf_lessons(content))
+
+
+if __name__ == "__main__":
+    test_spool_hashes_while_copying()
+    test_extraction_from_spooled_path_matches_bytes()
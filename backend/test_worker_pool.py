@@ -0,0 +1,62 @@
+"""
+Test the bounded process pool used for parsing and export
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import time
+
+from fastapi import HTTPException
+
+from worker_pool import WorkerPool, parse_scheme_text, parse_scheme_upload
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    pool = WorkerPool(workers=1, max_pending=1, initializer=None)
+
+    async def run_two():
+        return await asyncio.gather(pool.run(time.sleep, 0.3), pool.run(time.sleep, 0.3),
+                                    return_exceptions=True)
+
+    try:
+        first, second = asyncio.run(run_two())
+    finally:
+        pool.shutdown()
+
+    assert first is None
+    assert isinstance(second, HTTPException)
+    assert second.status_code == 429
+    assert int(second.headers['Retry-After']) >= 1
+
+    stats = pool.stats()
+    assert stats['completed'] == 1
+    assert stats['rejected'] == 1
+    assert stats['pending'] == 0
+    assert stats['mean_run_seconds'] >= 0.25
+
+
+def test_jobs_run_in_warm_workers_and_keep_http_errors():
+    pool = WorkerPool(workers=1, max_pending=4)
+    try:
+        parsed = asyncio.run(pool.run(parse_scheme_text, "WEEK 1\nStrand: Numbers\n"))
+        assert parsed['weeks_found'] == [1]
+        assert parsed['lesson_plans'][0]['strand'] == 'Numbers'
+
+        # extract_scheme_document raises HTTPException, which cannot cross the process boundary as is
+        try:
+            asyncio.run(pool.run(parse_scheme_upload, __file__, 'xls', 'scheme.xls'))
+            assert False, "expected a 400"
+        except HTTPException as e:
+            assert e.status_code == 400
+            assert e.detail == "Unsupported file format"
+    finally:
+        pool.shutdown()
+
+    assert pool.stats()['completed'] == 2
+
+
+if __name__ == "__main__":
+    test_full_queue_is_rejected_with_retry_after()
+    test_jobs_run_in_warm_workers_and_keep_http_errors()
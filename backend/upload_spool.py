@@ -0,0 +1,161 @@
+"""
+Spool uploaded files to disk in chunks instead of holding them in memory
+"""
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import List, Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+# Upload limits; request bodies may exceed the file cap by the multipart framing
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "25"))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # None uses the system temp dir
+SPOOL_CHUNK_SIZE = 1024 * 1024
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "50"))
+MAX_BATCH_UPLOAD_MB = int(os.getenv("MAX_BATCH_UPLOAD_MB", "200"))
+MAX_BATCH_UPLOAD_BYTES = MAX_BATCH_UPLOAD_MB * 1024 * 1024
+
+
+def upload_too_large(max_bytes: Optional[int] = None) -> HTTPException:
+    max_mb = (MAX_UPLOAD_BYTES if max_bytes is None else max_bytes) // (1024 * 1024)
+    return HTTPException(status_code=413, detail=f"File too large. Maximum upload size is {max_mb} MB")
+
+
+class SpooledUpload:
+    """An upload copied to a named temporary file, with its size and SHA-256 digest.
+
+    Use as a context manager (or call close()) to delete the file.
+    """
+
+    def __init__(self, path: str, filename: str, size: int, digest: str):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.digest = digest
+
+    def read_bytes(self) -> bytes:
+        return read_source(self.path)
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass  # already cleaned up
+
+    def __enter__(self) -> 'SpooledUpload':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _SpoolWriter:
+    """Temporary file that hashes and size-checks each chunk written to it"""
+
+    def __init__(self, filename: str, max_bytes: int):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        suffix = os.path.splitext(filename or "")[1]
+        fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=SPOOL_DIR)
+        self._file = os.fdopen(fd, 'wb')
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise upload_too_large(self.max_bytes)
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def finish(self) -> SpooledUpload:
+        self._file.close()
+        return SpooledUpload(self.path, self.filename, self.size, self._digest.hexdigest())
+
+    def abort(self) -> None:
+        self._file.close()
+        os.unlink(self.path)
+
+
+async def spool_upload(file: UploadFile, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """Copy an upload to a temporary file chunk by chunk, hashing as it goes.
+
+    Raises a 413 HTTPException as soon as the upload is known to exceed
+    max_bytes, before anything is parsed.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > max_bytes:
+        raise upload_too_large(max_bytes)
+
+    writer = _SpoolWriter(file.filename, max_bytes)
+    try:
+        while True:
+            chunk = await file.read(SPOOL_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.finish()
+
+
+def spool_zip_members(archive: SpooledUpload, max_bytes: Optional[int] = None,
+                      max_files: Optional[int] = None) -> List[SpooledUpload]:
+    """Spool each file in a ZIP upload as if it had been uploaded on its own.
+
+    Member sizes are checked while decompressing (the sizes recorded in the
+    archive are not trusted), so every member is held to the upload cap.
+    Folders and macOS resource forks are skipped.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_files = MAX_BATCH_FILES if max_files is None else max_files
+    try:
+        zip_file = zipfile.ZipFile(archive.path)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{archive.filename} is not a valid ZIP archive")
+
+    members = []
+    try:
+        with zip_file:
+            for info in zip_file.infolist():
+                if info.is_dir() or info.filename.startswith('__MACOSX/'):
+                    continue
+                if len(members) >= max_files:
+                    raise HTTPException(status_code=413, detail=f"Too many files. Maximum is {max_files} per batch")
+                if info.file_size > max_bytes:
+                    raise upload_too_large(max_bytes)
+
+                writer = _SpoolWriter(info.filename, max_bytes)
+                try:
+                    with zip_file.open(info) as member:
+                        for chunk in iter(lambda: member.read(SPOOL_CHUNK_SIZE), b''):
+                            writer.write(chunk)
+                except HTTPException:
+                    writer.abort()
+                    raise
+                except Exception as e:
+                    # Corrupt or encrypted member
+                    writer.abort()
+                    raise HTTPException(status_code=400, detail=f"Could not read {info.filename} from {archive.filename}: {str(e)}")
+                except BaseException:
+                    writer.abort()
+                    raise
+                members.append(writer.finish())
+    except BaseException:
+        for member in members:
+            member.close()
+        raise
+    return members
+
+
+def read_source(source: Union[bytes, str]) -> bytes:
+    """Return the bytes of an in-memory upload or of a spooled upload's path"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, 'rb') as f:
+        return f.read()
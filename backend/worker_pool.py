@@ -0,0 +1,381 @@
+"""
+Bounded process pool that keeps CPU-bound parsing and export off the event loop
+"""
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from document_generator import DocumentGenerator
+from enhanced_parser import PARSER_VERSION, TABLE_EXTRACTOR_VERSION, TEXT_EXTRACTOR_VERSION, EnhancedSchemeParser
+from job_store import get_job_store
+from legacy_parser import PDF_TEXT_EXTRACTOR_VERSION, extract_scheme_document, parse_scheme_of_work
+from parse_budget import ParseBudget, get_continuation_store
+from progress_events import event_publisher, get_progress_hub
+from scheme_document import SchemeDocument
+
+# Pool sizing; requests beyond PARSE_MAX_PENDING (running + queued) get a 429
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+PARSE_MAX_PENDING = int(os.getenv("PARSE_MAX_PENDING", "0")) or 4 * PARSE_WORKERS
+PARSE_RETRY_AFTER_SECONDS = int(os.getenv("PARSE_RETRY_AFTER_SECONDS", "5"))
+
+# Everything parse_scheme_upload's result depends on besides the upload itself
+PARSE_RESULT_VERSION = "/".join((PARSER_VERSION, TEXT_EXTRACTOR_VERSION, TABLE_EXTRACTOR_VERSION,
+                                 PDF_TEXT_EXTRACTOR_VERSION))
+
+# Warm parser for the current worker process, built by the pool initializer
+_parser = None
+
+# Channel for job progress events to the API process (see progress_events)
+_progress_events = None
+_subscriber_count = None
+
+
+def _init_worker(progress_events=None, subscriber_count=None) -> None:
+    """Pool initializer: build the parser and strand identifier once per process"""
+    global _parser, _progress_events, _subscriber_count
+    # The pool already spreads jobs over the CPUs, so pages are extracted serially
+    _parser = EnhancedSchemeParser(extract_workers=1)
+    _parser.get_strand_identifier()
+    _progress_events = progress_events
+    _subscriber_count = subscriber_count
+
+
+def _get_parser() -> EnhancedSchemeParser:
+    if _parser is None:
+        _init_worker()
+    return _parser
+
+
+def _run_job(fn: Callable, args: tuple):
+    """Worker entry point: run fn(*args) and report when it started.
+
+    HTTPException cannot be unpickled, so it is sent back as (status, detail).
+    """
+    started_at = time.time()
+    try:
+        return started_at, fn(*args), None
+    except HTTPException as e:
+        return started_at, None, (e.status_code, e.detail)
+
+
+def parse_scheme_upload(path: str, file_extension: str, filename: str, digest: Optional[str] = None) -> Dict:
+    """Extract a spooled upload once, then try the enhanced parser before the legacy one"""
+    document = extract_scheme_document(path, file_extension, filename, digest)
+
+    if file_extension == 'pdf':
+        try:
+            parsed_data = _get_parser().parse_document(document)
+            if parsed_data['success'] and parsed_data['lesson_plans']:
+                return {
+                    'success': True,
+                    'message': parsed_data['message'],
+                    'weeks_found': parsed_data['weeks_found'],
+                    'lesson_plans': parsed_data['lesson_plans'],
+                    'strategy': "enhanced",
+                }
+        except Exception as e:
+            print(f"Enhanced parser failed, falling back to original: {e}")
+
+    # Fallback to original parsing
+    return _legacy_result(document, filename)
+
+
+def _legacy_result(document: SchemeDocument, filename: str) -> Dict:
+    parsed_data = parse_scheme_of_work(document, filename)
+    if 'error' in parsed_data:
+        return {
+            'success': False,
+            'message': f"Could not parse scheme structure. {parsed_data['error']}. Please check if your scheme follows standard CBC format.",
+            'weeks_found': [],
+            'lesson_plans': [],
+            'strategy': "legacy",
+        }
+    return {
+        'success': True,
+        'message': f"Successfully parsed {parsed_data['total_weeks']} weeks of lesson plans",
+        'weeks_found': parsed_data['weeks_found'],
+        'lesson_plans': parsed_data['lesson_plans'],
+        'strategy': "legacy",
+    }
+
+
+def parse_scheme_upload_within(path: str, file_extension: str, filename: str, digest: Optional[str],
+                               budget_seconds: float) -> Dict:
+    """parse_scheme_upload, stopping between PDF pages or lesson weeks once budget_seconds have passed.
+
+    A parse that stops early returns the lessons finished so far with
+    partial set, the next page or week to be read and a continuation token
+    for resume_scheme_parse. Other uploads only go through the legacy
+    parser, which is not split up, so they are parsed in full.
+    """
+    if file_extension != 'pdf':
+        return parse_scheme_upload(path, file_extension, filename, digest)
+    state = {
+        'filename': filename, 'digest': digest,
+        'pages': [], 'content': None,  # pages extracted so far, until the whole (text, table rows) is known
+        'stage': 'rows', 'position': 0,  # next unit of EnhancedSchemeParser.iter_resumable_lessons
+        'lessons': [],  # enhanced lessons finished so far
+    }
+    return _run_budgeted_parse(state, path, ParseBudget(budget_seconds))
+
+
+def resume_scheme_parse(token: str, budget_seconds: float) -> Dict:
+    """Continue a parse that parse_scheme_upload_within stopped early"""
+    store = get_continuation_store()
+    state = store.load(token)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Continuation token not found or expired")
+    try:
+        return _run_budgeted_parse(state, state['source_path'], ParseBudget(budget_seconds))
+    finally:
+        # Moved into the store again if the parse stopped before extraction finished
+        store.discard_source(state['source_path'])
+
+
+def _run_budgeted_parse(state: Dict, source_path: Optional[str], budget: ParseBudget) -> Dict:
+    parser = _get_parser()
+    filename = state['filename']
+    if state['content'] is None:
+        content = parser.cached_content(state['digest'])
+        if content is None:
+            try:
+                page_count = parser.extract_pages_within(source_path, state['pages'], budget)
+            except Exception as e:
+                # PyMuPDF could not open it; parse it the unbudgeted way, which falls back to PyPDF2
+                print(f"Enhanced extraction failed, parsing without a budget: {e}")
+                return parse_scheme_upload(source_path, 'pdf', filename, state['digest'])
+            if len(state['pages']) < page_count:
+                return _partial_result(parser, state, source_path, next_page=len(state['pages']) + 1)
+            content = parser.content_from_pages(state['pages'])
+            parser.cache_content(state['digest'], *content)
+        state['pages'], state['content'] = None, content
+    text, table_rows = state['content']
+    document = SchemeDocument(text, filename, 'pdf', table_rows=table_rows)
+
+    try:
+        units_read = 0
+        while state['stage']:
+            for position, lesson in parser.iter_resumable_lessons(document, state['stage'], state['position']):
+                units_read += 1
+                if units_read > 1 and budget.expired():
+                    if lesson is None:
+                        state['position'] = position + 1
+                        return _partial_result(parser, state, None)
+                    # Stop between weeks; this lesson is read again on resume
+                    if not state['lessons'] or lesson['week'] != state['lessons'][-1]['week']:
+                        state['position'] = position
+                        return _partial_result(parser, state, None, next_week=lesson['week'])
+                if lesson:
+                    state['lessons'].append(parser.enhance_lesson_data(lesson))
+                state['position'] = position + 1
+            # Text is only parsed when the table rows gave no lessons
+            state['stage'] = 'text' if state['stage'] == 'rows' and not state['lessons'] else None
+            state['position'] = 0
+    except Exception as e:
+        print(f"Enhanced parser failed, falling back to original: {e}")
+        state['lessons'] = []
+
+    if not state['lessons']:
+        return _legacy_result(document, filename)
+    parsed_data = parser.parsed_result(state['lessons'])
+    return {
+        'success': True,
+        'message': parsed_data['message'],
+        'weeks_found': parsed_data['weeks_found'],
+        'lesson_plans': parsed_data['lesson_plans'],
+        'strategy': "enhanced",
+    }
+
+
+def _partial_result(parser: EnhancedSchemeParser, state: Dict, source_path: Optional[str],
+                    next_page: Optional[int] = None, next_week: Optional[int] = None) -> Dict:
+    """Save state for resuming and report the lessons finished so far"""
+    token = get_continuation_store().save(state, source_path)
+    lessons = parser.parsed_result(list(state['lessons']))
+    return {
+        'success': True,
+        'message': f"Parsed {len(lessons['lesson_plans'])} lessons before the time budget ran out; "
+                   f"continue with the continuation token",
+        'weeks_found': lessons['weeks_found'],
+        'lesson_plans': lessons['lesson_plans'],
+        'strategy': "enhanced",
+        'partial': True,
+        'next_page': next_page,
+        'next_week': next_week,
+        'continuation_token': token,
+    }
+
+
+def run_parse_job(job_id: str, path: str, filename: str, digest: Optional[str] = None) -> None:
+    """Run EnhancedSchemeParser.parse_scheme for a stored job, recording progress and the result"""
+    store = get_job_store()
+    store.start(job_id)
+
+    store_progress = store.progress_callback(job_id)
+    progress = store_progress
+    publish = None
+    if _progress_events is not None:
+        publish = event_publisher(job_id, _progress_events, _subscriber_count)
+
+        def store_and_publish(stage, done, total=None, **details):
+            store_progress(stage, done, total, **details)
+            publish(stage, done, total, **details)
+        progress = store_and_publish
+
+    if publish:
+        publish('started')
+    try:
+        parsed_data = _get_parser().parse_scheme(path, filename, digest, progress)
+    except Exception as e:
+        store.fail(job_id, str(e))
+        if publish:
+            publish('failed', error=str(e))
+        return
+
+    store.complete(job_id, {
+        'success': parsed_data['success'],
+        'message': parsed_data['message'],
+        'weeks_found': sorted(parsed_data['weeks_found']),
+        'lesson_plans': parsed_data['lesson_plans'],
+        'strategy': "enhanced",
+    })
+    if publish:
+        lesson_count = len(parsed_data['lesson_plans'])
+        publish('completed', lesson_count, lesson_count, success=parsed_data['success'])
+
+
+def parse_scheme_text(text: str) -> Dict:
+    return parse_scheme_of_work(text)
+
+
+def export_word(lesson_plan: dict) -> bytes:
+    return DocumentGenerator.generate_word_doc(lesson_plan).getvalue()
+
+
+def export_pdf(lesson_plan: dict) -> bytes:
+    return DocumentGenerator.generate_pdf(lesson_plan).getvalue()
+
+
+class WorkerPool:
+    """Runs jobs in a process pool with a cap on jobs running or waiting.
+
+    Jobs are submitted from the event loop, so the counters need no locking.
+    Wait time is measured from submission until a worker picks the job up.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 initializer: Optional[Callable] = _init_worker, initargs: tuple = ()):
+        self.workers = workers if workers is not None else PARSE_WORKERS
+        self.max_pending = max_pending if max_pending is not None else PARSE_MAX_PENDING
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                                 initargs=self.initargs)
+        return self._executor
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from the mean job run time"""
+        if not self.completed:
+            return PARSE_RETRY_AFTER_SECONDS
+        mean_run = self.total_run / self.completed
+        return max(1, math.ceil(mean_run * (self.pending - self.workers + 1) / self.workers))
+
+    def check_capacity(self) -> None:
+        """Raise 429 with Retry-After when no more jobs may be queued"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy parsing other schemes. Please try again shortly.",
+                headers={"Retry-After": str(self.retry_after())},
+            )
+
+    def submit(self, fn: Callable, *args) -> asyncio.Future:
+        """Queue fn(*args) without waiting for it; raises 429 when the pool is full.
+
+        Must be called from the event loop. The future resolves to
+        (started_at, result, http_error) as returned by _run_job.
+        """
+        self.check_capacity()
+        self.pending += 1
+        submitted_at = time.time()
+        try:
+            future = asyncio.wrap_future(self._get_executor().submit(_run_job, fn, args))
+        except BaseException:
+            self.pending -= 1
+            raise
+        future.add_done_callback(lambda f: self._record(f, submitted_at))
+        return future
+
+    def _record(self, future: asyncio.Future, submitted_at: float) -> None:
+        self.pending -= 1
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            self.failed += 1
+            if isinstance(error, BrokenProcessPool):
+                # A worker died (e.g. out of memory); start a fresh pool for later jobs
+                self._executor = None
+            return
+
+        started_at = future.result()[0]
+        finished_at = time.time()
+        wait = max(0.0, started_at - submitted_at)
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += finished_at - max(started_at, submitted_at)
+        self.completed += 1
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a worker process; fn and its arguments must be picklable"""
+        started_at, result, http_error = await self.submit(fn, *args)
+        if http_error:
+            raise HTTPException(status_code=http_error[0], detail=http_error[1])
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'queue_depth': max(0, self.pending - self.workers),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'mean_wait_seconds': round(self.total_wait / self.completed, 4) if self.completed else 0.0,
+            'max_wait_seconds': round(self.max_wait, 4),
+            'mean_run_seconds': round(self.total_run / self.completed, 4) if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_default_pool = None
+
+
+def get_default_pool() -> WorkerPool:
+    """Return the process-wide pool shared by the API endpoints"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = WorkerPool(initargs=get_progress_hub().worker_initargs())
+    return _default_pool